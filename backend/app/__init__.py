@@ -34,6 +34,10 @@ def create_app(config_name='default'):
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+
+    # Keep /public/stats counters current on every commit
+    from app.utils.platform_counters import register_counter_events
+    register_counter_events(db.session)
     CORS(app, origins=app.config['CORS_ORIGINS'])
 
     # Initialize Celery
@@ -50,7 +54,7 @@ def create_app(config_name='default'):
     )
 
     # Register blueprints/namespaces
-    from app.routes import agriculture, auth, realestate, employment, business, public, export
+    from app.routes import agriculture, auth, realestate, employment, business, public, export, geo
 
     api.add_namespace(public.ns, path='/public')
     api.add_namespace(agriculture.ns, path='/agriculture')
@@ -64,6 +68,9 @@ def create_app(config_name='default'):
     # Export routes
     api.add_namespace(export.ns, path='/export')
 
+    # Vector tiles
+    api.add_namespace(geo.ns, path='/geo')
+
     # Health check endpoint
     @app.route('/health')
     def health_check():
@@ -87,9 +94,12 @@ def create_app(config_name='default'):
         
         anti_scraping_middleware()
     
+    from app.utils.compression import compress_response
+
     @app.after_request
     def after_request(response):
-        """Add security headers and log access"""
+        """Compress, add security headers and log access"""
+        response = compress_response(response)
         response = add_security_headers(response)
         log_api_access(
             api_key_info=getattr(g, 'api_key_info', None),
@@ -44,6 +44,46 @@ beat_schedule = {
         'schedule': crontab(hour=3, minute=0, day_of_week=0),  # Every Sunday at 3 AM
     },
 
+    'flush-api-key-usage': {
+        'task': 'tasks.maintenance.flush_api_key_usage',
+        'schedule': timedelta(seconds=30),  # Max lag of api_keys.total_requests
+        'options': {
+            'expires': 30,
+        }
+    },
+
+    'consume-behavior-events': {
+        'task': 'tasks.maintenance.consume_behavior_events',
+        'schedule': timedelta(seconds=5),  # Max anti-scraping detection lag
+        'options': {
+            'expires': 5,
+        }
+    },
+
+    'reconcile-platform-counters': {
+        'task': 'tasks.maintenance.reconcile_platform_counters',
+        'schedule': timedelta(hours=1),  # Max drift of /public/stats counters
+        'options': {
+            'expires': 3600,
+        }
+    },
+
+    'build-stats-cubes': {
+        'task': 'tasks.maintenance.build_stats_cubes',
+        'schedule': timedelta(minutes=10),  # No-op unless the data version changed
+        'options': {
+            'expires': 600,
+        }
+    },
+
+    'rebuild-commune-geometries': {
+        'task': 'tasks.maintenance.rebuild_commune_geometries',
+        'schedule': timedelta(minutes=10),  # No-op unless a commune geometry changed
+        'options': {
+            'expires': 600,
+        }
+    },
+
     # ============================================================
     # AGRICULTURE TASKS
     # ============================================================
@@ -187,6 +227,7 @@ result_serializer = 'json'
 # Task routing (optional - for task prioritization)
 task_routes = {
     'tasks.scheduler.*': {'queue': 'scheduler'},
+    'tasks.maintenance.*': {'queue': 'scheduler'},
     'tasks.agriculture.*': {'queue': 'agriculture'},
     'tasks.realestate.*': {'queue': 'realestate'},
     'tasks.employment.*': {'queue': 'employment'},
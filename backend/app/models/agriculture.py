@@ -64,9 +64,11 @@ class AgriStats(BaseModel):
         db.UniqueConstraint('commune_id', 'crop_id', 'year', name='uq_commune_crop_year'),
         db.Index('idx_commune_year', 'commune_id', 'year'),
         db.Index('idx_crop_year', 'crop_id', 'year'),
+        db.Index('idx_agri_stats_sort', 'year', 'id'),  # /index keyset order
     )
 
     # Relationships
+    SERIALIZED_RELATIONS = ('commune', 'crop', 'data_source')
     commune = db.relationship('Commune', back_populates='agri_stats')
     crop = db.relationship('Crop', back_populates='agri_stats')
     data_source = db.relationship('DataSource', back_populates='agri_stats')  # Legacy: primary source
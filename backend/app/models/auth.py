@@ -7,6 +7,48 @@ from app import db
 from app.models.base import BaseModel
 
 
+class ScopeSet:
+    """
+    Precompiled scope list for fast permission checks
+
+    Splits the JSON scope list once into exact scopes and wildcard
+    prefixes (e.g. "agriculture:*" -> "agriculture:") so a check is a
+    couple of set lookups instead of a loop over the list.
+    """
+    __slots__ = ('exact', 'prefixes', 'allow_all')
+
+    def __init__(self, scopes=None):
+        scopes = scopes or []
+        self.allow_all = '*' in scopes
+        self.exact = frozenset(scopes)
+        self.prefixes = frozenset(s[:-1] for s in scopes if s.endswith(':*'))
+
+    def allows(self, required_scope):
+        """
+        Check if a scope is granted
+
+        Args:
+            required_scope: Scope string (e.g., "agriculture:read")
+
+        Returns:
+            Boolean
+        """
+        if self.allow_all or required_scope in self.exact:
+            return True
+
+        if not self.prefixes:
+            return False
+
+        # Candidate wildcard prefixes end at each ':' of the required scope
+        idx = required_scope.find(':')
+        while idx != -1:
+            if required_scope[:idx + 1] in self.prefixes:
+                return True
+            idx = required_scope.find(':', idx + 1)
+
+        return False
+
+
 class ApiKey(BaseModel):
     """API Key model for authentication"""
     __tablename__ = 'api_keys'
@@ -22,7 +64,8 @@ class ApiKey(BaseModel):
     owner_organization = db.Column(db.String(200), nullable=True)
 
     # Access control
-    is_active = db.Column(db.Boolean, default=True, index=True)
+    # active_history: the previous value is loaded on change (platform counters)
+    is_active = db.column_property(db.Column(db.Boolean, default=True, index=True), active_history=True)
     expires_at = db.Column(db.DateTime, nullable=True)
     
     # Permission levels
@@ -33,6 +76,7 @@ class ApiKey(BaseModel):
     # Rate limiting
     rate_limit_per_hour = db.Column(db.Integer, default=1000)
     rate_limit_per_day = db.Column(db.Integer, default=10000)
+    rate_limit_burst = db.Column(db.Integer, nullable=True)  # Max back-to-back requests (defaults to the per-minute limit)
 
     # Usage tracking
     last_used_at = db.Column(db.DateTime, nullable=True)
@@ -51,7 +95,8 @@ class ApiKey(BaseModel):
 
     @classmethod
     def create_key(cls, name, owner_name, owner_email, owner_organization=None, 
-                   expires_in_days=365, scopes=None, is_admin=False, can_export=False, can_api_direct=False):
+                   expires_in_days=365, scopes=None, is_admin=False, can_export=False, can_api_direct=False,
+                   rate_limit_burst=None):
         """
         Create a new API key
 
@@ -65,6 +110,7 @@ class ApiKey(BaseModel):
             is_admin: Whether this is an admin key
             can_export: Whether this key can export data
             can_api_direct: Whether this key can call API directly
+            rate_limit_burst: Max back-to-back requests (None for the per-minute limit)
 
         Returns:
             ApiKey instance
@@ -84,7 +130,8 @@ class ApiKey(BaseModel):
             scopes=scopes or [],
             is_admin=is_admin,
             can_export=can_export,
-            can_api_direct=can_api_direct
+            can_api_direct=can_api_direct,
+            rate_limit_burst=rate_limit_burst
         )
 
         return api_key
@@ -109,25 +156,18 @@ class ApiKey(BaseModel):
         Returns:
             Boolean
         """
-        if not self.scopes:
-            return False
-
-        # Check exact match or wildcard
-        for scope in self.scopes:
-            if scope == required_scope or scope == '*':
-                return True
-
-            # Check prefix match (e.g., "agriculture:*" matches "agriculture:read")
-            if scope.endswith(':*') and required_scope.startswith(scope[:-1]):
-                return True
-
-        return False
+        # Exact match, wildcard, or prefix match ("agriculture:*" matches "agriculture:read")
+        return ScopeSet(self.scopes).allows(required_scope)
 
     def record_usage(self):
-        """Record API key usage"""
-        self.last_used_at = datetime.utcnow()
-        self.total_requests += 1
-        db.session.commit()
+        """
+        Record API key usage
+
+        Write-behind: counters are accumulated in Redis and flushed to this
+        row by the tasks.maintenance.flush_api_key_usage periodic task.
+        """
+        from app.utils.api_key_usage import record_api_key_usage
+        record_api_key_usage(self.id)
 
     def to_dict(self, include_key=False, exclude=None):
         """
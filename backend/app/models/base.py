@@ -2,6 +2,7 @@
 Base model for all database models
 """
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
 
 
@@ -49,6 +50,27 @@ class BaseModel(db.Model):
         db.session.delete(self)
         db.session.commit()
 
+    # Relationships serialized (id and name) by to_dict(include_relations=True)
+    SERIALIZED_RELATIONS = ()
+
+    @classmethod
+    def eager_relations(cls):
+        """
+        Loader options for the relations serialized by to_dict(include_relations=True)
+
+        Joins them into the list query (id and name only) instead of one
+        lazy SELECT per row and relation.
+
+        Returns:
+            List of loader options for query.options()
+        """
+        options = []
+        for name in cls.SERIALIZED_RELATIONS:
+            relation = getattr(cls, name)
+            target = relation.property.mapper.class_
+            options.append(joinedload(relation).load_only(target.id, target.name))
+        return options
+
     @classmethod
     def get_by_id(cls, id):
         """Get instance by ID"""
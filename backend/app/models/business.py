@@ -83,9 +83,11 @@ class BusinessStats(BaseModel):
         db.UniqueConstraint('commune_id', 'sector_id', 'year', 'quarter', name='uq_commune_sector_year_quarter'),
         db.Index('idx_commune_year_biz', 'commune_id', 'year'),
         db.Index('idx_sector_year', 'sector_id', 'year'),
+        db.Index('idx_business_stats_sort', 'year', db.text('COALESCE(quarter, 0)'), 'id'),  # /index keyset order
     )
 
     # Relationships
+    SERIALIZED_RELATIONS = ('commune', 'sector', 'data_source')
     commune = db.relationship('Commune', back_populates='business_stats')
     sector = db.relationship('BusinessSector', back_populates='business_stats')
     data_source = db.relationship('DataSource', back_populates='business_stats')
@@ -74,9 +74,11 @@ class EmploymentStats(BaseModel):
         db.UniqueConstraint('commune_id', 'job_category_id', 'year', 'quarter', name='uq_commune_job_year_quarter'),
         db.Index('idx_commune_year_emp', 'commune_id', 'year'),
         db.Index('idx_job_year', 'job_category_id', 'year'),
+        db.Index('idx_employment_stats_sort', 'year', db.text('COALESCE(quarter, 0)'), 'id'),  # /index keyset order
     )
 
     # Relationships
+    SERIALIZED_RELATIONS = ('commune', 'job_category', 'data_source')
     commune = db.relationship('Commune', back_populates='employment_stats')
     job_category = db.relationship('JobCategory', back_populates='employment_stats')
     data_source = db.relationship('DataSource', back_populates='employment_stats')
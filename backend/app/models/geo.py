@@ -4,8 +4,6 @@ Geographic models with PostGIS support
 from app import db
 from app.models.base import BaseModel
 from geoalchemy2 import Geometry
-from geoalchemy2.shape import to_shape
-import json
 
 
 class Country(BaseModel):
@@ -51,6 +49,18 @@ class Commune(BaseModel):
         nullable=True
     )
 
+    # Simplified copies for GeoJSON clients, rebuilt after boundary loads
+    # (see app.services.geometry); deferred so they are only read when
+    # requested
+    geometry_medium = db.deferred(db.Column(
+        Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False),
+        nullable=True
+    ))
+    geometry_low = db.deferred(db.Column(
+        Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False),
+        nullable=True
+    ))
+
     # Center point for quick map display
     center_lat = db.Column(db.Float, nullable=True)
     center_lon = db.Column(db.Float, nullable=True)
@@ -71,25 +81,24 @@ class Commune(BaseModel):
     def __repr__(self):
         return f'<Commune {self.name}>'
 
-    def to_dict(self, include_geometry=False, exclude=None):
+    def to_dict(self, include_geometry=False, exclude=None, resolution='full'):
         """
         Convert to dictionary with optional geometry
 
         Args:
             include_geometry: Include GeoJSON geometry
             exclude: Fields to exclude
+            resolution: Geometry resolution ('low', 'medium' or 'full')
 
         Returns:
             Dictionary representation
         """
+        exclude = list(exclude or []) + ['geometry', 'geometry_medium', 'geometry_low']
         data = super().to_dict(exclude=exclude)
 
         if include_geometry and self.geometry is not None:
-            # Convert PostGIS geometry to GeoJSON
-            shape = to_shape(self.geometry)
-            data['geometry'] = json.loads(json.dumps(shape.__geo_interface__))
-        else:
-            # Remove geometry field
-            data.pop('geometry', None)
+            # GeoJSON rendered by PostGIS from the precomputed resolution
+            from app.services.geometry import get_commune_geometries
+            data['geometry'] = get_commune_geometries([self.id], resolution).get(self.id)
 
         return data
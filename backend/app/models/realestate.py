@@ -72,9 +72,11 @@ class RealEstateStats(BaseModel):
         db.UniqueConstraint('commune_id', 'property_type_id', 'year', 'quarter', name='uq_commune_property_year_quarter'),
         db.Index('idx_commune_year_re', 'commune_id', 'year'),
         db.Index('idx_property_year', 'property_type_id', 'year'),
+        db.Index('idx_real_estate_stats_sort', 'year', db.text('COALESCE(quarter, 0)'), 'id'),  # /index keyset order
     )
 
     # Relationships
+    SERIALIZED_RELATIONS = ('commune', 'property_type', 'data_source')
     commune = db.relationship('Commune', back_populates='real_estate_stats')
     property_type = db.relationship('PropertyType', back_populates='real_estate_stats')
     data_source = db.relationship('DataSource', back_populates='real_estate_stats')
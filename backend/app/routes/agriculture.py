@@ -1,15 +1,19 @@
 """
 Agriculture API routes
 """
-from flask import request
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
-from sqlalchemy import and_, func, desc
-from statistics import mean, stdev
+from sqlalchemy import and_
 
-from app import db
 from app.models.geo import Commune, Region
 from app.models.agriculture import Crop, AgriStats
+from app.services.aggregation import get_aggregation_engine
+from app.services.batch_lookup import InvalidBatch, batch_lookup, parse_keys
 from app.utils.auth import require_api_key
+from app.utils.pagination import InvalidCursor, index_serializer, paginate_index
+from app.utils.prebuilt_payload import prebuilt_payload
+from app.utils.response_cache import cached_response
+from app.utils.serializer import InvalidFields, get_serializer
 
 # Create namespace
 ns = Namespace('agriculture', description='Agriculture data operations')
@@ -45,17 +49,23 @@ agri_stats_model = ns.model('AgriStats', {
     'price_currency': fields.String(description='Currency code'),
 })
 
+batch_request_model = ns.model('AgriStatsBatchRequest', {
+    'keys': fields.List(fields.Raw, required=True,
+                        description='Keys of (commune_id, crop_id, year), e.g. {"commune_id": 1, "crop_id": 2, "year": 2020}'),
+    'fields': fields.String(description='Comma-separated columns and relations to return (default: all)'),
+})
+
 
 @ns.route('/communes')
 class CommuneList(Resource):
     """Commune list operations"""
 
     @ns.doc('list_communes')
-    @ns.marshal_list_with(commune_model)
+    @ns.response(200, 'Success', [commune_model])
+    @prebuilt_payload(max_age=3600)
     def get(self):
         """List all communes - Public endpoint for landing page"""
-        communes = Commune.query.all()
-        return [c.to_dict() for c in communes]
+        return get_serializer(Commune, fields=list(commune_model)).fetch(Commune.query.order_by(Commune.id))
 
 
 @ns.route('/communes/<int:commune_id>')
@@ -83,8 +93,7 @@ class CropList(Resource):
     @require_api_key('agriculture:read')
     def get(self):
         """List all crops"""
-        crops = Crop.query.all()
-        return [c.to_dict() for c in crops]
+        return get_serializer(Crop, fields=list(crop_model)).fetch()
 
 
 @ns.route('/crops/<int:crop_id>')
@@ -115,7 +124,11 @@ class AgricultureIndex(Resource):
     @ns.param('year_to', 'Filter by year to', type='integer', required=False)
     @ns.param('page', 'Page number', type='integer', required=False, default=1)
     @ns.param('per_page', 'Items per page', type='integer', required=False, default=50)
+    @ns.param('cursor', 'Cursor from a previous next_cursor (replaces page)', type='string', required=False)
+    @ns.param('total', 'Total count: exact, estimated or none', type='string', required=False)
+    @ns.param('fields', 'Comma-separated columns and relations to return (default: all)', type='string', required=False)
     @require_api_key('agriculture:read')
+    @cached_response()
     def get(self):
         """
         Get agriculture statistics with filters
@@ -150,25 +163,26 @@ class AgricultureIndex(Resource):
         if filters:
             query = query.filter(and_(*filters))
 
-        # Order by year descending
-        query = query.order_by(AgriStats.year.desc())
-
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        # Format response
-        data = [stat.to_dict(include_relations=True) for stat in pagination.items]
+        # Paginate: cursor seeks past the last row served, page uses OFFSET
+        try:
+            serializer = index_serializer(AgriStats, request.args.get('fields', type=str))
+            rows, metadata = paginate_index(
+                query, AgriStats, per_page, page=page,
+                cursor=request.args.get('cursor', type=str),
+                total=request.args.get('total', type=str),
+                serializer=serializer,
+            )
+        except InvalidFields as e:
+            ns.abort(400, str(e))
+        except InvalidCursor:
+            ns.abort(400, 'Invalid cursor. Use the next_cursor of a previous response.')
+
+        # Format response (plain column tuples, same shape as to_dict(include_relations=True))
+        data = serializer.to_dicts(rows)
 
         return {
             'data': data,
-            'metadata': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev,
-            }
+            'metadata': metadata
         }, 200
 
 
@@ -181,6 +195,7 @@ class AgricultureIndexDetail(Resource):
 
     @ns.doc('get_agriculture_stat')
     @require_api_key('agriculture:read')
+    @cached_response()
     def get(self, commune_id, crop_id, year):
         """Get specific agriculture statistic"""
         stat = AgriStats.query.filter_by(
@@ -200,6 +215,38 @@ class AgricultureIndexDetail(Resource):
             }
         }, 200
 
+@ns.route('/index/batch')
+class AgricultureIndexBatch(Resource):
+    """Batch lookup of agriculture statistics"""
+
+    @ns.doc('batch_agriculture_stats')
+    @ns.expect(batch_request_model)
+    @require_api_key('agriculture:read')
+    def post(self):
+        """
+        Get many agriculture statistics by (commune_id, crop_id, year)
+
+        Resolves up to MAX_BATCH_KEYS keys with a single query. Results are
+        returned in request order; keys without a record have found=false.
+        """
+        payload = request.get_json(silent=True)
+        try:
+            keys = parse_keys(AgriStats, payload, current_app.config['MAX_BATCH_KEYS'])
+            results = batch_lookup(AgriStats, keys, fields=payload.get('fields'))
+        except (InvalidBatch, InvalidFields) as e:
+            ns.abort(400, str(e))
+
+        found = sum(1 for result in results if result['found'])
+        return {
+            'data': results,
+            'metadata': {
+                'requested': len(results),
+                'found': found,
+                'missing': len(results) - found
+            }
+        }, 200
+
+
 @ns.route('/stats/aggregated')
 class AggregatedStatistics(Resource):
     """Aggregated agriculture statistics with KPI calculations"""
@@ -213,6 +260,7 @@ class AggregatedStatistics(Resource):
     @ns.param('year_to', 'End year (inclusive)', type='integer', required=False)
     @ns.param('region_id', 'Filter by region ID', type='integer', required=False)
     @require_api_key('agriculture:read')
+    @cached_response()
     def get(self):
         """
         Get aggregated agriculture statistics with KPIs and trends
@@ -254,32 +302,20 @@ class AggregatedStatistics(Resource):
             except ValueError:
                 ns.abort(400, 'Invalid crop_ids format. Use comma-separated integers.')
 
-        # Build base query
-        query = AgriStats.query
-
-        # Apply filters
-        filters = [AgriStats.year >= year_from]
-        
-        if year_to:
-            filters.append(AgriStats.year <= year_to)
-        
-        if commune_ids:
-            filters.append(AgriStats.commune_id.in_(commune_ids))
-        elif region_id:
-            # Get communes in region
-            region_communes = db.session.query(Commune.id).filter_by(region_id=region_id).all()
-            region_commune_ids = [c[0] for c in region_communes]
-            filters.append(AgriStats.commune_id.in_(region_commune_ids))
-        
-        if crop_ids:
-            filters.append(AgriStats.crop_id.in_(crop_ids))
-
-        if filters:
-            query = query.filter(and_(*filters))
-
-        stats = query.all()
+        filters = {
+            'year_from': year_from,
+            'year_to': year_to,
+            'commune_ids': commune_ids,
+            'region_id': region_id if not commune_ids else None,
+            'category_ids': crop_ids,
+        }
+        rollups = get_aggregation_engine('agriculture').aggregate(
+            ['summary', 'commune', 'crop', 'year'], filters
+        )
+        summary_row = rollups['summary'][0] if rollups['summary'] else None
+        data_count = summary_row['_records'] if summary_row else 0
 
-        if not stats:
+        if not data_count:
             return {
                 'data': {
                     'summary': {},
@@ -300,125 +336,43 @@ class AggregatedStatistics(Resource):
                 }
             }, 200
 
-        # === CALCULATE AGGREGATES ===
+        # === FORMAT AGGREGATES ===
         
         # 1. OVERALL SUMMARY
-        total_production = sum(s.production_tonnes or 0 for s in stats)
-        total_area = sum(s.area_harvested_ha or 0 for s in stats)
-        avg_yield = total_production / total_area if total_area > 0 else 0
-        avg_price = mean([s.price_per_kg for s in stats if s.price_per_kg]) or 0
-        avg_quality = mean([s.data_quality_score for s in stats if s.data_quality_score]) or 0
-        data_count = len(stats)
-        estimated_count = sum(1 for s in stats if s.is_estimated)
-        estimated_pct = (estimated_count / data_count * 100) if data_count > 0 else 0
+        estimated_pct = (summary_row['estimated_records'] / data_count * 100) if data_count > 0 else 0
 
         summary = {
-            'total_production_tonnes': round(total_production, 2),
-            'total_area_ha': round(total_area, 2),
-            'average_yield_t_ha': round(avg_yield, 2),
-            'average_price_xof_kg': round(avg_price, 2),
-            'average_quality_score': round(avg_quality, 3),
+            'total_production_tonnes': round(summary_row['production_tonnes'], 2),
+            'total_area_ha': round(summary_row['area_ha'], 2),
+            'average_yield_t_ha': round(summary_row['avg_yield'], 2),
+            'average_price_xof_kg': round(summary_row['avg_reported_price'], 2),
+            'average_quality_score': round(summary_row['avg_quality'], 3),
             'data_points': data_count,
             'estimated_data_pct': round(estimated_pct, 1),
         }
 
         # 2. AGGREGATION BY COMMUNE
-        by_commune = {}
-        for stat in stats:
-            commune_key = stat.commune_id
-            if commune_key not in by_commune:
-                commune = stat.commune
-                by_commune[commune_key] = {
-                    'commune_id': commune_key,
-                    'commune_name': commune.name if commune else 'Unknown',
-                    'production_tonnes': 0,
-                    'area_ha': 0,
-                    'avg_yield': 0,
-                    'avg_price': 0,
-                    'records': 0,
-                    'year_range': [None, None]
-                }
-            
-            by_commune[commune_key]['production_tonnes'] += stat.production_tonnes or 0
-            by_commune[commune_key]['area_ha'] += stat.area_harvested_ha or 0
-            by_commune[commune_key]['records'] += 1
-            
-            # Track year range
-            if by_commune[commune_key]['year_range'][0] is None or stat.year < by_commune[commune_key]['year_range'][0]:
-                by_commune[commune_key]['year_range'][0] = stat.year
-            if by_commune[commune_key]['year_range'][1] is None or stat.year > by_commune[commune_key]['year_range'][1]:
-                by_commune[commune_key]['year_range'][1] = stat.year
-
-        # Calculate averages for communes
-        for commune_data in by_commune.values():
-            if commune_data['area_ha'] > 0:
-                commune_data['avg_yield'] = round(commune_data['production_tonnes'] / commune_data['area_ha'], 2)
-            commune_data['production_tonnes'] = round(commune_data['production_tonnes'], 2)
-            commune_data['area_ha'] = round(commune_data['area_ha'], 2)
-
-        by_commune_list = sorted(by_commune.values(), key=lambda x: x['production_tonnes'], reverse=True)
+        by_commune_list = sorted((
+            dict(
+                _format_group(row),
+                commune_id=row['commune_id'],
+                commune_name=row['commune_name'] or 'Unknown',
+                year_range=[row['_year_min'], row['_year_max']],
+            )
+            for row in rollups['commune']
+        ), key=lambda x: x['production_tonnes'], reverse=True)
 
         # 3. AGGREGATION BY CROP
-        by_crop = {}
-        for stat in stats:
-            crop_key = stat.crop_id
-            if crop_key not in by_crop:
-                crop = stat.crop
-                by_crop[crop_key] = {
-                    'crop_id': crop_key,
-                    'crop_name': crop.name if crop else 'Unknown',
-                    'production_tonnes': 0,
-                    'area_ha': 0,
-                    'avg_yield': 0,
-                    'avg_price': 0,
-                    'records': 0
-                }
-            
-            by_crop[crop_key]['production_tonnes'] += stat.production_tonnes or 0
-            by_crop[crop_key]['area_ha'] += stat.area_harvested_ha or 0
-            by_crop[crop_key]['avg_price'] += stat.price_per_kg or 0
-            by_crop[crop_key]['records'] += 1
-
-        # Calculate averages for crops
-        for crop_data in by_crop.values():
-            if crop_data['area_ha'] > 0:
-                crop_data['avg_yield'] = round(crop_data['production_tonnes'] / crop_data['area_ha'], 2)
-            if crop_data['records'] > 0:
-                crop_data['avg_price'] = round(crop_data['avg_price'] / crop_data['records'], 2)
-            crop_data['production_tonnes'] = round(crop_data['production_tonnes'], 2)
-            crop_data['area_ha'] = round(crop_data['area_ha'], 2)
-
-        by_crop_list = sorted(by_crop.values(), key=lambda x: x['production_tonnes'], reverse=True)
+        by_crop_list = sorted((
+            dict(_format_group(row), crop_id=row['crop_id'], crop_name=row['crop_name'] or 'Unknown')
+            for row in rollups['crop']
+        ), key=lambda x: x['production_tonnes'], reverse=True)
 
         # 4. AGGREGATION BY YEAR
-        by_year = {}
-        for stat in stats:
-            year_key = stat.year
-            if year_key not in by_year:
-                by_year[year_key] = {
-                    'year': year_key,
-                    'production_tonnes': 0,
-                    'area_ha': 0,
-                    'avg_yield': 0,
-                    'avg_price': 0,
-                    'records': 0
-                }
-            
-            by_year[year_key]['production_tonnes'] += stat.production_tonnes or 0
-            by_year[year_key]['area_ha'] += stat.area_harvested_ha or 0
-            by_year[year_key]['avg_price'] += stat.price_per_kg or 0
-            by_year[year_key]['records'] += 1
-
-        # Calculate averages for years
-        for year_data in by_year.values():
-            if year_data['area_ha'] > 0:
-                year_data['avg_yield'] = round(year_data['production_tonnes'] / year_data['area_ha'], 2)
-            if year_data['records'] > 0:
-                year_data['avg_price'] = round(year_data['avg_price'] / year_data['records'], 2)
-            year_data['production_tonnes'] = round(year_data['production_tonnes'], 2)
-            year_data['area_ha'] = round(year_data['area_ha'], 2)
-
-        by_year_list = sorted(by_year.values(), key=lambda x: x['year'])
+        by_year_list = sorted((
+            dict(_format_group(row), year=row['year'])
+            for row in rollups['year']
+        ), key=lambda x: x['year'])
 
         # 5. TREND ANALYSIS
         trends = {}
@@ -463,4 +417,15 @@ class AggregatedStatistics(Resource):
                     'region_id': region_id
                 }
             }
-        }, 200
\ No newline at end of file
+        }, 200
+
+
+def _format_group(row):
+    """Common metrics of a by-commune/by-crop/by-year rollup"""
+    return {
+        'production_tonnes': round(row['production_tonnes'], 2),
+        'area_ha': round(row['area_ha'], 2),
+        'avg_yield': round(row['avg_yield'], 2),
+        'avg_price': round(row['avg_price'], 2),
+        'records': row['_records'],
+    }
@@ -8,6 +8,9 @@ import os
 
 from app import db
 from app.models.auth import ApiKey
+from app.utils.api_key_cache import invalidate_api_key
+from app.utils.api_key_usage import add_pending_usage
+from app.utils.compression import get_compression_metrics
 
 # Admin secret key (should be in environment variable)
 ADMIN_SECRET = os.environ.get('TEDI_ADMIN_SECRET', 'tedi-admin-secret-2026')
@@ -67,7 +70,7 @@ class ApiKeyList(Resource):
 
         keys = query.all()
         return {
-            'data': [k.to_dict(include_key=False) for k in keys],
+            'data': add_pending_usage([k.to_dict(include_key=False) for k in keys]),
             'total': len(keys)
         }, 200
 
@@ -119,7 +122,7 @@ class ApiKeyDetail(Resource):
             ns.abort(404, f'API Key {key_id} not found')
 
         return {
-            'data': api_key.to_dict(include_key=False)
+            'data': add_pending_usage([api_key.to_dict(include_key=False)])[0]
         }, 200
 
     @ns.doc('update_api_key')
@@ -139,6 +142,7 @@ class ApiKeyDetail(Resource):
 
         try:
             db.session.commit()
+            invalidate_api_key(api_key.key)
             return {
                 'data': api_key.to_dict(include_key=False),
                 'message': 'API key updated successfully'
@@ -155,8 +159,10 @@ class ApiKeyDetail(Resource):
             ns.abort(404, f'API Key {key_id} not found')
 
         try:
+            raw_key = api_key.key
             db.session.delete(api_key)
             db.session.commit()
+            invalidate_api_key(raw_key)
             return {'message': f'API key {key_id} deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
@@ -220,8 +226,10 @@ class Register(Resource):
                 ns.abort(409, 'An API key already exists for this email. Please use your existing key or contact support.')
             else:
                 # If expired/inactive, delete old one and create new
+                raw_key = existing_key.key
                 db.session.delete(existing_key)
                 db.session.commit()
+                invalidate_api_key(raw_key)
 
         # Create API key with limited permissions
         try:
@@ -269,6 +277,7 @@ admin_key_create_model = ns.model('AdminKeyCreate', {
     'is_admin': fields.Boolean(required=False, default=False, description='Grant admin privileges'),
     'can_export': fields.Boolean(required=False, default=True, description='Allow data export'),
     'can_api_direct': fields.Boolean(required=False, default=True, description='Allow direct API access'),
+    'rate_limit_burst': fields.Integer(required=False, description='Max back-to-back requests (defaults to the per-minute limit)'),
     'scopes': fields.List(fields.String, required=False, description='Permission scopes'),
 })
 
@@ -286,7 +295,7 @@ class AdminKeyManagement(Resource):
 
         keys = ApiKey.query.all()
         return {
-            'data': [k.to_dict(include_key=False) for k in keys],
+            'data': add_pending_usage([k.to_dict(include_key=False) for k in keys]),
             'total': len(keys),
             'stats': {
                 'total_keys': len(keys),
@@ -327,7 +336,8 @@ class AdminKeyManagement(Resource):
                 scopes=data.get('scopes', ['data:read', 'data:export', 'api:direct']),
                 is_admin=data.get('is_admin', False),
                 can_export=data.get('can_export', True),
-                can_api_direct=data.get('can_api_direct', True)
+                can_api_direct=data.get('can_api_direct', True),
+                rate_limit_burst=data.get('rate_limit_burst')
             )
 
             db.session.add(api_key)
@@ -370,11 +380,14 @@ class AdminKeyDetail(Resource):
             api_key.can_export = data['can_export']
         if 'can_api_direct' in data:
             api_key.can_api_direct = data['can_api_direct']
+        if 'rate_limit_burst' in data:
+            api_key.rate_limit_burst = data['rate_limit_burst']
         if 'scopes' in data:
             api_key.scopes = data['scopes']
 
         try:
             db.session.commit()
+            invalidate_api_key(api_key.key)
             return {
                 'data': api_key.to_dict(include_key=False),
                 'message': 'API key updated successfully'
@@ -395,9 +408,27 @@ class AdminKeyDetail(Resource):
             ns.abort(404, f'API Key {key_id} not found')
 
         try:
+            raw_key = api_key.key
             db.session.delete(api_key)
             db.session.commit()
+            invalidate_api_key(raw_key)
             return {'message': f'API key {key_id} deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
             ns.abort(500, f'Error deleting API key: {str(e)}')
+
+
+@ns.route('/admin/metrics/compression')
+class AdminCompressionMetrics(Resource):
+    """Admin-only response compression metrics"""
+
+    @ns.doc('admin_compression_metrics')
+    @ns.param('X-Admin-Secret', 'Admin secret key', _in='header', required=True)
+    def get(self):
+        """Get response compression totals per coding (admin only)"""
+        if not check_admin_secret():
+            ns.abort(401, 'Invalid or missing admin secret')
+
+        return {
+            'data': get_compression_metrics()
+        }, 200
@@ -1,15 +1,18 @@
 """
 Business API routes
 """
-from flask import request
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
-from sqlalchemy import and_, func
+from sqlalchemy import and_
 import json
 
-from app import db
-from app.models.geo import Commune
 from app.models.business import BusinessSector, BusinessStats
+from app.services.aggregation import get_aggregation_engine
+from app.services.batch_lookup import InvalidBatch, batch_lookup, parse_keys
 from app.utils.auth import require_api_key
+from app.utils.pagination import InvalidCursor, index_serializer, paginate_index
+from app.utils.response_cache import cached_response
+from app.utils.serializer import InvalidFields, get_serializer
 
 # Create namespace
 ns = Namespace('business', description='Business data operations')
@@ -45,6 +48,12 @@ business_stats_model = ns.model('BusinessStats', {
     'market_saturation': fields.String(description='Market saturation'),
 })
 
+batch_request_model = ns.model('BusinessStatsBatchRequest', {
+    'keys': fields.List(fields.Raw, required=True,
+                        description='Keys of (commune_id, sector_id, year, quarter), e.g. {"commune_id": 1, "sector_id": 2, "year": 2020, "quarter": 1}'),
+    'fields': fields.String(description='Comma-separated columns and relations to return (default: all)'),
+})
+
 
 @ns.route('/sectors')
 class BusinessSectorList(Resource):
@@ -55,8 +64,7 @@ class BusinessSectorList(Resource):
     @require_api_key('business:read')
     def get(self):
         """List all business sectors"""
-        business_sectors = BusinessSector.query.all()
-        return [bs.to_dict() for bs in business_sectors]
+        return get_serializer(BusinessSector, fields=list(business_sector_model)).fetch()
 
 
 @ns.route('/sectors/<int:sector_id>')
@@ -90,7 +98,11 @@ class BusinessIndex(Resource):
     @ns.param('market_saturation', 'Filter by market saturation', type='string', required=False)
     @ns.param('page', 'Page number', type='integer', required=False, default=1)
     @ns.param('per_page', 'Items per page', type='integer', required=False, default=50)
+    @ns.param('cursor', 'Cursor from a previous next_cursor (replaces page)', type='string', required=False)
+    @ns.param('total', 'Total count: exact, estimated or none', type='string', required=False)
+    @ns.param('fields', 'Comma-separated columns and relations to return (default: all)', type='string', required=False)
     @require_api_key('business:read')
+    @cached_response()
     def get(self):
         """
         Get business statistics with filters
@@ -131,25 +143,26 @@ class BusinessIndex(Resource):
         if filters:
             query = query.filter(and_(*filters))
 
-        # Order by year and quarter descending
-        query = query.order_by(BusinessStats.year.desc(), BusinessStats.quarter.desc())
-
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        # Format response
-        data = [stat.to_dict(include_relations=True) for stat in pagination.items]
+        # Paginate: cursor seeks past the last row served, page uses OFFSET
+        try:
+            serializer = index_serializer(BusinessStats, request.args.get('fields', type=str))
+            rows, metadata = paginate_index(
+                query, BusinessStats, per_page, page=page,
+                cursor=request.args.get('cursor', type=str),
+                total=request.args.get('total', type=str),
+                serializer=serializer,
+            )
+        except InvalidFields as e:
+            ns.abort(400, str(e))
+        except InvalidCursor:
+            ns.abort(400, 'Invalid cursor. Use the next_cursor of a previous response.')
+
+        # Format response (plain column tuples, same shape as to_dict(include_relations=True))
+        data = serializer.to_dicts(rows)
 
         return {
             'data': data,
-            'metadata': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev,
-            }
+            'metadata': metadata
         }, 200
 
 
@@ -192,6 +205,39 @@ class BusinessStatsDetail(Resource):
         }, 200
 
 
+@ns.route('/index/batch')
+class BusinessIndexBatch(Resource):
+    """Batch lookup of business statistics"""
+
+    @ns.doc('batch_business_stats')
+    @ns.expect(batch_request_model)
+    @require_api_key('business:read')
+    def post(self):
+        """
+        Get many business statistics by (commune_id, sector_id, year, quarter)
+
+        Resolves up to MAX_BATCH_KEYS keys with a single query. Results are
+        returned in request order; keys without a record have found=false.
+        quarter may be null for annual rows.
+        """
+        payload = request.get_json(silent=True)
+        try:
+            keys = parse_keys(BusinessStats, payload, current_app.config['MAX_BATCH_KEYS'])
+            results = batch_lookup(BusinessStats, keys, fields=payload.get('fields'))
+        except (InvalidBatch, InvalidFields) as e:
+            ns.abort(400, str(e))
+
+        found = sum(1 for result in results if result['found'])
+        return {
+            'data': results,
+            'metadata': {
+                'requested': len(results),
+                'found': found,
+                'missing': len(results) - found
+            }
+        }, 200
+
+
 @ns.route('/stats/aggregated')
 class BusinessAggregatedStats(Resource):
     """Aggregated Business statistics for analytics"""
@@ -204,6 +250,7 @@ class BusinessAggregatedStats(Resource):
     @ns.param('region_id', 'Filter by region ID', type='integer', required=False)
     @ns.param('group_by', 'Group results by: commune, sector, year, or none', type='string', required=False)
     @require_api_key('business:read')
+    @cached_response()
     def get(self):
         """
         Get aggregated business statistics for analytics and visualization
@@ -218,252 +265,13 @@ class BusinessAggregatedStats(Resource):
         region_id = request.args.get('region_id', type=int)
         group_by = request.args.get('group_by', 'none', type=str)
 
-        # Start with base query joining with commune for region filtering
-        query = db.session.query(
-            BusinessStats,
-            Commune.name.label('commune_name'),
-            BusinessSector.name.label('sector_name')
-        ).join(Commune, BusinessStats.commune_id == Commune.id)\
-         .join(BusinessSector, BusinessStats.sector_id == BusinessSector.id)
-
-        # Apply filters
-        filters = [
-            BusinessStats.year >= year_from,
-            BusinessStats.year <= year_to,
-        ]
-
-        if commune_id:
-            filters.append(BusinessStats.commune_id == commune_id)
-        if sector_id:
-            filters.append(BusinessStats.sector_id == sector_id)
-        if region_id:
-            filters.append(Commune.region_id == region_id)
-
-        query = query.filter(and_(*filters))
-
-        # Execute query
-        results = query.all()
-
-        # Process results based on grouping
-        if group_by == 'commune':
-            return self._aggregate_by_commune(results), 200
-        elif group_by == 'sector':
-            return self._aggregate_by_sector(results), 200
-        elif group_by == 'year':
-            return self._aggregate_by_year(results), 200
-        else:
-            # No grouping - return overall KPIs
-            return self._calculate_overall_kpis(results), 200
-
-    def _calculate_overall_kpis(self, results):
-        """Calculate overall KPIs from all results"""
-        if not results:
-            return {
-                'kpis': {
-                    'total_businesses': 0,
-                    'total_revenue': 0,
-                    'total_employees': 0,
-                    'avg_birth_rate': 0,
-                    'avg_formality_rate': 0,
-                    'data_quality_avg': 0
-                },
-                'metadata': {'total_records': 0}
-            }
-
-        stats = [r[0] for r in results]
-        
-        # Calculate KPIs
-        businesses = [s.num_businesses for s in stats if s.num_businesses]
-        revenues = [s.total_revenue for s in stats if s.total_revenue and s.total_revenue > 0]
-        employees = [s.total_employees for s in stats if s.total_employees]
-        birth_rates = [s.business_birth_rate for s in stats if s.business_birth_rate]
-        formal_rates = [s.formality_rate for s in stats if s.formality_rate]
-        qualities = [s.data_quality_score for s in stats if s.data_quality_score]
-        
-        kpis = {
-            'total_businesses': sum(businesses) if businesses else 0,
-            'total_revenue': sum(revenues) if revenues else 0,
-            'total_employees': sum(employees) if employees else 0,
-            'avg_birth_rate': sum(birth_rates) / len(birth_rates) if birth_rates else 0,
-            'avg_formality_rate': sum(formal_rates) / len(formal_rates) if formal_rates else 0,
-            'data_quality_avg': sum(qualities) / len(qualities) if qualities else 0
-        }
-
-        return {
-            'kpis': kpis,
-            'metadata': {
-                'total_records': len(stats),
-                'year_range': (min([s.year for s in stats]), max([s.year for s in stats])),
-                'num_communes': len(set([s.commune_id for s in stats])),
-                'num_sectors': len(set([s.sector_id for s in stats]))
-            }
-        }
-
-    def _aggregate_by_commune(self, results):
-        """Aggregate statistics by commune"""
-        by_commune = {}
-        
-        for stat, commune_name, sector_name in results:
-            commune_id = stat.commune_id
-            if commune_id not in by_commune:
-                by_commune[commune_id] = {
-                    'commune_id': commune_id,
-                    'commune_name': commune_name,
-                    'businesses': [],
-                    'revenues': [],
-                    'employees': [],
-                    'birth_rates': [],
-                    'formal_rates': [],
-                    'quality_scores': []
-                }
-            
-            if stat.num_businesses:
-                by_commune[commune_id]['businesses'].append(stat.num_businesses)
-            if stat.total_revenue and stat.total_revenue > 0:
-                by_commune[commune_id]['revenues'].append(stat.total_revenue)
-            if stat.total_employees:
-                by_commune[commune_id]['employees'].append(stat.total_employees)
-            if stat.business_birth_rate:
-                by_commune[commune_id]['birth_rates'].append(stat.business_birth_rate)
-            if stat.formality_rate:
-                by_commune[commune_id]['formal_rates'].append(stat.formality_rate)
-            if stat.data_quality_score:
-                by_commune[commune_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for commune_id, data in by_commune.items():
-            agg = {
-                'commune_id': data['commune_id'],
-                'commune_name': data['commune_name'],
-                'total_businesses': sum(data['businesses']) if data['businesses'] else 0,
-                'total_revenue': sum(data['revenues']) if data['revenues'] else 0,
-                'total_employees': sum(data['employees']) if data['employees'] else 0,
-                'avg_birth_rate': sum(data['birth_rates']) / len(data['birth_rates']) if data['birth_rates'] else 0,
-                'avg_formality_rate': sum(data['formal_rates']) / len(data['formal_rates']) if data['formal_rates'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        # Sort by num businesses
-        aggregated.sort(key=lambda x: x['total_businesses'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'commune',
-                'total_communes': len(aggregated),
-                'records': len(results)
-            }
+        filters = {
+            'year_from': year_from,
+            'year_to': year_to,
+            'commune_id': commune_id,
+            'category_id': sector_id,
+            'region_id': region_id,
         }
 
-    def _aggregate_by_sector(self, results):
-        """Aggregate statistics by business sector"""
-        by_sector = {}
-        
-        for stat, commune_name, sector_name in results:
-            sector_id = stat.sector_id
-            if sector_id not in by_sector:
-                by_sector[sector_id] = {
-                    'sector_id': sector_id,
-                    'sector_name': sector_name,
-                    'businesses': [],
-                    'revenues': [],
-                    'employees': [],
-                    'birth_rates': [],
-                    'formal_rates': [],
-                    'quality_scores': []
-                }
-            
-            if stat.num_businesses:
-                by_sector[sector_id]['businesses'].append(stat.num_businesses)
-            if stat.total_revenue and stat.total_revenue > 0:
-                by_sector[sector_id]['revenues'].append(stat.total_revenue)
-            if stat.total_employees:
-                by_sector[sector_id]['employees'].append(stat.total_employees)
-            if stat.business_birth_rate:
-                by_sector[sector_id]['birth_rates'].append(stat.business_birth_rate)
-            if stat.formality_rate:
-                by_sector[sector_id]['formal_rates'].append(stat.formality_rate)
-            if stat.data_quality_score:
-                by_sector[sector_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for sector_id, data in by_sector.items():
-            agg = {
-                'sector_id': data['sector_id'],
-                'sector_name': data['sector_name'],
-                'total_businesses': sum(data['businesses']) if data['businesses'] else 0,
-                'total_revenue': sum(data['revenues']) if data['revenues'] else 0,
-                'total_employees': sum(data['employees']) if data['employees'] else 0,
-                'avg_birth_rate': sum(data['birth_rates']) / len(data['birth_rates']) if data['birth_rates'] else 0,
-                'avg_formality_rate': sum(data['formal_rates']) / len(data['formal_rates']) if data['formal_rates'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        aggregated.sort(key=lambda x: x['total_businesses'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'sector',
-                'total_sectors': len(aggregated),
-                'records': len(results)
-            }
-        }
-
-    def _aggregate_by_year(self, results):
-        """Aggregate statistics by year"""
-        by_year = {}
-        
-        for stat, commune_name, sector_name in results:
-            year = stat.year
-            if year not in by_year:
-                by_year[year] = {
-                    'year': year,
-                    'businesses': [],
-                    'revenues': [],
-                    'employees': [],
-                    'birth_rates': [],
-                    'formal_rates': [],
-                    'quality_scores': []
-                }
-            
-            if stat.num_businesses:
-                by_year[year]['businesses'].append(stat.num_businesses)
-            if stat.total_revenue and stat.total_revenue > 0:
-                by_year[year]['revenues'].append(stat.total_revenue)
-            if stat.total_employees:
-                by_year[year]['employees'].append(stat.total_employees)
-            if stat.business_birth_rate:
-                by_year[year]['birth_rates'].append(stat.business_birth_rate)
-            if stat.formality_rate:
-                by_year[year]['formal_rates'].append(stat.formality_rate)
-            if stat.data_quality_score:
-                by_year[year]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for year in sorted(by_year.keys()):
-            data = by_year[year]
-            agg = {
-                'year': data['year'],
-                'total_businesses': sum(data['businesses']) if data['businesses'] else 0,
-                'total_revenue': sum(data['revenues']) if data['revenues'] else 0,
-                'total_employees': sum(data['employees']) if data['employees'] else 0,
-                'avg_birth_rate': sum(data['birth_rates']) / len(data['birth_rates']) if data['birth_rates'] else 0,
-                'avg_formality_rate': sum(data['formal_rates']) / len(data['formal_rates']) if data['formal_rates'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'year',
-                'total_years': len(aggregated),
-                'records': len(results)
-            }
-        }
+        # No grouping (or unknown group_by) returns overall KPIs
+        return get_aggregation_engine('business').response(group_by, filters), 200
@@ -1,15 +1,18 @@
 """
 Employment API routes
 """
-from flask import request
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
-from sqlalchemy import and_, func
+from sqlalchemy import and_
 import json
 
-from app import db
-from app.models.geo import Commune
 from app.models.employment import JobCategory, EmploymentStats
+from app.services.aggregation import get_aggregation_engine
+from app.services.batch_lookup import InvalidBatch, batch_lookup, parse_keys
 from app.utils.auth import require_api_key
+from app.utils.pagination import InvalidCursor, index_serializer, paginate_index
+from app.utils.response_cache import cached_response
+from app.utils.serializer import InvalidFields, get_serializer
 
 # Create namespace
 ns = Namespace('employment', description='Employment data operations')
@@ -42,6 +45,12 @@ employment_stats_model = ns.model('EmploymentStats', {
     'salary_range_estimation': fields.String(description='Salary range estimation'),
 })
 
+batch_request_model = ns.model('EmploymentStatsBatchRequest', {
+    'keys': fields.List(fields.Raw, required=True,
+                        description='Keys of (commune_id, job_category_id, year, quarter), e.g. {"commune_id": 1, "job_category_id": 2, "year": 2020, "quarter": 1}'),
+    'fields': fields.String(description='Comma-separated columns and relations to return (default: all)'),
+})
+
 
 @ns.route('/categories')
 class JobCategoryList(Resource):
@@ -52,8 +61,7 @@ class JobCategoryList(Resource):
     @require_api_key('employment:read')
     def get(self):
         """List all job categories"""
-        job_categories = JobCategory.query.all()
-        return [jc.to_dict() for jc in job_categories]
+        return get_serializer(JobCategory, fields=list(job_category_model)).fetch()
 
 
 @ns.route('/categories/<int:category_id>')
@@ -87,7 +95,11 @@ class EmploymentIndex(Resource):
     @ns.param('salary_range', 'Filter by salary range', type='string', required=False)
     @ns.param('page', 'Page number', type='integer', required=False, default=1)
     @ns.param('per_page', 'Items per page', type='integer', required=False, default=50)
+    @ns.param('cursor', 'Cursor from a previous next_cursor (replaces page)', type='string', required=False)
+    @ns.param('total', 'Total count: exact, estimated or none', type='string', required=False)
+    @ns.param('fields', 'Comma-separated columns and relations to return (default: all)', type='string', required=False)
     @require_api_key('employment:read')
+    @cached_response()
     def get(self):
         """
         Get employment statistics with filters
@@ -128,25 +140,26 @@ class EmploymentIndex(Resource):
         if filters:
             query = query.filter(and_(*filters))
 
-        # Order by year and quarter descending
-        query = query.order_by(EmploymentStats.year.desc(), EmploymentStats.quarter.desc())
-
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        # Format response
-        data = [stat.to_dict(include_relations=True) for stat in pagination.items]
+        # Paginate: cursor seeks past the last row served, page uses OFFSET
+        try:
+            serializer = index_serializer(EmploymentStats, request.args.get('fields', type=str))
+            rows, metadata = paginate_index(
+                query, EmploymentStats, per_page, page=page,
+                cursor=request.args.get('cursor', type=str),
+                total=request.args.get('total', type=str),
+                serializer=serializer,
+            )
+        except InvalidFields as e:
+            ns.abort(400, str(e))
+        except InvalidCursor:
+            ns.abort(400, 'Invalid cursor. Use the next_cursor of a previous response.')
+
+        # Format response (plain column tuples, same shape as to_dict(include_relations=True))
+        data = serializer.to_dicts(rows)
 
         return {
             'data': data,
-            'metadata': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev,
-            }
+            'metadata': metadata
         }, 200
 
 
@@ -189,6 +202,39 @@ class EmploymentStatsDetail(Resource):
         }, 200
 
 
+@ns.route('/index/batch')
+class EmploymentIndexBatch(Resource):
+    """Batch lookup of employment statistics"""
+
+    @ns.doc('batch_employment_stats')
+    @ns.expect(batch_request_model)
+    @require_api_key('employment:read')
+    def post(self):
+        """
+        Get many employment statistics by (commune_id, job_category_id, year, quarter)
+
+        Resolves up to MAX_BATCH_KEYS keys with a single query. Results are
+        returned in request order; keys without a record have found=false.
+        quarter may be null for annual rows.
+        """
+        payload = request.get_json(silent=True)
+        try:
+            keys = parse_keys(EmploymentStats, payload, current_app.config['MAX_BATCH_KEYS'])
+            results = batch_lookup(EmploymentStats, keys, fields=payload.get('fields'))
+        except (InvalidBatch, InvalidFields) as e:
+            ns.abort(400, str(e))
+
+        found = sum(1 for result in results if result['found'])
+        return {
+            'data': results,
+            'metadata': {
+                'requested': len(results),
+                'found': found,
+                'missing': len(results) - found
+            }
+        }, 200
+
+
 @ns.route('/stats/aggregated')
 class EmploymentAggregatedStats(Resource):
     """Aggregated Employment statistics for analytics"""
@@ -201,6 +247,7 @@ class EmploymentAggregatedStats(Resource):
     @ns.param('region_id', 'Filter by region ID', type='integer', required=False)
     @ns.param('group_by', 'Group results by: commune, job_category, year, or none', type='string', required=False)
     @require_api_key('employment:read')
+    @cached_response()
     def get(self):
         """
         Get aggregated employment statistics for analytics and visualization
@@ -215,237 +262,13 @@ class EmploymentAggregatedStats(Resource):
         region_id = request.args.get('region_id', type=int)
         group_by = request.args.get('group_by', 'none', type=str)
 
-        # Start with base query joining with commune for region filtering
-        query = db.session.query(
-            EmploymentStats,
-            Commune.name.label('commune_name'),
-            JobCategory.name.label('job_category_name')
-        ).join(Commune, EmploymentStats.commune_id == Commune.id)\
-         .join(JobCategory, EmploymentStats.job_category_id == JobCategory.id)
-
-        # Apply filters
-        filters = [
-            EmploymentStats.year >= year_from,
-            EmploymentStats.year <= year_to,
-        ]
-
-        if commune_id:
-            filters.append(EmploymentStats.commune_id == commune_id)
-        if job_category_id:
-            filters.append(EmploymentStats.job_category_id == job_category_id)
-        if region_id:
-            filters.append(Commune.region_id == region_id)
-
-        query = query.filter(and_(*filters))
-
-        # Execute query
-        results = query.all()
-
-        # Process results based on grouping
-        if group_by == 'commune':
-            return self._aggregate_by_commune(results), 200
-        elif group_by == 'job_category':
-            return self._aggregate_by_job_category(results), 200
-        elif group_by == 'year':
-            return self._aggregate_by_year(results), 200
-        else:
-            # No grouping - return overall KPIs
-            return self._calculate_overall_kpis(results), 200
-
-    def _calculate_overall_kpis(self, results):
-        """Calculate overall KPIs from all results"""
-        if not results:
-            return {
-                'kpis': {
-                    'total_employed': 0,
-                    'avg_unemployment_rate': 0,
-                    'avg_informal_rate': 0,
-                    'avg_median_salary': 0,
-                    'data_quality_avg': 0
-                },
-                'metadata': {'total_records': 0}
-            }
-
-        stats = [r[0] for r in results]
-        
-        # Calculate KPIs
-        employed = [s.total_employed for s in stats if s.total_employed]
-        unemp_rates = [s.unemployment_rate for s in stats if s.unemployment_rate]
-        informal_rates = [s.informal_rate for s in stats if s.informal_rate]
-        salaries = [s.median_salary for s in stats if s.median_salary and s.median_salary > 0]
-        qualities = [s.data_quality_score for s in stats if s.data_quality_score]
-        
-        kpis = {
-            'total_employed': sum(employed) if employed else 0,
-            'avg_unemployment_rate': sum(unemp_rates) / len(unemp_rates) if unemp_rates else 0,
-            'avg_informal_rate': sum(informal_rates) / len(informal_rates) if informal_rates else 0,
-            'avg_median_salary': sum(salaries) / len(salaries) if salaries else 0,
-            'data_quality_avg': sum(qualities) / len(qualities) if qualities else 0
-        }
-
-        return {
-            'kpis': kpis,
-            'metadata': {
-                'total_records': len(stats),
-                'year_range': (min([s.year for s in stats]), max([s.year for s in stats])),
-                'num_communes': len(set([s.commune_id for s in stats])),
-                'num_job_categories': len(set([s.job_category_id for s in stats]))
-            }
-        }
-
-    def _aggregate_by_commune(self, results):
-        """Aggregate statistics by commune"""
-        by_commune = {}
-        
-        for stat, commune_name, job_category_name in results:
-            commune_id = stat.commune_id
-            if commune_id not in by_commune:
-                by_commune[commune_id] = {
-                    'commune_id': commune_id,
-                    'commune_name': commune_name,
-                    'employed': [],
-                    'unemployment_rates': [],
-                    'informal_rates': [],
-                    'salaries': [],
-                    'quality_scores': []
-                }
-            
-            if stat.total_employed:
-                by_commune[commune_id]['employed'].append(stat.total_employed)
-            if stat.unemployment_rate:
-                by_commune[commune_id]['unemployment_rates'].append(stat.unemployment_rate)
-            if stat.informal_rate:
-                by_commune[commune_id]['informal_rates'].append(stat.informal_rate)
-            if stat.median_salary and stat.median_salary > 0:
-                by_commune[commune_id]['salaries'].append(stat.median_salary)
-            if stat.data_quality_score:
-                by_commune[commune_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for commune_id, data in by_commune.items():
-            agg = {
-                'commune_id': data['commune_id'],
-                'commune_name': data['commune_name'],
-                'total_employed': sum(data['employed']) if data['employed'] else 0,
-                'avg_unemployment_rate': sum(data['unemployment_rates']) / len(data['unemployment_rates']) if data['unemployment_rates'] else 0,
-                'avg_informal_rate': sum(data['informal_rates']) / len(data['informal_rates']) if data['informal_rates'] else 0,
-                'avg_median_salary': sum(data['salaries']) / len(data['salaries']) if data['salaries'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        # Sort by employed count
-        aggregated.sort(key=lambda x: x['total_employed'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'commune',
-                'total_communes': len(aggregated),
-                'records': len(results)
-            }
+        filters = {
+            'year_from': year_from,
+            'year_to': year_to,
+            'commune_id': commune_id,
+            'category_id': job_category_id,
+            'region_id': region_id,
         }
 
-    def _aggregate_by_job_category(self, results):
-        """Aggregate statistics by job category"""
-        by_category = {}
-        
-        for stat, commune_name, job_category_name in results:
-            job_cat_id = stat.job_category_id
-            if job_cat_id not in by_category:
-                by_category[job_cat_id] = {
-                    'job_category_id': job_cat_id,
-                    'job_category_name': job_category_name,
-                    'employed': [],
-                    'unemployment_rates': [],
-                    'informal_rates': [],
-                    'salaries': [],
-                    'quality_scores': []
-                }
-            
-            if stat.total_employed:
-                by_category[job_cat_id]['employed'].append(stat.total_employed)
-            if stat.unemployment_rate:
-                by_category[job_cat_id]['unemployment_rates'].append(stat.unemployment_rate)
-            if stat.informal_rate:
-                by_category[job_cat_id]['informal_rates'].append(stat.informal_rate)
-            if stat.median_salary and stat.median_salary > 0:
-                by_category[job_cat_id]['salaries'].append(stat.median_salary)
-            if stat.data_quality_score:
-                by_category[job_cat_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for job_cat_id, data in by_category.items():
-            agg = {
-                'job_category_id': data['job_category_id'],
-                'job_category_name': data['job_category_name'],
-                'total_employed': sum(data['employed']) if data['employed'] else 0,
-                'avg_unemployment_rate': sum(data['unemployment_rates']) / len(data['unemployment_rates']) if data['unemployment_rates'] else 0,
-                'avg_informal_rate': sum(data['informal_rates']) / len(data['informal_rates']) if data['informal_rates'] else 0,
-                'avg_median_salary': sum(data['salaries']) / len(data['salaries']) if data['salaries'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        aggregated.sort(key=lambda x: x['total_employed'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'job_category',
-                'total_categories': len(aggregated),
-                'records': len(results)
-            }
-        }
-
-    def _aggregate_by_year(self, results):
-        """Aggregate statistics by year"""
-        by_year = {}
-        
-        for stat, commune_name, job_category_name in results:
-            year = stat.year
-            if year not in by_year:
-                by_year[year] = {
-                    'year': year,
-                    'employed': [],
-                    'unemployment_rates': [],
-                    'informal_rates': [],
-                    'salaries': [],
-                    'quality_scores': []
-                }
-            
-            if stat.total_employed:
-                by_year[year]['employed'].append(stat.total_employed)
-            if stat.unemployment_rate:
-                by_year[year]['unemployment_rates'].append(stat.unemployment_rate)
-            if stat.informal_rate:
-                by_year[year]['informal_rates'].append(stat.informal_rate)
-            if stat.median_salary and stat.median_salary > 0:
-                by_year[year]['salaries'].append(stat.median_salary)
-            if stat.data_quality_score:
-                by_year[year]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for year in sorted(by_year.keys()):
-            data = by_year[year]
-            agg = {
-                'year': data['year'],
-                'total_employed': sum(data['employed']) if data['employed'] else 0,
-                'avg_unemployment_rate': sum(data['unemployment_rates']) / len(data['unemployment_rates']) if data['unemployment_rates'] else 0,
-                'avg_informal_rate': sum(data['informal_rates']) / len(data['informal_rates']) if data['informal_rates'] else 0,
-                'avg_median_salary': sum(data['salaries']) / len(data['salaries']) if data['salaries'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'year',
-                'total_years': len(aggregated),
-                'records': len(results)
-            }
-        }
+        # No grouping (or unknown group_by) returns overall KPIs
+        return get_aggregation_engine('employment').response(group_by, filters), 200
@@ -104,7 +104,7 @@ class AgricultureExport(Resource):
         format = request.args.get('format', 'csv').lower()
         
         # Build query
-        query = AgriStats.query
+        query = AgriStats.query.options(*AgriStats.eager_relations())
         
         if request.args.get('year'):
             query = query.filter(AgriStats.year == int(request.args.get('year')))
@@ -150,7 +150,7 @@ class RealEstateExport(Resource):
         
         format = request.args.get('format', 'csv').lower()
         
-        query = RealEstateStats.query
+        query = RealEstateStats.query.options(*RealEstateStats.eager_relations())
         
         if request.args.get('year'):
             query = query.filter(RealEstateStats.year == int(request.args.get('year')))
@@ -195,7 +195,7 @@ class EmploymentExport(Resource):
         
         format = request.args.get('format', 'csv').lower()
         
-        query = EmploymentStats.query
+        query = EmploymentStats.query.options(*EmploymentStats.eager_relations())
         
         if request.args.get('year'):
             query = query.filter(EmploymentStats.year == int(request.args.get('year')))
@@ -240,7 +240,7 @@ class BusinessExport(Resource):
         
         format = request.args.get('format', 'csv').lower()
         
-        query = BusinessStats.query
+        query = BusinessStats.query.options(*BusinessStats.eager_relations())
         
         if request.args.get('year'):
             query = query.filter(BusinessStats.year == int(request.args.get('year')))
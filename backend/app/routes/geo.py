@@ -0,0 +1,95 @@
+"""
+Geographic API routes (vector tiles, GeoJSON boundaries)
+"""
+import hashlib
+
+from flask import Response, request
+from flask_restx import Namespace, Resource
+
+from app.services.geometry import DEFAULT_RESOLUTION, InvalidResolution, get_communes_feature_collection
+from app.services.tiles import InvalidTile, get_tile, validate_metric, validate_tile
+from app.utils.auth import authenticate
+from app.utils.data_version import get_data_version
+from app.utils.response_cache import cached_response
+
+# Create namespace
+ns = Namespace('geo', description='Geographic data (vector tiles, GeoJSON)')
+
+MVT_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+
+@ns.route('/communes')
+class CommuneBoundaries(Resource):
+    """Commune boundaries as GeoJSON"""
+
+    @ns.doc('get_commune_boundaries')
+    @ns.param('resolution', 'Geometry resolution: low, medium or full', type='string', required=False, default=DEFAULT_RESOLUTION)
+    @cached_response(policy='public', max_age=3600, ttl=3600)
+    def get(self):
+        """
+        Get a GeoJSON FeatureCollection of commune boundaries
+
+        For clients that cannot use the vector tiles. low and medium are
+        simplified copies (precomputed) with fewer coordinate digits.
+        """
+        resolution = request.args.get('resolution', DEFAULT_RESOLUTION, type=str)
+
+        try:
+            return get_communes_feature_collection(resolution), 200
+        except InvalidResolution as e:
+            ns.abort(400, str(e))
+
+
+@ns.route('/tiles/<int:z>/<int:x>/<int:y>.mvt')
+@ns.param('z', 'Zoom level')
+@ns.param('x', 'Tile column')
+@ns.param('y', 'Tile row (XYZ scheme)')
+class CommuneTile(Resource):
+    """Commune boundaries as Mapbox Vector Tiles"""
+
+    @ns.doc('get_commune_tile')
+    @ns.param('sector', 'Sector of the metric (agriculture, realestate, employment, business)', type='string', required=False)
+    @ns.param('metric', "Sector metric carried as the 'value' feature property (requires an API key)", type='string', required=False)
+    @ns.param('year', 'Year of the metric (default: all years)', type='integer', required=False)
+    def get(self, z, x, y):
+        """
+        Get a vector tile of commune boundaries
+
+        Layer 'communes' with features id, name and, when a metric is
+        requested, value. Empty tiles return 204.
+        """
+        sector = request.args.get('sector', type=str)
+        metric = request.args.get('metric', type=str)
+        year = request.args.get('year', type=int)
+
+        try:
+            validate_tile(z, x, y)
+            if metric:
+                validate_metric(sector, metric)
+        except InvalidTile as e:
+            ns.abort(400, str(e))
+
+        # Boundaries are public; sector metrics need the sector's read scope
+        if metric:
+            authenticate(f'{sector}:read')
+
+        version = get_data_version()
+        tile = get_tile(z, x, y, version, sector=sector, metric=metric, year=year)
+        etag = hashlib.sha256(tile).hexdigest()[:32]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        elif not tile:
+            response = Response(status=204)
+        else:
+            response = Response(tile, status=200, mimetype=MVT_MIMETYPE)
+
+        response.set_etag(etag)
+        if metric:
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.headers['Vary'] = 'X-API-KEY'
+        else:
+            response.headers['Cache-Control'] = 'public, max-age=3600'
+        if version is not None:
+            response.headers['X-Data-Version'] = str(version)
+        return response
@@ -3,15 +3,13 @@ Public API routes (no authentication required)
 """
 from flask import Blueprint
 from flask_restx import Namespace, Resource
-from sqlalchemy import func
 
 from app import db
-from app.models.geo import Commune
-from app.models.agriculture import AgriStats
-from app.models.realestate import RealEstateStats
-from app.models.employment import EmploymentStats
-from app.models.business import BusinessStats
-from app.models.auth import ApiKey
+from app.models.geo import Commune, Region
+from app.services.commune_summary import get_all_commune_summaries, get_commune_summary
+from app.utils.platform_counters import get_counters
+from app.utils.prebuilt_payload import prebuilt_payload
+from app.utils.response_cache import cached_response
 
 # Create namespace
 ns = Namespace('public', description='Public endpoints (no auth required)')
@@ -25,33 +23,29 @@ class PublicStats(Resource):
     """Get public platform statistics"""
 
     @ns.doc('get_public_stats')
+    @cached_response(policy='public', max_age=300)
     def get(self):
         """Get platform statistics for landing page"""
 
-        # Count communes
-        communes_count = db.session.query(func.count(Commune.id)).scalar()
+        # Maintained incrementally on commit (see app.utils.platform_counters)
+        counters = get_counters()
 
         # Count total data points across all verticals
-        agri_count = db.session.query(func.count(AgriStats.id)).scalar()
-        real_estate_count = db.session.query(func.count(RealEstateStats.id)).scalar()
-        employment_count = db.session.query(func.count(EmploymentStats.id)).scalar()
-        business_count = db.session.query(func.count(BusinessStats.id)).scalar()
+        agri_count = counters['agriculture']
+        real_estate_count = counters['real_estate']
+        employment_count = counters['employment']
+        business_count = counters['business']
 
         total_data_points = agri_count + real_estate_count + employment_count + business_count
 
-        # Count active API keys (keys that are active and not expired)
-        active_keys_count = db.session.query(func.count(ApiKey.id)).filter(
-            ApiKey.is_active == True
-        ).scalar()
-
         # Data sources count (fixed - FAOSTAT, World Bank, ILOSTAT, OpenStreetMap)
         data_sources_count = 4
 
         return {
-            'communes': communes_count,
+            'communes': counters['communes'],
             'data_sources': data_sources_count,
             'data_points': total_data_points,
-            'active_users': active_keys_count,
+            'active_users': counters['active_users'],
             'breakdown': {
                 'agriculture': agri_count,
                 'real_estate': real_estate_count,
@@ -65,10 +59,15 @@ class PublicCommunes(Resource):
     """Get public list of communes for map display"""
 
     @ns.doc('get_public_communes')
+    @prebuilt_payload(max_age=3600)
     def get(self):
         """Get list of communes with coordinates for landing page map"""
-        communes = db.session.query(Commune).all()
-        
+        communes = db.session.query(
+            Commune.id, Commune.name, Commune.center_lat, Commune.center_lon,
+            Commune.population, Commune.area_km2,
+            Region.id.label('region_id'), Region.name.label('region_name')
+        ).outerjoin(Commune.region).order_by(Commune.id).all()
+
         return {
             'data': [
                 {
@@ -79,71 +78,38 @@ class PublicCommunes(Resource):
                     'population': c.population,
                     'area_km2': c.area_km2,
                     'region': {
-                        'id': c.region.id if c.region else None,
-                        'name': c.region.name if c.region else None
-                    } if c.region else None
+                        'id': c.region_id,
+                        'name': c.region_name
+                    } if c.region_id is not None else None
                 }
                 for c in communes
             ]
         }
 
 
+@ns.route('/communes/summary')
+class PublicCommuneSummaries(Resource):
+    """Get summary statistics for every commune (public)"""
+
+    @ns.doc('get_commune_summaries')
+    @cached_response(policy='public', max_age=300)
+    def get(self):
+        """Get the summaries of all communes in one call - for map preloading"""
+        return {
+            'data': get_all_commune_summaries()
+        }
+
+
 @ns.route('/communes/<int:commune_id>/summary')
 class PublicCommuneSummary(Resource):
     """Get summary statistics for a commune (public)"""
 
     @ns.doc('get_commune_summary')
+    @cached_response(policy='public', max_age=300)
     def get(self, commune_id):
         """Get basic statistics summary for a commune - for landing page"""
-        commune = db.session.query(Commune).get(commune_id)
-        if not commune:
+        summary = get_commune_summary(commune_id)
+        if not summary:
             return {'error': 'Commune not found'}, 404
 
-        # Count records per sector for this commune
-        agri_count = db.session.query(func.count(AgriStats.id)).filter(
-            AgriStats.commune_id == commune_id
-        ).scalar()
-        
-        real_estate_count = db.session.query(func.count(RealEstateStats.id)).filter(
-            RealEstateStats.commune_id == commune_id
-        ).scalar()
-        
-        employment_count = db.session.query(func.count(EmploymentStats.id)).filter(
-            EmploymentStats.commune_id == commune_id
-        ).scalar()
-        
-        business_count = db.session.query(func.count(BusinessStats.id)).filter(
-            BusinessStats.commune_id == commune_id
-        ).scalar()
-
-        # Get top crops for this commune
-        top_crops_query = db.session.query(
-            AgriStats.crop_id,
-            func.count(AgriStats.id).label('count')
-        ).filter(
-            AgriStats.commune_id == commune_id
-        ).group_by(AgriStats.crop_id).order_by(func.count(AgriStats.id).desc()).limit(3).all()
-
-        top_crops = []
-        for crop_id, count in top_crops_query:
-            from app.models.agriculture import Crop
-            crop = db.session.query(Crop).get(crop_id)
-            if crop:
-                top_crops.append(crop.name)
-
-        return {
-            'commune': {
-                'id': commune.id,
-                'name': commune.name,
-                'population': commune.population,
-                'area_km2': commune.area_km2
-            },
-            'statistics': {
-                'agriculture': agri_count,
-                'real_estate': real_estate_count,
-                'employment': employment_count,
-                'business': business_count,
-                'total': agri_count + real_estate_count + employment_count + business_count
-            },
-            'top_crops': top_crops
-        }
\ No newline at end of file
+        return summary
@@ -1,15 +1,18 @@
 """
 Real Estate API routes
 """
-from flask import request
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
-from sqlalchemy import and_, func
+from sqlalchemy import and_
 import json
 
-from app import db
-from app.models.geo import Commune
 from app.models.realestate import PropertyType, RealEstateStats
+from app.services.aggregation import get_aggregation_engine
+from app.services.batch_lookup import InvalidBatch, batch_lookup, parse_keys
 from app.utils.auth import require_api_key
+from app.utils.pagination import InvalidCursor, index_serializer, paginate_index
+from app.utils.response_cache import cached_response
+from app.utils.serializer import InvalidFields, get_serializer
 
 # Create namespace
 ns = Namespace('realestate', description='Real Estate data operations')
@@ -43,6 +46,12 @@ real_estate_stats_model = ns.model('RealEstateStats', {
     'development_potential': fields.String(description='Development potential'),
 })
 
+batch_request_model = ns.model('RealEstateStatsBatchRequest', {
+    'keys': fields.List(fields.Raw, required=True,
+                        description='Keys of (commune_id, property_type_id, year, quarter), e.g. {"commune_id": 1, "property_type_id": 2, "year": 2020, "quarter": null}'),
+    'fields': fields.String(description='Comma-separated columns and relations to return (default: all)'),
+})
+
 
 @ns.route('/property-types')
 class PropertyTypeList(Resource):
@@ -53,8 +62,7 @@ class PropertyTypeList(Resource):
     @require_api_key('realestate:read')
     def get(self):
         """List all property types"""
-        property_types = PropertyType.query.all()
-        return [pt.to_dict() for pt in property_types]
+        return get_serializer(PropertyType, fields=list(property_type_model)).fetch()
 
 
 @ns.route('/property-types/<int:property_type_id>')
@@ -88,7 +96,11 @@ class RealEstateIndex(Resource):
     @ns.param('price_trend', 'Filter by price trend', type='string', required=False)
     @ns.param('page', 'Page number', type='integer', required=False, default=1)
     @ns.param('per_page', 'Items per page', type='integer', required=False, default=50)
+    @ns.param('cursor', 'Cursor from a previous next_cursor (replaces page)', type='string', required=False)
+    @ns.param('total', 'Total count: exact, estimated or none', type='string', required=False)
+    @ns.param('fields', 'Comma-separated columns and relations to return (default: all)', type='string', required=False)
     @require_api_key('realestate:read')
+    @cached_response()
     def get(self):
         """
         Get real estate statistics with filters
@@ -132,25 +144,26 @@ class RealEstateIndex(Resource):
         if filters:
             query = query.filter(and_(*filters))
 
-        # Order by year and quarter descending
-        query = query.order_by(RealEstateStats.year.desc(), RealEstateStats.quarter.desc())
-
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        # Format response
-        data = [stat.to_dict(include_relations=True) for stat in pagination.items]
+        # Paginate: cursor seeks past the last row served, page uses OFFSET
+        try:
+            serializer = index_serializer(RealEstateStats, request.args.get('fields', type=str))
+            rows, metadata = paginate_index(
+                query, RealEstateStats, per_page, page=page,
+                cursor=request.args.get('cursor', type=str),
+                total=request.args.get('total', type=str),
+                serializer=serializer,
+            )
+        except InvalidFields as e:
+            ns.abort(400, str(e))
+        except InvalidCursor:
+            ns.abort(400, 'Invalid cursor. Use the next_cursor of a previous response.')
+
+        # Format response (plain column tuples, same shape as to_dict(include_relations=True))
+        data = serializer.to_dicts(rows)
 
         return {
             'data': data,
-            'metadata': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'total_pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev,
-            }
+            'metadata': metadata
         }, 200
 
 
@@ -193,6 +206,39 @@ class RealEstateStatsDetail(Resource):
         }, 200
 
 
+@ns.route('/index/batch')
+class RealEstateIndexBatch(Resource):
+    """Batch lookup of real estate statistics"""
+
+    @ns.doc('batch_realestate_stats')
+    @ns.expect(batch_request_model)
+    @require_api_key('realestate:read')
+    def post(self):
+        """
+        Get many real estate statistics by (commune_id, property_type_id, year, quarter)
+
+        Resolves up to MAX_BATCH_KEYS keys with a single query. Results are
+        returned in request order; keys without a record have found=false.
+        quarter may be null for annual rows.
+        """
+        payload = request.get_json(silent=True)
+        try:
+            keys = parse_keys(RealEstateStats, payload, current_app.config['MAX_BATCH_KEYS'])
+            results = batch_lookup(RealEstateStats, keys, fields=payload.get('fields'))
+        except (InvalidBatch, InvalidFields) as e:
+            ns.abort(400, str(e))
+
+        found = sum(1 for result in results if result['found'])
+        return {
+            'data': results,
+            'metadata': {
+                'requested': len(results),
+                'found': found,
+                'missing': len(results) - found
+            }
+        }, 200
+
+
 @ns.route('/stats/aggregated')
 class RealEstateAggregatedStats(Resource):
     """Aggregated Real Estate statistics for analytics"""
@@ -205,6 +251,7 @@ class RealEstateAggregatedStats(Resource):
     @ns.param('region_id', 'Filter by region ID', type='integer', required=False)
     @ns.param('group_by', 'Group results by: commune, property_type, year, or none', type='string', required=False)
     @require_api_key('realestate:read')
+    @cached_response()
     def get(self):
         """
         Get aggregated real estate statistics for analytics and visualization
@@ -219,236 +266,13 @@ class RealEstateAggregatedStats(Resource):
         region_id = request.args.get('region_id', type=int)
         group_by = request.args.get('group_by', 'none', type=str)
 
-        # Start with base query joining with commune for region filtering
-        query = db.session.query(
-            RealEstateStats,
-            Commune.name.label('commune_name'),
-            PropertyType.name.label('property_type_name')
-        ).join(Commune, RealEstateStats.commune_id == Commune.id)\
-         .join(PropertyType, RealEstateStats.property_type_id == PropertyType.id)
-
-        # Apply filters
-        filters = [
-            RealEstateStats.year >= year_from,
-            RealEstateStats.year <= year_to,
-        ]
-
-        if commune_id:
-            filters.append(RealEstateStats.commune_id == commune_id)
-        if property_type_id:
-            filters.append(RealEstateStats.property_type_id == property_type_id)
-        if region_id:
-            filters.append(Commune.region_id == region_id)
-
-        query = query.filter(and_(*filters))
-
-        # Execute query
-        results = query.all()
-
-        # Process results based on grouping
-        if group_by == 'commune':
-            return self._aggregate_by_commune(results), 200
-        elif group_by == 'property_type':
-            return self._aggregate_by_property_type(results), 200
-        elif group_by == 'year':
-            return self._aggregate_by_year(results), 200
-        else:
-            # No grouping - return overall KPIs
-            return self._calculate_overall_kpis(results), 200
-
-    def _calculate_overall_kpis(self, results):
-        """Calculate overall KPIs from all results"""
-        if not results:
-            return {
-                'kpis': {
-                    'avg_median_price': 0,
-                    'avg_price_per_sqm': 0,
-                    'total_transactions': 0,
-                    'avg_rental_yield': 0,
-                    'data_quality_avg': 0
-                },
-                'metadata': {'total_records': 0}
-            }
-
-        stats = [r[0] for r in results]
-        
-        # Calculate KPIs
-        prices = [s.median_price for s in stats if s.median_price]
-        price_sqm = [s.price_per_sqm for s in stats if s.price_per_sqm]
-        yields = [s.rental_yield for s in stats if s.rental_yield and s.rental_yield > 0]
-        qualities = [s.data_quality_score for s in stats if s.data_quality_score]
-        
-        kpis = {
-            'avg_median_price': sum(prices) / len(prices) if prices else 0,
-            'avg_price_per_sqm': sum(price_sqm) / len(price_sqm) if price_sqm else 0,
-            'total_transactions': sum([s.num_transactions or 0 for s in stats]),
-            'avg_rental_yield': sum(yields) / len(yields) if yields else 0,
-            'data_quality_avg': sum(qualities) / len(qualities) if qualities else 0
-        }
-
-        return {
-            'kpis': kpis,
-            'metadata': {
-                'total_records': len(stats),
-                'year_range': (min([s.year for s in stats]), max([s.year for s in stats])),
-                'num_communes': len(set([s.commune_id for s in stats])),
-                'num_property_types': len(set([s.property_type_id for s in stats]))
-            }
-        }
-
-    def _aggregate_by_commune(self, results):
-        """Aggregate statistics by commune"""
-        by_commune = {}
-        
-        for stat, commune_name, property_type_name in results:
-            commune_id = stat.commune_id
-            if commune_id not in by_commune:
-                by_commune[commune_id] = {
-                    'commune_id': commune_id,
-                    'commune_name': commune_name,
-                    'median_prices': [],
-                    'price_sqm': [],
-                    'transactions': [],
-                    'rental_yields': [],
-                    'quality_scores': []
-                }
-            
-            if stat.median_price:
-                by_commune[commune_id]['median_prices'].append(stat.median_price)
-            if stat.price_per_sqm:
-                by_commune[commune_id]['price_sqm'].append(stat.price_per_sqm)
-            if stat.num_transactions:
-                by_commune[commune_id]['transactions'].append(stat.num_transactions)
-            if stat.rental_yield and stat.rental_yield > 0:
-                by_commune[commune_id]['rental_yields'].append(stat.rental_yield)
-            if stat.data_quality_score:
-                by_commune[commune_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for commune_id, data in by_commune.items():
-            agg = {
-                'commune_id': data['commune_id'],
-                'commune_name': data['commune_name'],
-                'avg_median_price': sum(data['median_prices']) / len(data['median_prices']) if data['median_prices'] else 0,
-                'avg_price_per_sqm': sum(data['price_sqm']) / len(data['price_sqm']) if data['price_sqm'] else 0,
-                'total_transactions': sum(data['transactions']),
-                'avg_rental_yield': sum(data['rental_yields']) / len(data['rental_yields']) if data['rental_yields'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        # Sort by transaction count
-        aggregated.sort(key=lambda x: x['total_transactions'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'commune',
-                'total_communes': len(aggregated),
-                'records': len(results)
-            }
+        filters = {
+            'year_from': year_from,
+            'year_to': year_to,
+            'commune_id': commune_id,
+            'category_id': property_type_id,
+            'region_id': region_id,
         }
 
-    def _aggregate_by_property_type(self, results):
-        """Aggregate statistics by property type"""
-        by_type = {}
-        
-        for stat, commune_name, property_type_name in results:
-            prop_type_id = stat.property_type_id
-            if prop_type_id not in by_type:
-                by_type[prop_type_id] = {
-                    'property_type_id': prop_type_id,
-                    'property_type_name': property_type_name,
-                    'median_prices': [],
-                    'price_sqm': [],
-                    'transactions': [],
-                    'rental_yields': [],
-                    'quality_scores': []
-                }
-            
-            if stat.median_price:
-                by_type[prop_type_id]['median_prices'].append(stat.median_price)
-            if stat.price_per_sqm:
-                by_type[prop_type_id]['price_sqm'].append(stat.price_per_sqm)
-            if stat.num_transactions:
-                by_type[prop_type_id]['transactions'].append(stat.num_transactions)
-            if stat.rental_yield and stat.rental_yield > 0:
-                by_type[prop_type_id]['rental_yields'].append(stat.rental_yield)
-            if stat.data_quality_score:
-                by_type[prop_type_id]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for prop_type_id, data in by_type.items():
-            agg = {
-                'property_type_id': data['property_type_id'],
-                'property_type_name': data['property_type_name'],
-                'avg_median_price': sum(data['median_prices']) / len(data['median_prices']) if data['median_prices'] else 0,
-                'avg_price_per_sqm': sum(data['price_sqm']) / len(data['price_sqm']) if data['price_sqm'] else 0,
-                'total_transactions': sum(data['transactions']),
-                'avg_rental_yield': sum(data['rental_yields']) / len(data['rental_yields']) if data['rental_yields'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-
-        aggregated.sort(key=lambda x: x['total_transactions'], reverse=True)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'property_type',
-                'total_types': len(aggregated),
-                'records': len(results)
-            }
-        }
-
-    def _aggregate_by_year(self, results):
-        """Aggregate statistics by year"""
-        by_year = {}
-        
-        for stat, commune_name, property_type_name in results:
-            year = stat.year
-            if year not in by_year:
-                by_year[year] = {
-                    'year': year,
-                    'median_prices': [],
-                    'price_sqm': [],
-                    'transactions': [],
-                    'rental_yields': [],
-                    'quality_scores': []
-                }
-            
-            if stat.median_price:
-                by_year[year]['median_prices'].append(stat.median_price)
-            if stat.price_per_sqm:
-                by_year[year]['price_sqm'].append(stat.price_per_sqm)
-            if stat.num_transactions:
-                by_year[year]['transactions'].append(stat.num_transactions)
-            if stat.rental_yield and stat.rental_yield > 0:
-                by_year[year]['rental_yields'].append(stat.rental_yield)
-            if stat.data_quality_score:
-                by_year[year]['quality_scores'].append(stat.data_quality_score)
-
-        # Calculate aggregates
-        aggregated = []
-        for year in sorted(by_year.keys()):
-            data = by_year[year]
-            agg = {
-                'year': data['year'],
-                'avg_median_price': sum(data['median_prices']) / len(data['median_prices']) if data['median_prices'] else 0,
-                'avg_price_per_sqm': sum(data['price_sqm']) / len(data['price_sqm']) if data['price_sqm'] else 0,
-                'total_transactions': sum(data['transactions']),
-                'avg_rental_yield': sum(data['rental_yields']) / len(data['rental_yields']) if data['rental_yields'] else 0,
-                'data_quality': sum(data['quality_scores']) / len(data['quality_scores']) if data['quality_scores'] else 0
-            }
-            aggregated.append(agg)
-        
-        return {
-            'data': aggregated,
-            'metadata': {
-                'group_by': 'year',
-                'total_years': len(aggregated),
-                'records': len(results)
-            }
-        }
+        # No grouping (or unknown group_by) returns overall KPIs
+        return get_aggregation_engine('realestate').response(group_by, filters), 200
@@ -0,0 +1,437 @@
+"""
+Aggregation Service - Declarative /stats/aggregated engine
+
+Each sector declares its metrics once (SQL expression, null handling,
+weighting); the engine compiles filters + groupings into a single SQL
+statement (GROUPING SETS when several groupings are requested), caches
+the compiled statement per (sector, groupings, filters) shape and returns
+one dict per group. Nothing is computed per record in Python.
+
+Adding a metric to a sector = adding a Metric entry to its SectorSpec.
+"""
+import threading
+from typing import Dict, List
+
+from sqlalchemy import Float, and_, bindparam, case, cast, func, select, tuple_
+
+from app import db
+from app.models.agriculture import AgriStats, Crop
+from app.models.business import BusinessSector, BusinessStats
+from app.models.employment import EmploymentStats, JobCategory
+from app.models.geo import Commune
+from app.models.realestate import PropertyType, RealEstateStats
+from app.services.cube import get_cube
+
+
+class Metric:
+    """
+    One aggregated value
+
+    Args:
+        name: Output field name
+        column: Model column to aggregate (numerator for 'ratio')
+        agg: 'sum', 'avg', 'weighted_avg', 'ratio', 'median', 'percentiles'
+            or 'count_true' (records where the boolean column is true)
+        values: Null handling applied to column values before aggregating:
+            'all' (NULLs ignored), 'nonzero' (zeros ignored too),
+            'positive' (only > 0) or 'zero_filled' (NULL counts as 0)
+        weight: Weight column for 'weighted_avg', denominator for 'ratio'
+        percentiles: Percentiles for 'percentiles' (output in 'distribution')
+        default: Value returned when the aggregate is NULL (no data)
+    """
+
+    def __init__(self, name: str, column=None, agg: str = 'avg', values: str = 'all',
+                 weight=None, percentiles=(0.25, 0.5, 0.75), default=0):
+        self.name = name
+        self.column = column
+        self.agg = agg
+        self.values = values
+        self.weight = weight
+        self.percentiles = list(percentiles)
+        self.default = default
+
+    @property
+    def in_distribution(self) -> bool:
+        return self.agg == 'percentiles'
+
+    @property
+    def label(self) -> str:
+        """SQL column label (percentiles may share a name with a metric)"""
+        return f'{self.name}_pct' if self.in_distribution else self.name
+
+    def _values(self, column):
+        if self.values == 'nonzero':
+            return func.nullif(column, 0)
+        if self.values == 'positive':
+            return case((column > 0, column))
+        if self.values == 'zero_filled':
+            return func.coalesce(column, 0)
+        return column
+
+    def expression(self):
+        """SQL aggregate expression for this metric"""
+        value = self._values(self.column) if self.column is not None else None
+
+        if self.agg == 'sum':
+            return func.sum(value)
+        if self.agg == 'avg':
+            return func.avg(value)
+        if self.agg == 'median':
+            return func.percentile_cont(0.5).within_group(value)
+        if self.agg == 'percentiles':
+            from sqlalchemy.dialects.postgresql import array
+            return func.percentile_cont(array(self.percentiles)).within_group(value)
+        if self.agg == 'count_true':
+            return func.count().filter(self.column.is_(True))
+        if self.agg == 'ratio':
+            return func.sum(value) / func.nullif(cast(func.sum(self._values(self.weight)), Float), 0, type_=Float)
+        if self.agg == 'weighted_avg':
+            # Only rows with both a value and a weight take part
+            both = and_(self.column > 0, self.weight > 0) if self.values == 'positive' else \
+                and_(self.column.isnot(None), self.weight.isnot(None))
+            return func.sum(self.column * self.weight).filter(both) / \
+                func.nullif(cast(func.sum(self.weight).filter(both), Float), 0, type_=Float)
+        raise ValueError(f"Unknown aggregation: {self.agg}")
+
+    def format(self, value):
+        """Python value of the aggregate for a response"""
+        if self.in_distribution:
+            values = value or [None] * len(self.percentiles)
+            return {
+                f'p{int(p * 100)}': float(v) if v is not None else self.default
+                for p, v in zip(self.percentiles, values)
+            }
+        if value is None:
+            return self.default
+        return value if isinstance(value, int) else float(value)
+
+
+class SectorSpec:
+    """
+    Aggregation settings of one sector
+
+    Args:
+        name: Sector name
+        model: Stats model (has commune_id and year columns)
+        category_model: Category model joined for names (Crop, PropertyType, ...)
+        category_column: Category foreign key on the stats model
+        category: group_by value for the category ('crop', 'property_type', ...)
+        metrics: List of Metric
+        sort_by: Metric used to order commune/category groups (descending)
+        total_keys: Metadata key holding the number of groups, per group_by
+        num_categories_key: Metadata key for the distinct category count
+    """
+
+    def __init__(self, name, model, category_model, category_column, category, metrics,
+                 sort_by=None, total_keys=None, num_categories_key=None):
+        self.name = name
+        self.model = model
+        self.category_model = category_model
+        self.category_column = category_column
+        self.category = category
+        self.metrics = metrics
+        self.sort_by = sort_by
+        self.total_keys = total_keys or {}
+        self.num_categories_key = num_categories_key
+
+    def grouping_keys(self, grouping: str) -> list:
+        """[(expression, output name)] identifying a group; the first is the id"""
+        if grouping == 'commune':
+            return [(self.model.commune_id, 'commune_id'), (Commune.name, 'commune_name')]
+        if grouping == self.category:
+            return [
+                (self.category_column, f'{self.category}_id'),
+                (self.category_model.name, f'{self.category}_name'),
+            ]
+        if grouping == 'year':
+            return [(self.model.year, 'year')]
+        raise ValueError(f"Unknown grouping: {grouping}")
+
+    def filter_expression(self, name: str):
+        """Filter by name, with a bound parameter of the same name"""
+        model = self.model
+        filters = {
+            'year_from': lambda: model.year >= bindparam('year_from'),
+            'year_to': lambda: model.year <= bindparam('year_to'),
+            'commune_id': lambda: model.commune_id == bindparam('commune_id'),
+            'commune_ids': lambda: model.commune_id.in_(bindparam('commune_ids', expanding=True)),
+            'category_id': lambda: self.category_column == bindparam('category_id'),
+            'category_ids': lambda: self.category_column.in_(bindparam('category_ids', expanding=True)),
+            'region_id': lambda: Commune.region_id == bindparam('region_id'),
+        }
+        if name not in filters:
+            raise ValueError(f"Unknown filter: {name}")
+        return filters[name]()
+
+
+class AggregationEngine:
+    """
+    Compiles and runs aggregation statements for a sector
+
+    Statements are built once per (groupings, filter names) shape and
+    reused with new parameter values. When the sector's statistics cube
+    is available the same rows are computed from it instead.
+    """
+
+    SUMMARY = 'summary'
+
+    def __init__(self, spec: SectorSpec):
+        self.spec = spec
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def aggregate(self, groupings: List[str], filters: Dict) -> Dict[str, List[Dict]]:
+        """
+        Aggregate the records matching the filters
+
+        Args:
+            groupings: 'summary' and/or group_by values ('commune', 'year', category)
+            filters: Filter name -> value; None values are ignored
+
+        Returns:
+            Dictionary of grouping -> list of group dicts (one dict for 'summary')
+        """
+        params = {name: value for name, value in filters.items() if value is not None and value != []}
+
+        cube = get_cube(self.spec)
+        if cube is not None:
+            rows = cube.aggregate(self.spec, groupings, params)
+            return {
+                grouping: [self._format_row(row, grouping) for row in rows[grouping]]
+                for grouping in groupings
+            }
+
+        statement, masks = self._statement(tuple(groupings), tuple(sorted(params)))
+
+        results = {grouping: [] for grouping in groupings}
+        for row in db.session.execute(statement, params).mappings():
+            grouping = masks[row['grouping_mask']] if masks else groupings[0]
+            results[grouping].append(self._format_row(row, grouping))
+        return results
+
+    def _format_row(self, row, grouping: str) -> Dict:
+        data = {}
+        if grouping != self.SUMMARY:
+            for _, name in self.spec.grouping_keys(grouping):
+                data[name] = row[name]
+
+        distribution = {}
+        for metric in self.spec.metrics:
+            value = metric.format(row[metric.label])
+            if metric.in_distribution:
+                distribution[metric.name] = value
+            else:
+                data[metric.name] = value
+        if distribution:
+            data['distribution'] = distribution
+
+        for name in ('records', 'year_min', 'year_max', 'num_communes', 'num_categories'):
+            data[f'_{name}'] = row[name]
+        return data
+
+    def _statement(self, groupings: tuple, filter_names: tuple):
+        key = (groupings, filter_names)
+        cached = self._statements.get(key)
+        if cached is not None:
+            return cached
+
+        spec = self.spec
+        grouped = [g for g in groupings if g != self.SUMMARY]
+        key_sets = {g: spec.grouping_keys(g) for g in grouped}
+
+        columns = []
+        masks = {}
+        if len(groupings) > 1:
+            # grouping() sets bit (n - 1 - i) when the i-th key is not grouped
+            n = len(grouped)
+            columns.append(func.grouping(*[key_sets[g][0][0] for g in grouped]).label('grouping_mask'))
+            for i, grouping in enumerate(grouped):
+                masks[((1 << n) - 1) & ~(1 << (n - 1 - i))] = grouping
+            if self.SUMMARY in groupings:
+                masks[(1 << n) - 1] = self.SUMMARY
+
+        for grouping in grouped:
+            for expression, name in key_sets[grouping]:
+                columns.append(expression.label(name))
+
+        columns.extend(metric.expression().label(metric.label) for metric in spec.metrics)
+        columns.extend([
+            func.count().label('records'),
+            func.min(spec.model.year).label('year_min'),
+            func.max(spec.model.year).label('year_max'),
+            func.count(func.distinct(spec.model.commune_id)).label('num_communes'),
+            func.count(func.distinct(spec.category_column)).label('num_categories'),
+        ])
+
+        statement = select(*columns)\
+            .select_from(spec.model)\
+            .join(Commune, spec.model.commune_id == Commune.id)\
+            .join(spec.category_model, spec.category_column == spec.category_model.id)
+
+        if filter_names:
+            statement = statement.where(and_(*[spec.filter_expression(name) for name in filter_names]))
+
+        if len(groupings) > 1:
+            statement = statement.group_by(func.grouping_sets(*[
+                tuple_(*[expression for expression, _ in key_sets[g]]) if g != self.SUMMARY else tuple_()
+                for g in groupings
+            ]))
+        elif grouped:
+            statement = statement.group_by(*[expression for expression, _ in key_sets[grouped[0]]])
+
+        with self._lock:
+            self._statements[key] = (statement, masks)
+        return statement, masks
+
+    def response(self, group_by: str, filters: Dict) -> Dict:
+        """
+        Standard /stats/aggregated response
+
+        group_by 'none' (or unknown) returns overall KPIs; 'commune',
+        'year' and the sector category return one entry per group.
+        """
+        spec = self.spec
+
+        if group_by not in ('commune', 'year', spec.category):
+            summary = self.aggregate([self.SUMMARY], filters)[self.SUMMARY][0]
+            metadata = _pop_internal(summary)
+            distribution = summary.pop('distribution', None)
+            kpis = dict(summary)
+            kpis['data_quality_avg'] = kpis.pop('data_quality', 0)
+
+            response = {'kpis': kpis}
+            if distribution is not None:
+                response['distribution'] = distribution
+
+            if not metadata['records']:
+                response['metadata'] = {'total_records': 0}
+                return response
+
+            response['metadata'] = {
+                'total_records': metadata['records'],
+                'year_range': (metadata['year_min'], metadata['year_max']),
+                'num_communes': metadata['num_communes'],
+                spec.num_categories_key: metadata['num_categories'],
+            }
+            return response
+
+        results = self.aggregate([group_by, self.SUMMARY], filters)
+        groups = results[group_by]
+        summary = results[self.SUMMARY][0]
+        for group in groups:
+            _pop_internal(group)
+        records = _pop_internal(summary)['records']
+
+        if group_by == 'year':
+            groups.sort(key=lambda x: x['year'])
+        elif spec.sort_by:
+            groups.sort(key=lambda x: x[spec.sort_by], reverse=True)
+
+        response = {'data': groups}
+        if 'distribution' in summary:
+            response['distribution'] = summary['distribution']
+        response['metadata'] = {
+            'group_by': group_by,
+            spec.total_keys.get(group_by, 'total_groups'): len(groups),
+            'records': records,
+        }
+        return response
+
+
+def _pop_internal(data: Dict) -> Dict:
+    """Remove and return the engine's bookkeeping fields (_records, ...)"""
+    return {key[1:]: data.pop(key) for key in [k for k in data if k.startswith('_')]}
+
+
+# ============================================================================
+# SECTOR SPECS
+# ============================================================================
+
+SECTOR_SPECS = {
+    'agriculture': SectorSpec(
+        name='agriculture',
+        model=AgriStats,
+        category_model=Crop,
+        category_column=AgriStats.crop_id,
+        category='crop',
+        metrics=[
+            Metric('production_tonnes', AgriStats.production_tonnes, 'sum'),
+            Metric('area_ha', AgriStats.area_harvested_ha, 'sum'),
+            Metric('avg_yield', AgriStats.production_tonnes, 'ratio', weight=AgriStats.area_harvested_ha),
+            Metric('avg_price', AgriStats.price_per_kg, 'avg', values='zero_filled'),
+            Metric('avg_reported_price', AgriStats.price_per_kg, 'avg', values='nonzero'),
+            Metric('avg_quality', AgriStats.data_quality_score, 'avg', values='nonzero'),
+            Metric('estimated_records', AgriStats.is_estimated, 'count_true'),
+        ],
+        sort_by='production_tonnes',
+        total_keys={'commune': 'total_communes', 'crop': 'total_crops', 'year': 'total_years'},
+        num_categories_key='num_crops',
+    ),
+    'realestate': SectorSpec(
+        name='realestate',
+        model=RealEstateStats,
+        category_model=PropertyType,
+        category_column=RealEstateStats.property_type_id,
+        category='property_type',
+        metrics=[
+            Metric('avg_median_price', RealEstateStats.median_price, 'avg', values='nonzero'),
+            Metric('median_price', RealEstateStats.median_price, 'median', values='nonzero'),
+            Metric('avg_price_per_sqm', RealEstateStats.price_per_sqm, 'avg', values='nonzero'),
+            Metric('weighted_price_per_sqm', RealEstateStats.price_per_sqm, 'weighted_avg',
+                   values='positive', weight=RealEstateStats.num_transactions),
+            Metric('total_transactions', RealEstateStats.num_transactions, 'sum'),
+            Metric('avg_rental_yield', RealEstateStats.rental_yield, 'avg', values='positive'),
+            Metric('data_quality', RealEstateStats.data_quality_score, 'avg', values='nonzero'),
+            Metric('median_price', RealEstateStats.median_price, 'percentiles', values='nonzero'),
+            Metric('price_per_sqm', RealEstateStats.price_per_sqm, 'percentiles', values='nonzero'),
+        ],
+        sort_by='total_transactions',
+        total_keys={'commune': 'total_communes', 'property_type': 'total_types', 'year': 'total_years'},
+        num_categories_key='num_property_types',
+    ),
+    'employment': SectorSpec(
+        name='employment',
+        model=EmploymentStats,
+        category_model=JobCategory,
+        category_column=EmploymentStats.job_category_id,
+        category='job_category',
+        metrics=[
+            Metric('total_employed', EmploymentStats.total_employed, 'sum'),
+            Metric('avg_unemployment_rate', EmploymentStats.unemployment_rate, 'avg', values='nonzero'),
+            Metric('avg_informal_rate', EmploymentStats.informal_rate, 'avg', values='nonzero'),
+            Metric('avg_median_salary', EmploymentStats.median_salary, 'avg', values='positive'),
+            Metric('data_quality', EmploymentStats.data_quality_score, 'avg', values='nonzero'),
+        ],
+        sort_by='total_employed',
+        total_keys={'commune': 'total_communes', 'job_category': 'total_categories', 'year': 'total_years'},
+        num_categories_key='num_job_categories',
+    ),
+    'business': SectorSpec(
+        name='business',
+        model=BusinessStats,
+        category_model=BusinessSector,
+        category_column=BusinessStats.sector_id,
+        category='sector',
+        metrics=[
+            Metric('total_businesses', BusinessStats.num_businesses, 'sum'),
+            Metric('total_revenue', BusinessStats.total_revenue, 'sum', values='positive'),
+            Metric('total_employees', BusinessStats.total_employees, 'sum'),
+            Metric('avg_birth_rate', BusinessStats.business_birth_rate, 'avg', values='nonzero'),
+            Metric('avg_formality_rate', BusinessStats.formality_rate, 'avg', values='nonzero'),
+            Metric('data_quality', BusinessStats.data_quality_score, 'avg', values='nonzero'),
+        ],
+        sort_by='total_businesses',
+        total_keys={'commune': 'total_communes', 'sector': 'total_sectors', 'year': 'total_years'},
+        num_categories_key='num_sectors',
+    ),
+}
+
+_engines = {}
+
+
+def get_aggregation_engine(sector: str) -> AggregationEngine:
+    """Get the (statement-caching) aggregation engine of a sector"""
+    engine = _engines.get(sector)
+    if engine is None:
+        engine = _engines.setdefault(sector, AggregationEngine(SECTOR_SPECS[sector]))
+    return engine
@@ -0,0 +1,119 @@
+"""
+Batch lookup of stats records by natural key
+
+POST /<sector>/index/batch resolves many (commune, category, year
+[, quarter]) keys in one statement: the keys are sent as a VALUES list
+joined to the stats table on its unique constraint, instead of one HTTP
+call (auth, rate limiting, query) per record. Results come back in
+request order with a per-key found flag.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, UniqueConstraint, and_, cast, column, values
+
+from app.utils.serializer import get_serializer, parse_fields
+
+
+class InvalidBatch(ValueError):
+    """Malformed batch request body"""
+    pass
+
+
+def natural_key(model) -> List[str]:
+    """Columns of the model's natural unique constraint"""
+    for constraint in model.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return [c.name for c in constraint.columns]
+    raise ValueError(f'{model.__name__} has no unique constraint')
+
+
+def parse_keys(model, payload, max_keys: int) -> List[Tuple]:
+    """
+    Validate the keys of a batch request body
+
+    Args:
+        model: Stats model
+        payload: Request JSON ({'keys': [{'commune_id': 1, ...}, ...]})
+        max_keys: Maximum number of keys
+
+    Returns:
+        Key tuples in request order (quarter may be None for annual rows)
+
+    Raises:
+        InvalidBatch: If the body or a key is malformed
+    """
+    names = natural_key(model)
+    keys = payload.get('keys') if isinstance(payload, dict) else None
+    if not isinstance(keys, list) or not keys:
+        raise InvalidBatch(f"Body must be {{'keys': [...]}} with objects of {', '.join(names)}")
+    if len(keys) > max_keys:
+        raise InvalidBatch(f'Too many keys: {len(keys)} (max {max_keys})')
+
+    parsed = []
+    for i, key in enumerate(keys):
+        if not isinstance(key, dict):
+            raise InvalidBatch(f'Key {i} must be an object')
+        key_values = []
+        for name in names:
+            value = key.get(name)
+            if value is None and name == 'quarter':
+                key_values.append(None)
+                continue
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise InvalidBatch(f'Key {i}: {name} must be an integer')
+            key_values.append(value)
+        parsed.append(tuple(key_values))
+    return parsed
+
+
+def batch_lookup(model, keys: Sequence[Tuple], fields: Optional[str] = None) -> List[Dict]:
+    """
+    Resolve keys with a single VALUES join
+
+    Args:
+        model: Stats model
+        keys: Key tuples from parse_keys()
+        fields: fields= projection (default: all columns and relations)
+
+    Returns:
+        One {'key', 'found', 'data'} entry per requested key, in order
+
+    Raises:
+        InvalidBatch: If fields is not a string
+        InvalidFields: If fields names unknown columns or relations
+    """
+    if fields is not None and not isinstance(fields, str):
+        raise InvalidBatch('fields must be a comma-separated string')
+
+    names = natural_key(model)
+    columns, relations = parse_fields(model, fields)
+    serializer = get_serializer(model, fields=columns, include_relations=relations, hidden=names)
+
+    unique_keys = list(dict.fromkeys(keys))
+    requested = values(*[column(name, Integer) for name in names], name='requested_keys').data(unique_keys)
+    conditions = []
+    for name in names:
+        # An all-NULL VALUES column is untyped
+        value = cast(requested.c[name], Integer)
+        if model.__table__.c[name].nullable:
+            # quarter is NULL for annual rows
+            conditions.append(getattr(model, name).is_not_distinct_from(value))
+        else:
+            conditions.append(getattr(model, name) == value)
+    query = model.query.join(requested, and_(*conditions))
+
+    rows = serializer.apply(query).all()
+    items = dict(zip(
+        [tuple(getattr(row, name) for name in names) for row in rows],
+        serializer.to_dicts(rows)
+    ))
+
+    results = []
+    for key in keys:
+        item = items.get(key)
+        results.append({
+            'key': dict(zip(names, key)),
+            'found': item is not None,
+            'data': item,
+        })
+    return results
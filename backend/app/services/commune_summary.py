@@ -0,0 +1,107 @@
+"""
+Commune Summary Service - landing-page map summaries
+
+One statement returns, per commune, the record count of every sector and
+its most frequent crops: each sector is counted in a grouped subquery
+LEFT JOINed to communes, and the top crops are ranked with a window
+function and aggregated into an array with their names. The same
+statement serves one commune (map click) or all of them (map preload).
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app import db
+from app.models.agriculture import AgriStats, Crop
+from app.models.business import BusinessStats
+from app.models.employment import EmploymentStats
+from app.models.geo import Commune
+from app.models.realestate import RealEstateStats
+
+TOP_CROPS = 3
+
+SECTOR_MODELS = {
+    'agriculture': AgriStats,
+    'real_estate': RealEstateStats,
+    'employment': EmploymentStats,
+    'business': BusinessStats,
+}
+
+
+@lru_cache(maxsize=None)
+def _summary_statement(single: bool):
+    """Summary statement, for one commune (:commune_id) or all of them"""
+    def restrict(query, column):
+        return query.where(column == bindparam('commune_id')) if single else query
+
+    statement = select(Commune.id, Commune.name, Commune.population, Commune.area_km2)
+    from_clause = Commune.__table__
+
+    for sector, model in SECTOR_MODELS.items():
+        counts = restrict(
+            select(model.commune_id, func.count().label('records')).group_by(model.commune_id),
+            model.commune_id
+        ).subquery(f'{sector}_counts')
+        from_clause = from_clause.outerjoin(counts, counts.c.commune_id == Commune.id)
+        statement = statement.add_columns(func.coalesce(counts.c.records, 0).label(sector))
+
+    # Crops ranked by number of records per commune (ties broken by crop id)
+    crop_counts = restrict(
+        select(
+            AgriStats.commune_id,
+            AgriStats.crop_id,
+            func.row_number().over(
+                partition_by=AgriStats.commune_id,
+                order_by=(func.count().desc(), AgriStats.crop_id)
+            ).label('rank')
+        ).group_by(AgriStats.commune_id, AgriStats.crop_id),
+        AgriStats.commune_id
+    ).subquery('crop_counts')
+    top_crops = select(
+        crop_counts.c.commune_id,
+        func.array_agg(aggregate_order_by(Crop.name, crop_counts.c.rank)).label('top_crops')
+    ).select_from(
+        crop_counts.join(Crop, Crop.id == crop_counts.c.crop_id)
+    ).where(crop_counts.c.rank <= TOP_CROPS).group_by(crop_counts.c.commune_id).subquery('top_crops')
+    from_clause = from_clause.outerjoin(top_crops, top_crops.c.commune_id == Commune.id)
+    statement = statement.add_columns(top_crops.c.top_crops)
+
+    statement = statement.select_from(from_clause)
+    if single:
+        statement = statement.where(Commune.id == bindparam('commune_id'))
+    return statement.order_by(Commune.id)
+
+
+def _format_summary(row) -> Dict:
+    counts = {sector: getattr(row, sector) for sector in SECTOR_MODELS}
+    return {
+        'commune': {
+            'id': row.id,
+            'name': row.name,
+            'population': row.population,
+            'area_km2': row.area_km2
+        },
+        'statistics': {
+            **counts,
+            'total': sum(counts.values())
+        },
+        'top_crops': list(row.top_crops or [])
+    }
+
+
+def get_commune_summary(commune_id: int) -> Optional[Dict]:
+    """
+    Summary of one commune
+
+    Returns:
+        Summary dict, or None if the commune does not exist
+    """
+    row = db.session.execute(_summary_statement(True), {'commune_id': commune_id}).first()
+    return _format_summary(row) if row else None
+
+
+def get_all_commune_summaries() -> List[Dict]:
+    """Summaries of every commune, ordered by commune id"""
+    return [_format_summary(row) for row in db.session.execute(_summary_statement(False))]
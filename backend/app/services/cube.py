@@ -0,0 +1,480 @@
+"""
+Statistics Cube Service - Memory-mapped columnar cube per sector
+
+The stats tables are small and dense (communes x categories x years x
+quarters), so each sector is materialized as one dense NumPy array per
+source column, indexed [commune, category, year, quarter] (quarter slot 0
+holds yearly records). Filters become boolean masks over the axes and
+groupings become vectorized reductions, giving the same rows as the SQL
+statements of the aggregation engine.
+
+Layout under STATS_CUBE_DIR:
+    <sector>/CURRENT            version in use (replaced atomically)
+    <sector>/<version>/meta.json
+    <sector>/<version>/<column>.npy
+
+Files are opened with mmap_mode='r', so all processes on a host share one
+copy through the page cache. The version is a hash of the DatasetVersion
+checksums and of the sector table's size and last update: a build is a
+no-op until the data changes, and a new version is written to a fresh
+directory before CURRENT is swapped.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import Integer, func, literal, select
+
+from app import db
+from app.models.geo import Commune
+from app.models.metadata import DatasetVersion
+from app.utils.data_version import get_data_version
+
+AXES = ('commune', 'category', 'year', 'quarter')
+QUARTER_SLOTS = 5  # 0: yearly record, 1-4: quarters
+
+SUPPORTED_AGGREGATIONS = {'sum', 'avg', 'weighted_avg', 'ratio', 'median', 'percentiles', 'count_true'}
+SUPPORTED_FILTERS = {'year_from', 'year_to', 'commune_id', 'commune_ids', 'category_id', 'category_ids', 'region_id'}
+
+
+class CubeUnavailable(Exception):
+    """The sector's data cannot be represented as a cube"""
+    pass
+
+
+def source_columns(spec) -> list:
+    """Model columns read by the sector's metrics, in a stable order"""
+    columns = {}
+    for metric in spec.metrics:
+        for column in (metric.column, metric.weight):
+            if column is not None:
+                columns[column.key] = column
+    return list(columns.values())
+
+
+def supports(spec) -> bool:
+    """Whether every metric of the spec can be computed from the cube"""
+    return all(metric.agg in SUPPORTED_AGGREGATIONS for metric in spec.metrics)
+
+
+def cube_version(spec) -> str:
+    """
+    Version of the sector's data
+
+    Args:
+        spec: SectorSpec
+
+    Returns:
+        Short hex digest of the dataset checksums and table state
+    """
+    checksums = db.session.execute(
+        select(DatasetVersion.id, DatasetVersion.checksum).order_by(DatasetVersion.id)
+    ).all()
+    count, last_update = db.session.execute(
+        select(func.count(), func.max(spec.model.updated_at))
+    ).one()
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[i, c] for i, c in checksums]).encode())
+    digest.update(f"{spec.name}:{count}:{last_update}".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_cube(spec, directory: str, force: bool = False) -> str:
+    """
+    Build the sector's cube if its data version changed
+
+    A file lock makes concurrent callers (workers starting together) wait
+    for a single build.
+
+    Args:
+        spec: SectorSpec
+        directory: Cube root directory (STATS_CUBE_DIR)
+        force: Rebuild even if the current version is up to date
+
+    Returns:
+        Version now in use
+
+    Raises:
+        CubeUnavailable: If several records share a cube cell
+    """
+    sector_dir = os.path.join(directory, spec.name)
+    os.makedirs(sector_dir, exist_ok=True)
+
+    with open(os.path.join(sector_dir, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        version = cube_version(spec)
+        if not force and _read_pointer(sector_dir) == version:
+            return version
+
+        build_dir = tempfile.mkdtemp(prefix='.build-', dir=sector_dir)
+        try:
+            _write_cube(spec, build_dir, version)
+            target = os.path.join(sector_dir, version)
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            os.rename(build_dir, target)
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        _write_pointer(sector_dir, version)
+
+        # Mapped files stay readable after unlink, so old versions can go
+        for name in os.listdir(sector_dir):
+            path = os.path.join(sector_dir, name)
+            if name != version and os.path.isdir(path) and not name.startswith('.build-'):
+                shutil.rmtree(path, ignore_errors=True)
+
+    return version
+
+
+def _write_cube(spec, path: str, version: str):
+    """Query the sector table and write meta.json and one .npy per column"""
+    model = spec.model
+    columns = source_columns(spec)
+    quarter = model.quarter if hasattr(model, 'quarter') else literal(None)
+
+    rows = db.session.execute(
+        select(model.commune_id, spec.category_column, model.year, quarter, *columns)
+    ).all()
+    communes = db.session.execute(
+        select(Commune.id, Commune.name, Commune.region_id).order_by(Commune.id)
+    ).all()
+    categories = db.session.execute(
+        select(spec.category_model.id, spec.category_model.name).order_by(spec.category_model.id)
+    ).all()
+
+    commune_ids = np.array([c.id for c in communes], dtype=np.int64)
+    category_ids = np.array([c.id for c in categories], dtype=np.int64)
+    values = list(zip(*rows)) if rows else [()] * (4 + len(columns))
+    years = np.array(values[2], dtype=np.int64)
+    year_min = int(years.min()) if len(years) else 0
+    shape = (len(commune_ids), len(category_ids), int(years.max()) - year_min + 1 if len(years) else 0, QUARTER_SLOTS)
+
+    index = np.ravel_multi_index((
+        np.searchsorted(commune_ids, np.array(values[0], dtype=np.int64)),
+        np.searchsorted(category_ids, np.array(values[1], dtype=np.int64)),
+        years - year_min,
+        np.array([q or 0 for q in values[3]], dtype=np.int64),
+    ), shape) if rows else np.array([], dtype=np.int64)
+
+    if len(np.unique(index)) != len(index):
+        raise CubeUnavailable(f"{spec.name}: several records per (commune, category, year, quarter)")
+
+    present = np.zeros(shape, dtype=bool)
+    present.flat[index] = True
+    np.save(os.path.join(path, 'present.npy'), present)
+
+    for column, column_values in zip(columns, values[4:]):
+        array = np.full(shape, np.nan)
+        array.flat[index] = np.array(
+            [np.nan if v is None else float(v) for v in column_values], dtype=np.float64
+        )
+        np.save(os.path.join(path, f'{column.key}.npy'), array)
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({
+            'sector': spec.name,
+            'version': version,
+            'built_at': datetime.utcnow().isoformat(),
+            'records': len(rows),
+            'shape': shape,
+            'columns': [column.key for column in columns],
+            'commune_ids': commune_ids.tolist(),
+            'commune_names': [c.name for c in communes],
+            'commune_regions': [c.region_id for c in communes],
+            'category_ids': category_ids.tolist(),
+            'category_names': [c.name for c in categories],
+            'year_min': year_min,
+        }, f)
+
+
+def current_version(spec, directory: str) -> Optional[str]:
+    """Cube version in use for a sector (None if none was built)"""
+    return _read_pointer(os.path.join(directory, spec.name))
+
+
+def _read_pointer(sector_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(sector_dir, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_pointer(sector_dir: str, version: str):
+    fd, tmp = tempfile.mkstemp(prefix='.CURRENT-', dir=sector_dir)
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(sector_dir, 'CURRENT'))
+
+
+class StatsCube:
+    """
+    Read-only cube of one sector, backed by memory-mapped .npy files
+
+    Args:
+        path: Version directory containing meta.json and the arrays
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.version = self.meta['version']
+        self.present = np.load(os.path.join(path, 'present.npy'), mmap_mode='r')
+        self.columns = {
+            key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r')
+            for key in self.meta['columns']
+        }
+        self.commune_ids = np.array(self.meta['commune_ids'], dtype=np.int64)
+        self.commune_regions = np.array(
+            [-1 if r is None else r for r in self.meta['commune_regions']], dtype=np.int64
+        )
+        self.category_ids = np.array(self.meta['category_ids'], dtype=np.int64)
+        self.years = np.arange(self.present.shape[2], dtype=np.int64) + self.meta['year_min']
+
+    def mask(self, filters: Dict) -> np.ndarray:
+        """Boolean mask of the records matching the filters"""
+        communes = np.ones(len(self.commune_ids), dtype=bool)
+        categories = np.ones(len(self.category_ids), dtype=bool)
+        years = np.ones(len(self.years), dtype=bool)
+
+        for name, value in filters.items():
+            if name == 'year_from':
+                years &= self.years >= value
+            elif name == 'year_to':
+                years &= self.years <= value
+            elif name == 'commune_id':
+                communes &= self.commune_ids == value
+            elif name == 'commune_ids':
+                communes &= np.isin(self.commune_ids, value)
+            elif name == 'category_id':
+                categories &= self.category_ids == value
+            elif name == 'category_ids':
+                categories &= np.isin(self.category_ids, value)
+            elif name == 'region_id':
+                communes &= self.commune_regions == value
+            else:
+                raise ValueError(f"Unknown filter: {name}")
+
+        return self.present & communes[:, None, None, None] & categories[None, :, None, None] \
+            & years[None, None, :, None]
+
+    def aggregate(self, spec, groupings: List[str], filters: Dict) -> Dict[str, List[Dict]]:
+        """
+        Same rows as the aggregation engine's SQL statement
+
+        Args:
+            spec: SectorSpec the cube was built from
+            groupings: 'summary' and/or group_by values
+            filters: Filter name -> value (None values already removed)
+
+        Returns:
+            Dictionary of grouping -> list of row mappings
+        """
+        mask = self.mask(filters)
+        axes = {'commune': 0, spec.category: 1, 'year': 2}
+
+        results = {}
+        for grouping in groupings:
+            axis = axes.get(grouping)
+            results[grouping] = self._aggregate_axis(spec, grouping, axis, mask)
+        return results
+
+    def _aggregate_axis(self, spec, grouping: str, axis: Optional[int], mask: np.ndarray) -> List[Dict]:
+        # Reshape to (groups, cells); the summary is a single group
+        def by_group(array):
+            if axis is None:
+                return array.reshape(1, -1)
+            return np.moveaxis(array, axis, 0).reshape(array.shape[axis], -1)
+
+        group_mask = by_group(mask)
+        records = group_mask.sum(axis=1)
+        if axis is None:
+            groups = np.array([0])
+        else:
+            groups = np.flatnonzero(records)
+            group_mask = group_mask[groups]
+            records = records[groups]
+
+        values = {}
+        for metric in spec.metrics:
+            values[metric.label] = self._reduce(metric, lambda key: by_group(self.columns[key])[groups], group_mask)
+
+        year_span = self._any_along(mask, axis, 2)[groups]
+        communes = self._any_along(mask, axis, 0)[groups].sum(axis=1)
+        categories = self._any_along(mask, axis, 1)[groups].sum(axis=1)
+
+        rows = []
+        for i, group in enumerate(groups):
+            years = self.years[year_span[i]]
+            row = {
+                'records': int(records[i]),
+                'year_min': int(years[0]) if len(years) else None,
+                'year_max': int(years[-1]) if len(years) else None,
+                'num_communes': int(communes[i]),
+                'num_categories': int(categories[i]),
+            }
+            for label, column in values.items():
+                row[label] = column[i]
+
+            if grouping == 'commune':
+                row['commune_id'] = int(self.commune_ids[group])
+                row['commune_name'] = self.meta['commune_names'][group]
+            elif grouping == spec.category:
+                row[f'{spec.category}_id'] = int(self.category_ids[group])
+                row[f'{spec.category}_name'] = self.meta['category_names'][group]
+            elif grouping == 'year':
+                row['year'] = int(self.years[group])
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _any_along(mask: np.ndarray, group_axis: Optional[int], dim_axis: int) -> np.ndarray:
+        """(groups, dim) matrix of which dim values have records in each group"""
+        if group_axis is None:
+            other = tuple(a for a in range(mask.ndim) if a != dim_axis)
+            return np.any(mask, axis=other)[None, :]
+        if group_axis == dim_axis:
+            other = tuple(a for a in range(mask.ndim) if a != dim_axis)
+            return np.diag(np.any(mask, axis=other))
+        other = tuple(a for a in range(mask.ndim) if a not in (group_axis, dim_axis))
+        matrix = np.any(mask, axis=other)
+        return matrix if group_axis < dim_axis else matrix.T
+
+    @staticmethod
+    def _reduce(metric, column, mask: np.ndarray) -> list:
+        """Per-group values of a metric (None where SQL would return NULL)"""
+
+        def selected(key, values='all'):
+            array = np.where(mask, column(key), np.nan)
+            if values == 'nonzero':
+                array[array == 0] = np.nan
+            elif values == 'positive':
+                array[~(array > 0)] = np.nan
+            elif values == 'zero_filled':
+                array = np.where(mask, np.nan_to_num(array), np.nan)
+            return array
+
+        def sums(array):
+            counts = np.sum(~np.isnan(array), axis=1)
+            return np.where(counts > 0, np.nansum(array, axis=1), np.nan), counts
+
+        def to_list(array):
+            return [None if np.isnan(v) else float(v) for v in array]
+
+        agg = metric.agg
+        if agg == 'count_true':
+            return [int(v) for v in np.sum(selected(metric.column.key) == 1, axis=1)]
+
+        if agg in ('weighted_avg', 'ratio'):
+            if agg == 'ratio':
+                numerator, _ = sums(selected(metric.column.key, metric.values))
+                denominator, _ = sums(selected(metric.weight.key, metric.values))
+            else:
+                value = selected(metric.column.key)
+                weight = selected(metric.weight.key)
+                both = (value > 0) & (weight > 0) if metric.values == 'positive' else \
+                    ~np.isnan(value) & ~np.isnan(weight)
+                numerator, _ = sums(np.where(both, value * weight, np.nan))
+                denominator, _ = sums(np.where(both, weight, np.nan))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return to_list(np.where(denominator != 0, numerator / denominator, np.nan))
+
+        array = selected(metric.column.key, metric.values)
+        if agg == 'sum':
+            total, _ = sums(array)
+            # SQL sums integer columns to integers
+            if isinstance(metric.column.type, Integer):
+                return [None if np.isnan(v) else int(v) for v in total]
+            return to_list(total)
+        if agg == 'avg':
+            total, counts = sums(array)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return to_list(total / counts)
+
+        # percentile_cont uses linear interpolation, like NumPy's default
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if agg == 'median':
+                return to_list(np.nanmedian(array, axis=1))
+            quantiles = np.nanquantile(array, metric.percentiles, axis=1)
+        return [
+            None if np.all(np.isnan(group)) else [None if np.isnan(v) else float(v) for v in group]
+            for group in quantiles.T
+        ]
+
+
+# Per-process cube state: sector -> (cube or None, last pointer check, data version then)
+_cubes = {}
+_builds_started = set()
+_lock = threading.Lock()
+
+
+def get_cube(spec) -> Optional[StatsCube]:
+    """
+    Current cube of a sector, or None to use SQL
+
+    The CURRENT pointer is re-read every STATS_CUBE_CHECK_SECONDS, and at
+    once when the data version changed: build_stats_cubes bumps it after
+    moving the pointers, so responses cached under a new data version are
+    never computed from the previous cube. When no cube exists yet, one
+    build is started in a background thread.
+    """
+    config = current_app.config
+    if not config.get('STATS_CUBE_ENABLED', True) or not supports(spec):
+        return None
+
+    data_version = get_data_version()
+    cube, checked_at, checked_version = _cubes.get(spec.name, (None, 0, None))
+    if (
+        time.monotonic() - checked_at < config.get('STATS_CUBE_CHECK_SECONDS', 5)
+        and data_version == checked_version
+    ):
+        return cube
+
+    sector_dir = os.path.join(config['STATS_CUBE_DIR'], spec.name)
+    version = _read_pointer(sector_dir)
+    if version is None:
+        _start_background_build(spec)
+    elif cube is None or cube.version != version:
+        try:
+            cube = StatsCube(os.path.join(sector_dir, version))
+        except (OSError, ValueError, KeyError):
+            cube = None
+
+    with _lock:
+        _cubes[spec.name] = (cube, time.monotonic(), data_version)
+    return cube
+
+
+def _start_background_build(spec):
+    with _lock:
+        if (os.getpid(), spec.name) in _builds_started:
+            return
+        _builds_started.add((os.getpid(), spec.name))
+
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                build_cube(spec, app.config['STATS_CUBE_DIR'])
+            except Exception as e:
+                app.logger.warning(f"Stats cube build failed for {spec.name}: {e}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name=f'cube-build-{spec.name}', daemon=True).start()
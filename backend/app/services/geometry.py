@@ -0,0 +1,150 @@
+"""
+Geometry Service - commune boundaries as GeoJSON
+
+Commune geometries are stored at three resolutions (see migration
+9d3f6c2a7e15):
+
+- full: communes.geometry
+- medium: tolerance 0.001° (~110 m)
+- low: tolerance 0.01° (~1.1 km)
+
+Simplified copies are rebuilt from a PostGIS topology of every commune,
+where each shared border is one edge simplified once, so neighbouring
+communes keep identical borders (no gaps or overlaps) at every resolution.
+The rebuild is a post-load step (rebuild_simplified_geometries, run by
+tasks.maintenance.rebuild_commune_geometries); loading or editing a
+commune geometry only resets its simplified copies.
+
+GeoJSON is rendered by PostGIS (ST_AsGeoJSON) with coordinates rounded
+to a precision matching the resolution, so no shape conversion happens
+in Python. Rows without a simplified copy (not rebuilt yet, or databases
+created with create_all rather than migrations) fall back to the full
+geometry.
+"""
+import json
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import exists, func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models.geo import Commune
+
+# Resolution -> (geometry column, GeoJSON decimal digits)
+RESOLUTIONS = {
+    'low': ('geometry_low', 3),
+    'medium': ('geometry_medium', 4),
+    'full': ('geometry', 6),
+}
+DEFAULT_RESOLUTION = 'medium'
+
+
+class InvalidResolution(ValueError):
+    """Unknown geometry resolution"""
+    pass
+
+
+def geojson_expression(resolution: str):
+    """
+    SQL expression rendering a commune's geometry as GeoJSON text
+
+    Raises:
+        InvalidResolution: If the resolution is unknown
+    """
+    if resolution not in RESOLUTIONS:
+        raise InvalidResolution(f"Unknown resolution: {resolution}. Available: {', '.join(RESOLUTIONS)}")
+
+    column_name, digits = RESOLUTIONS[resolution]
+    column = getattr(Commune, column_name)
+    if column_name != 'geometry':
+        column = func.coalesce(column, Commune.geometry)
+    return func.ST_AsGeoJSON(column, digits)
+
+
+def get_commune_geometries(commune_ids: Optional[Iterable[int]] = None,
+                           resolution: str = DEFAULT_RESOLUTION) -> Dict[int, Dict]:
+    """
+    GeoJSON geometries of communes
+
+    Args:
+        commune_ids: Communes to fetch (default: all)
+        resolution: 'low', 'medium' or 'full'
+
+    Returns:
+        Dictionary of commune id -> GeoJSON geometry (communes without
+        geometry are omitted)
+    """
+    statement = select(Commune.id, geojson_expression(resolution)).where(Commune.geometry.isnot(None))
+    if commune_ids is not None:
+        statement = statement.where(Commune.id.in_(list(commune_ids)))
+
+    return {commune_id: json.loads(geometry) for commune_id, geometry in db.session.execute(statement)}
+
+
+def get_communes_feature_collection(resolution: str = DEFAULT_RESOLUTION) -> Dict:
+    """
+    GeoJSON FeatureCollection of every commune with a geometry
+
+    Args:
+        resolution: 'low', 'medium' or 'full'
+    """
+    statement = select(
+        Commune.id, Commune.name, Commune.region_id, Commune.population, Commune.area_km2,
+        Commune.center_lat, Commune.center_lon,
+        geojson_expression(resolution).label('geojson')
+    ).where(Commune.geometry.isnot(None)).order_by(Commune.id)
+
+    features = []
+    for row in db.session.execute(statement):
+        features.append({
+            'type': 'Feature',
+            'id': row.id,
+            'geometry': json.loads(row.geojson),
+            'properties': {
+                'id': row.id,
+                'name': row.name,
+                'region_id': row.region_id,
+                'population': row.population,
+                'area_km2': row.area_km2,
+                'center_lat': row.center_lat,
+                'center_lon': row.center_lon,
+            }
+        })
+
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'metadata': {
+            'resolution': resolution,
+            'count': len(features)
+        }
+    }
+
+
+def rebuild_simplified_geometries(force: bool = False) -> Dict:
+    """
+    Rebuild the simplified commune geometries from the commune topology
+
+    Runs communes_rebuild_simplified_geometries() in its own transaction.
+    On failure the transaction is rolled back, so communes keep their
+    previous simplified geometries (or the full-geometry fallback).
+
+    Args:
+        force: Rebuild even if no commune geometry changed
+
+    Returns:
+        Dictionary with 'status' ('up_to_date', 'rebuilt' or 'failed'),
+        plus 'communes' (rebuilt count) or 'error'
+    """
+    stale = exists().where(Commune.geometry.isnot(None), Commune.geometry_medium.is_(None))
+    if not force and not db.session.execute(select(stale)).scalar():
+        return {'status': 'up_to_date'}
+
+    try:
+        communes = db.session.execute(text('SELECT communes_rebuild_simplified_geometries()')).scalar()
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return {'status': 'failed', 'error': str(e)}
+
+    return {'status': 'rebuilt', 'communes': communes}
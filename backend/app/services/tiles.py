@@ -0,0 +1,179 @@
+"""
+Tile Service - Mapbox Vector Tiles of commune geometries
+
+Tiles are rendered by PostGIS (ST_TileEnvelope / ST_AsMVTGeom / ST_AsMVT):
+geometries are clipped to the tile and quantized to its 4096 grid, so a
+tile weighs a few KB whatever the resolution of the stored polygons.
+Features carry the commune id and name, plus an optional sector metric
+('value') computed by the aggregation engine.
+
+Rendered tiles are cached as files under TILE_CACHE_DIR/<data version>/,
+so a data version bump invalidates them all; older versions are removed
+when the first tile of a new version is written.
+"""
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+from app.services.aggregation import SECTOR_SPECS, get_aggregation_engine
+
+LAYER_NAME = 'communes'
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+TILE_QUERY = text("""
+WITH bounds AS (
+    SELECT ST_TileEnvelope(:z, :x, :y) AS geom_3857,
+           ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS geom_4326
+),
+metric AS (
+    SELECT * FROM unnest(CAST(:commune_ids AS integer[]), CAST(:metric_values AS double precision[]))
+        AS m(commune_id, value)
+),
+features AS (
+    SELECT c.id,
+           c.name,
+           metric.value,
+           ST_AsMVTGeom(ST_Transform(c.geometry, 3857), bounds.geom_3857, :extent, :buffer, true) AS geom
+    FROM communes c
+    CROSS JOIN bounds
+    LEFT JOIN metric ON metric.commune_id = c.id
+    WHERE c.geometry && bounds.geom_4326
+)
+SELECT ST_AsMVT(features, :layer, :extent, 'geom', 'id')
+FROM features
+WHERE geom IS NOT NULL
+""")
+
+
+class InvalidTile(ValueError):
+    """Tile coordinates or metric that cannot be rendered"""
+    pass
+
+
+def validate_tile(z: int, x: int, y: int):
+    """
+    Check tile coordinates
+
+    Raises:
+        InvalidTile: If the tile does not exist at this zoom level
+    """
+    max_zoom = current_app.config.get('TILE_MAX_ZOOM', 18)
+    if not 0 <= z <= max_zoom:
+        raise InvalidTile(f'Zoom must be between 0 and {max_zoom}')
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise InvalidTile(f'Tile {z}/{x}/{y} does not exist')
+
+
+def validate_metric(sector: str, metric: str):
+    """
+    Check that a metric can be carried by tiles
+
+    Raises:
+        InvalidTile: If the sector or metric is unknown
+    """
+    spec = SECTOR_SPECS.get(sector)
+    if spec is None:
+        raise InvalidTile(f"Unknown sector: {sector}. Available: {', '.join(SECTOR_SPECS)}")
+    metrics = [m.name for m in spec.metrics if not m.in_distribution]
+    if metric not in metrics:
+        raise InvalidTile(f"Unknown metric: {metric}. Available: {', '.join(metrics)}")
+
+
+def metric_values(sector: str, metric: str, year: Optional[int] = None) -> Tuple[List[int], List[float]]:
+    """
+    Per-commune value of a sector metric
+
+    Args:
+        sector: Sector of SECTOR_SPECS
+        metric: Scalar metric of the sector (see /stats/aggregated kpis)
+        year: Restrict to one year (default: all years)
+
+    Returns:
+        (commune ids, values)
+
+    Raises:
+        InvalidTile: If the sector or metric is unknown
+    """
+    validate_metric(sector, metric)
+
+    rows = get_aggregation_engine(sector).aggregate(['commune'], {'year_from': year, 'year_to': year})['commune']
+    ids, values = [], []
+    for row in rows:
+        if row[metric] is not None:
+            ids.append(row['commune_id'])
+            values.append(float(row[metric]))
+    return ids, values
+
+
+def _cache_path(version: int, key: str, z: int, x: int, y: int) -> str:
+    return os.path.join(current_app.config['TILE_CACHE_DIR'], str(version), key, str(z), str(x), f'{y}.mvt')
+
+
+def _write_cached(path: str, tile: bytes, version: int):
+    version_dir = os.path.join(current_app.config['TILE_CACHE_DIR'], str(version))
+    first_of_version = not os.path.isdir(version_dir)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(tile)
+    os.replace(tmp_path, path)
+
+    if first_of_version:
+        # Tiles of previous data versions can no longer be served
+        root = current_app.config['TILE_CACHE_DIR']
+        for name in os.listdir(root):
+            if name != str(version) and name.isdigit():
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def get_tile(z: int, x: int, y: int, version: Optional[int], sector: Optional[str] = None,
+             metric: Optional[str] = None, year: Optional[int] = None) -> bytes:
+    """
+    Vector tile of the communes (empty bytes when no commune intersects it)
+
+    Args:
+        z, x, y: Tile coordinates (XYZ scheme)
+        version: Data version (None: render without caching)
+        sector, metric, year: Optional metric carried as the 'value' property
+
+    Raises:
+        InvalidTile: If the coordinates or metric are invalid
+    """
+    validate_tile(z, x, y)
+    if metric:
+        validate_metric(sector, metric)
+    key = f'{sector}.{metric}.{year or "all"}' if metric else 'base'
+
+    path = None
+    if version is not None:
+        path = _cache_path(version, key, z, x, y)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+    ids, values = metric_values(sector, metric, year) if metric else ([], [])
+    tile = db.session.execute(TILE_QUERY, {
+        'z': z, 'x': x, 'y': y,
+        'commune_ids': ids,
+        'metric_values': values,
+        'extent': TILE_EXTENT,
+        'buffer': TILE_BUFFER,
+        'layer': LAYER_NAME,
+    }).scalar()
+    tile = bytes(tile or b'')
+
+    if path is not None:
+        try:
+            _write_cached(path, tile, version)
+        except OSError as e:
+            current_app.logger.warning(f'Tile cache write failed: {e}')
+    return tile
@@ -110,6 +110,11 @@ class BaseIngestionTask(Task):
                             duration_seconds=ingestion_log.duration_seconds or 0
                         )
 
+            if (retval or {}).get('has_changes', False):
+                # Refresh the statistics cubes, then invalidate cached responses
+                from app.tasks.maintenance import build_stats_cubes
+                build_stats_cubes.delay(data_changed=True)
+
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """Called when task fails"""
         from app import create_app
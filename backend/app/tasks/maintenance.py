@@ -0,0 +1,149 @@
+"""
+Maintenance tasks
+
+Periodic housekeeping that keeps work off the API request path.
+"""
+from celery.signals import worker_ready
+from flask import current_app
+
+from app import celery
+from app.services.aggregation import SECTOR_SPECS
+from app.services.cube import CubeUnavailable, build_cube, current_version
+from app.services.geometry import rebuild_simplified_geometries
+from app.utils.api_key_usage import flush_api_key_usage as flush_usage_counters
+from app.utils.behavior_events import consume_behavior_events as analyze_behavior_events
+from app.utils.data_version import bump_data_version
+from app.utils.platform_counters import reconcile_counters
+
+
+@celery.task(name='tasks.maintenance.flush_api_key_usage')
+def flush_api_key_usage():
+    """
+    Flush write-behind API key usage counters from Redis to api_keys
+
+    Should run every few seconds to a minute; the interval is the maximum
+    lag of total_requests / last_used_at.
+
+    Returns:
+        Dictionary with flush statistics
+    """
+    stats = flush_usage_counters()
+
+    if stats['keys_updated']:
+        print(f"🔑 Flushed {stats['requests_flushed']} requests for {stats['keys_updated']} API keys")
+
+    return stats
+
+
+@celery.task(name='tasks.maintenance.consume_behavior_events')
+def consume_behavior_events():
+    """
+    Analyze request events queued by the anti-scraping middleware
+
+    Should run every few seconds; the interval bounds how long a scraper
+    can run before being blocked.
+
+    Returns:
+        Dictionary with consumer statistics
+    """
+    stats = analyze_behavior_events(
+        batch_size=current_app.config.get('BEHAVIOR_CONSUMER_BATCH_SIZE', 500)
+    )
+
+    if stats['blocked']:
+        print(f"🚫 Blocked {stats['blocked']} clients after analyzing {stats['events']} requests")
+
+    return stats
+
+
+@celery.task(name='tasks.maintenance.build_stats_cubes')
+def build_stats_cubes(force=False, data_changed=False):
+    """
+    Rebuild the memory-mapped statistics cubes whose data changed
+
+    Runs at worker start, after each successful ingestion and periodically
+    to pick up out-of-band loads; unchanged sectors are skipped.
+
+    The data version is bumped last, once the new cubes are in place, so
+    that responses cached under the new version are computed from the new
+    data. It is bumped when a cube changed or when the caller reports a
+    data change (ingestion), even if no cube could be built.
+
+    Args:
+        force: Rebuild every cube even if its data version is unchanged
+        data_changed: The data changed since the last build (bump the
+            data version in any case)
+
+    Returns:
+        Dictionary of sector -> cube version (None if unavailable)
+    """
+    directory = current_app.config['STATS_CUBE_DIR']
+    versions = {}
+    try:
+        for sector, spec in SECTOR_SPECS.items():
+            previous = current_version(spec, directory)
+            try:
+                versions[sector] = build_cube(spec, directory, force=force)
+            except CubeUnavailable as e:
+                print(f"⚠️  Stats cube skipped: {e}")
+                versions[sector] = None
+            if current_version(spec, directory) != previous:
+                data_changed = True
+    finally:
+        if data_changed:
+            bump_data_version()
+
+    return versions
+
+
+@celery.task(name='tasks.maintenance.rebuild_commune_geometries')
+def rebuild_commune_geometries(force=False):
+    """
+    Rebuild the simplified commune geometries after boundaries changed
+
+    Post-load step of commune boundary loads, kept out of the loading
+    transaction: a failed rebuild leaves the loaded communes and the
+    previous simplified geometries in place. Runs at worker start and
+    periodically; it is a no-op unless a commune geometry changed.
+
+    Args:
+        force: Rebuild even if no commune geometry changed
+
+    Returns:
+        Dictionary with the rebuild status
+    """
+    result = rebuild_simplified_geometries(force=force)
+
+    if result['status'] == 'rebuilt':
+        bump_data_version()
+        print(f"🗺️  Rebuilt simplified geometries of {result['communes']} communes")
+    elif result['status'] == 'failed':
+        print(f"⚠️  Commune geometry rebuild failed, keeping previous geometries: {result['error']}")
+
+    return result
+
+
+@celery.task(name='tasks.maintenance.reconcile_platform_counters')
+def reconcile_platform_counters():
+    """
+    Recount the /public/stats counters from the database
+
+    Counters are updated incrementally on commit; this corrects drift from
+    writes that bypass the ORM session or happen while Redis is down.
+
+    Returns:
+        Dictionary of counter -> value
+    """
+    return reconcile_counters()
+
+
+@worker_ready.connect
+def build_stats_cubes_on_start(sender=None, **kwargs):
+    """Build missing or stale cubes when a worker starts"""
+    build_stats_cubes.delay()
+
+
+@worker_ready.connect
+def rebuild_commune_geometries_on_start(sender=None, **kwargs):
+    """Rebuild stale simplified commune geometries when a worker starts"""
+    rebuild_commune_geometries.delay()
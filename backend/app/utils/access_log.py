@@ -0,0 +1,187 @@
+"""
+Buffered API access logging
+
+log_api_access only appends a tuple to a per-process ring buffer. A
+background thread encodes the records and writes them to the hourly
+access_log:<YYYY-mm-dd-HH> Redis lists in pipelined batches, when the
+batch size is reached or every flush interval. When Redis is slow or
+down the buffer fills up and new records are dropped and counted instead
+of blocking requests.
+
+Encodings:
+- json: one JSON object per record (default)
+- msgpack: positional array with a binary fingerprint, about 3x smaller
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Tuple
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+ACCESS_LOG_TTL = 86400 * 7  # Keep for 7 days
+ACCESS_LOG_STATS_KEY = 'access_log:stats'
+
+# Field order of msgpack records
+FIELDS = ('timestamp', 'ip', 'api_key', 'path', 'method', 'fingerprint', 'response_size', 'suspicious')
+
+
+def fingerprint(components: Tuple[str, ...]) -> bytes:
+    """MD5 digest of the request header components"""
+    return hashlib.md5('|'.join(components).encode()).digest()
+
+
+def encode_record(record: tuple, encoding: str = 'json'):
+    """
+    Encode a buffered record for storage
+
+    Args:
+        record: (timestamp, ip, api_key, path, method, header components,
+            response_size, suspicious)
+        encoding: 'json' or 'msgpack'
+    """
+    timestamp, ip, api_key, path, method, components, response_size, suspicious = record
+    digest = fingerprint(components)
+
+    if encoding == 'msgpack':
+        return msgpack.packb([
+            round(timestamp, 3), ip, api_key, path, method, digest, response_size, suspicious
+        ])
+
+    return json.dumps({
+        'timestamp': datetime.utcfromtimestamp(timestamp).isoformat(),
+        'ip': ip,
+        'api_key': api_key,
+        'path': path,
+        'method': method,
+        'fingerprint': digest.hex(),
+        'response_size': response_size,
+        'suspicious': suspicious,
+    })
+
+
+def decode_record(raw) -> Dict:
+    """
+    Decode an access log entry written with any encoding
+
+    msgpack entries must be read with a client created with
+    decode_responses=False.
+    """
+    if isinstance(raw, bytes) and raw[:1] != b'{':
+        values = dict(zip(FIELDS, msgpack.unpackb(raw)))
+        values['timestamp'] = datetime.utcfromtimestamp(values['timestamp']).isoformat()
+        values['fingerprint'] = values['fingerprint'].hex()
+        return values
+    return json.loads(raw)
+
+
+class AccessLogBuffer:
+    """
+    Per-process ring buffer of access log records flushed by a daemon thread
+
+    Args:
+        redis_client: Client used by the flusher thread
+        capacity: Maximum buffered records; newer records are dropped when full
+        batch_size: Buffered records that trigger an early flush
+        flush_interval_ms: Maximum delay before buffered records are written
+        encoding: 'json' or 'msgpack'
+    """
+
+    def __init__(self, redis_client, capacity: int = 10000, batch_size: int = 500,
+                 flush_interval_ms: int = 500, encoding: str = 'json'):
+        if encoding == 'msgpack' and msgpack is None:
+            encoding = 'json'
+
+        self.redis_client = redis_client
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.encoding = encoding
+
+        self.written = 0
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._records = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, record: tuple):
+        """Buffer a record without blocking (drops it if the buffer is full)"""
+        self._ensure_thread()
+
+        with self._lock:
+            if len(self._records) >= self.capacity:
+                self.dropped += 1
+                self._unreported_drops += 1
+                return
+            self._records.append(record)
+            full_batch = len(self._records) >= self.batch_size
+
+        if full_batch:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write buffered records to Redis in one pipeline"""
+        with self._lock:
+            if not self._records and not self._unreported_drops:
+                return 0
+            records, self._records = self._records, deque()
+            drops, self._unreported_drops = self._unreported_drops, 0
+
+        try:
+            by_key = {}
+            for record in records:
+                key = f"access_log:{datetime.utcfromtimestamp(record[0]).strftime('%Y-%m-%d-%H')}"
+                by_key.setdefault(key, []).append(encode_record(record, self.encoding))
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, values in by_key.items():
+                pipe.lpush(key, *values)
+                pipe.expire(key, ACCESS_LOG_TTL)
+            if drops:
+                pipe.hincrby(ACCESS_LOG_STATS_KEY, 'dropped', drops)
+            pipe.execute()
+        except Exception:
+            # Redis unavailable: drop the batch rather than hold memory
+            with self._lock:
+                self.dropped += len(records)
+                self._unreported_drops += drops + len(records)
+            return 0
+
+        self.written += len(records)
+        return len(records)
+
+    def stats(self) -> Dict:
+        """Buffer statistics for this process"""
+        return {
+            'buffered': len(self._records),
+            'written': self.written,
+            'dropped': self.dropped,
+            'encoding': self.encoding,
+        }
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so pre-forking servers get one per worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._records.clear()
+            self._thread = threading.Thread(target=self._run, name='access-log-flusher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -10,37 +10,329 @@ Implements multiple layers of protection:
 """
 
 import hashlib
+import math
+import os
 import random
+import threading
 import time
 import json
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from typing import Optional, Dict, Any, Tuple
 
-from flask import request, g, current_app, abort
+from flask import request, g, current_app, abort, has_request_context, has_app_context
+import numpy as np
 import redis
+from redis.client import Pipeline
+
+from app.utils.access_log import AccessLogBuffer, fingerprint
 
 # Redis connection for rate limiting
 _redis_client = None
 
 
+def _count_redis_call(commands: int = 1):
+    """Count one round trip (and its commands) against the current request"""
+    if has_request_context():
+        g.redis_round_trips = g.get('redis_round_trips', 0) + 1
+        g.redis_commands = g.get('redis_commands', 0) + commands
+
+
+class RedisUnavailable(redis.ConnectionError):
+    """Raised without calling Redis while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling Redis for a cool-down period after repeated failures
+    
+    closed -> open after `failure_threshold` consecutive connection or
+    timeout errors; open -> half-open after `recovery_timeout` seconds,
+    where one trial call decides whether to close or re-open.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 10):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.recovery_timeout:
+            return 'open'
+        return 'half-open'
+    
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        if self.opened_at is None:
+            return True
+        with self._lock:
+            if self.state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+        return False
+    
+    def record_success(self):
+        if self.failures or self.opened_at is not None:
+            with self._lock:
+                self.failures = 0
+                self.opened_at = None
+                self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def _guarded(breaker: Optional[CircuitBreaker], call):
+    """Run a Redis call through the circuit breaker"""
+    if breaker is None:
+        return call()
+    if not breaker.allow():
+        raise RedisUnavailable('Redis circuit breaker is open')
+    try:
+        result = call()
+    except (redis.ConnectionError, redis.TimeoutError):
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that counts one round trip per execute()"""
+    
+    breaker = None
+    
+    def execute(self, raise_on_error=True):
+        if not self.command_stack:
+            return super().execute(raise_on_error)
+        _count_redis_call(len(self.command_stack))
+        return _guarded(self.breaker, lambda: super(InstrumentedPipeline, self).execute(raise_on_error))
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client that counts round trips made while serving a request
+    
+    Counts are kept in g.redis_round_trips / g.redis_commands and exposed
+    as response headers when REDIS_CALL_HEADERS is enabled. Calls go
+    through an optional circuit breaker, so callers that swallow Redis
+    errors fail fast while Redis is down instead of waiting for timeouts.
+    """
+    
+    def __init__(self, *args, breaker: Optional[CircuitBreaker] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+    
+    def execute_command(self, *args, **options):
+        _count_redis_call()
+        return _guarded(self.breaker, lambda: super(InstrumentedRedis, self).execute_command(*args, **options))
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+        pipe.breaker = self.breaker
+        return pipe
+
+
 def get_redis_client():
-    """Get or create Redis client for rate limiting"""
+    """
+    Get or create Redis client for rate limiting
+    
+    Uses a bounded pool with short timeouts: anti-scraping checks are
+    best effort and must never hold a request for long.
+    """
     global _redis_client
     if _redis_client is None:
-        redis_url = current_app.config.get('REDIS_URL', 'redis://localhost:6379/0')
-        _redis_client = redis.from_url(redis_url, decode_responses=True)
+        config = current_app.config
+        pool = redis.BlockingConnectionPool.from_url(
+            config.get('REDIS_URL', 'redis://localhost:6379/0'),
+            decode_responses=True,
+            max_connections=config.get('REDIS_MAX_CONNECTIONS', 50),
+            timeout=config.get('REDIS_POOL_TIMEOUT', 0.1),
+            socket_connect_timeout=config.get('REDIS_SOCKET_CONNECT_TIMEOUT', 0.25),
+            socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 0.25),
+            health_check_interval=30,
+        )
+        _redis_client = InstrumentedRedis(
+            connection_pool=pool,
+            breaker=CircuitBreaker(
+                failure_threshold=config.get('REDIS_BREAKER_FAILURE_THRESHOLD', 5),
+                recovery_timeout=config.get('REDIS_BREAKER_RECOVERY_SECONDS', 10),
+            ),
+        )
     return _redis_client
 
 
+def _client_hash(ip: Optional[str]) -> str:
+    """Short stable hash of a client IP used in Redis key names"""
+    return hashlib.md5((ip or '').encode()).hexdigest()[:16]
+
+
+def _api_key_label(api_key: str) -> str:
+    """Masked API key for logs"""
+    return api_key[:8] + '...' if api_key != 'anon' else 'anon'
+
+
 # ============================================================================
 # RATE LIMITING
 # ============================================================================
 
+# GCRA (generic cell rate algorithm) over several windows in one atomic call.
+# KEYS: one theoretical-arrival-time (TAT) key per window
+# ARGV: period_seconds, limit, burst for each window (same order as KEYS)
+# Returns: {allowed, blocked_window_index, retry_after_seconds, remaining...}
+# TATs are only written when every window allows the request.
+RATE_LIMIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local allowed = 1
+local blocked_by = 0
+local retry_after = 0
+local tats = {}
+local intervals = {}
+local tolerances = {}
+
+for i = 1, #KEYS do
+    local period = tonumber(ARGV[(i - 1) * 3 + 1])
+    local limit = tonumber(ARGV[(i - 1) * 3 + 2])
+    local burst = tonumber(ARGV[(i - 1) * 3 + 3])
+    intervals[i] = period / limit
+    tolerances[i] = intervals[i] * burst
+
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    tats[i] = tat
+
+    local wait = tat + intervals[i] - now - tolerances[i]
+    if wait > 0 then
+        allowed = 0
+        if wait > retry_after then
+            retry_after = wait
+            blocked_by = i
+        end
+    end
+end
+
+local result = {allowed, blocked_by, math.ceil(retry_after)}
+for i = 1, #KEYS do
+    if allowed == 1 then
+        tats[i] = tats[i] + intervals[i]
+        redis.call('SET', KEYS[i], tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+    end
+    -- Small epsilon absorbs float error so a full bucket reports the exact quota
+    local left = math.floor((tolerances[i] - (tats[i] - now)) / intervals[i] + 1e-6)
+    result[#result + 1] = math.max(0, left)
+end
+return result
+"""
+
+_rate_limit_script = None
+
+
+def get_rate_limit_script():
+    """Get or register the GCRA rate limit script (EVALSHA with automatic reload)"""
+    global _rate_limit_script
+    if _rate_limit_script is None:
+        _rate_limit_script = get_redis_client().register_script(RATE_LIMIT_SCRIPT)
+    return _rate_limit_script
+
+
+class LocalRateLimiter:
+    """
+    In-process token buckets used while Redis is unreachable
+    
+    Each process only sees its own traffic, so limits are divided by the
+    number of processes serving the API (RATE_LIMIT_FALLBACK_PROCESSES)
+    to keep the overall rate roughly within bounds.
+    """
+    
+    def __init__(self, processes: int = 1, max_entries: int = 100000):
+        self.processes = max(1, processes)
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def check(self, keys: list, windows: list) -> list:
+        """
+        Same contract as RATE_LIMIT_SCRIPT
+        
+        Args:
+            keys: One bucket key per window
+            windows: (window_name, window_seconds, limit, burst) tuples
+        
+        Returns:
+            [allowed, blocked_window_index, retry_after_seconds, remaining...]
+        """
+        now = time.monotonic()
+        allowed, blocked_by, retry_after = 1, 0, 0
+        states = []
+        
+        with self._lock:
+            for i, (key, (_, window_seconds, limit, burst)) in enumerate(zip(keys, windows), start=1):
+                limit = max(1, limit // self.processes)
+                capacity = max(1, burst // self.processes)
+                rate = limit / window_seconds
+                
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                states.append((key, tokens))
+                
+                if tokens < 1:
+                    allowed = 0
+                    wait = (1 - tokens) / rate
+                    if wait > retry_after:
+                        retry_after, blocked_by = wait, i
+            
+            remaining = []
+            for key, tokens in states:
+                if allowed:
+                    tokens -= 1
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                remaining.append(int(tokens))
+            
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        
+        return [allowed, blocked_by, math.ceil(retry_after)] + remaining
+
+
+_local_rate_limiter = None
+
+
+def get_local_rate_limiter() -> LocalRateLimiter:
+    """Get or create the per-process fallback rate limiter"""
+    global _local_rate_limiter
+    if _local_rate_limiter is None:
+        _local_rate_limiter = LocalRateLimiter(
+            processes=current_app.config.get('RATE_LIMIT_FALLBACK_PROCESSES', 1)
+        )
+    return _local_rate_limiter
+
+
 class RateLimiter:
     """
-    Sliding window rate limiter using Redis
+    GCRA rate limiter using Redis
     Tracks requests per IP and per API key
+
+    The minute, hour and day windows are checked and updated atomically by
+    a single server-side script (one round trip per request). The minute
+    window accepts up to `burst` back-to-back requests; hour and day
+    windows accept their full quota as burst.
     """
     
     # Default limits
@@ -52,6 +344,12 @@ class RateLimiter:
     ANON_RATE_LIMIT_PER_MINUTE = 20
     ANON_RATE_LIMIT_PER_HOUR = 200
     ANON_RATE_LIMIT_PER_DAY = 1000
+    ANON_RATE_LIMIT_BURST = 20
+    
+    # Suspicion score at which an IP is blocked (raised to 50 to reduce false positives)
+    SUSPICION_BLOCK_THRESHOLD = 50
+    SCORE_BLOCK_REASON = "Too many suspicious requests detected"
+    HARD_BLOCK_REASON = "IP temporarily blocked"
     
     @staticmethod
     def get_client_identifier() -> Tuple[str, str]:
@@ -68,6 +366,31 @@ class RateLimiter:
         
         return ip, api_key
     
+    @staticmethod
+    def get_limits(api_key_info: Optional[Dict] = None) -> list:
+        """
+        Get (window_name, window_seconds, limit, burst) for each window
+
+        Args:
+            api_key_info: API key details from database (optional)
+        """
+        if api_key_info:
+            limit_hour = api_key_info.get('rate_limit_per_hour') or RateLimiter.DEFAULT_RATE_LIMIT_PER_HOUR
+            limit_day = api_key_info.get('rate_limit_per_day') or RateLimiter.DEFAULT_RATE_LIMIT_PER_DAY
+            limit_minute = max(1, limit_hour // 60)
+            burst = api_key_info.get('rate_limit_burst') or limit_minute
+        else:
+            limit_minute = RateLimiter.ANON_RATE_LIMIT_PER_MINUTE
+            limit_hour = RateLimiter.ANON_RATE_LIMIT_PER_HOUR
+            limit_day = RateLimiter.ANON_RATE_LIMIT_PER_DAY
+            burst = RateLimiter.ANON_RATE_LIMIT_BURST
+
+        return [
+            ('minute', 60, limit_minute, burst),
+            ('hour', 3600, limit_hour, limit_hour),
+            ('day', 86400, limit_day, limit_day),
+        ]
+
     @staticmethod
     def check_rate_limit(api_key_info: Optional[Dict] = None) -> Tuple[bool, Dict]:
         """
@@ -79,57 +402,41 @@ class RateLimiter:
         Returns:
             (allowed: bool, info: dict with remaining limits)
         """
-        try:
-            redis_client = get_redis_client()
-        except Exception:
-            # If Redis is unavailable, allow request but log
-            return True, {'error': 'rate_limiter_unavailable'}
-        
         ip, api_key = RateLimiter.get_client_identifier()
-        now = int(time.time())
         
-        # Determine limits based on authentication
         if api_key_info:
-            limit_minute = api_key_info.get('rate_limit_per_hour', 1000) // 60
-            limit_hour = api_key_info.get('rate_limit_per_hour', 1000)
-            limit_day = api_key_info.get('rate_limit_per_day', 10000)
             key_prefix = f"rate:{api_key[:16]}"
         else:
-            limit_minute = RateLimiter.ANON_RATE_LIMIT_PER_MINUTE
-            limit_hour = RateLimiter.ANON_RATE_LIMIT_PER_HOUR
-            limit_day = RateLimiter.ANON_RATE_LIMIT_PER_DAY
             key_prefix = f"rate:ip:{hashlib.md5(ip.encode()).hexdigest()[:16]}"
         
-        # Check each time window
-        windows = [
-            ('minute', 60, limit_minute),
-            ('hour', 3600, limit_hour),
-            ('day', 86400, limit_day),
-        ]
+        windows = RateLimiter.get_limits(api_key_info)
+        keys = [f"{key_prefix}:{window_name}" for window_name, _, _, _ in windows]
+        args = []
+        for _, window_seconds, limit, burst in windows:
+            args.extend([window_seconds, limit, burst])
         
         info = {
             'ip': ip,
             'authenticated': api_key_info is not None,
         }
         
-        for window_name, window_seconds, limit in windows:
-            key = f"{key_prefix}:{window_name}:{now // window_seconds}"
-            
-            try:
-                current = redis_client.incr(key)
-                if current == 1:
-                    redis_client.expire(key, window_seconds)
-                
-                info[f'{window_name}_remaining'] = max(0, limit - current)
-                info[f'{window_name}_limit'] = limit
-                
-                if current > limit:
-                    info['blocked_by'] = window_name
-                    info['retry_after'] = window_seconds - (now % window_seconds)
-                    return False, info
-                    
-            except Exception:
-                continue
+        try:
+            result = get_rate_limit_script()(keys=keys, args=args)
+        except Exception:
+            # Redis unavailable (or circuit open): per-process limits
+            result = get_local_rate_limiter().check(keys, windows)
+            info['fallback'] = 'local'
+        
+        allowed, blocked_by, retry_after, *remaining = result
+        
+        for (window_name, _, limit, _), window_remaining in zip(windows, remaining):
+            info[f'{window_name}_remaining'] = window_remaining
+            info[f'{window_name}_limit'] = limit
+        
+        if not allowed:
+            info['blocked_by'] = windows[blocked_by - 1][0]
+            info['retry_after'] = max(1, retry_after)
+            return False, info
         
         return True, info
     
@@ -143,33 +450,50 @@ class RateLimiter:
             severity: 1-5 scale (5 = most severe)
         """
         try:
-            redis_client = get_redis_client()
-            ip, api_key = RateLimiter.get_client_identifier()
-            
-            # Create suspicion score key
-            key = f"suspicious:{hashlib.md5(ip.encode()).hexdigest()[:16]}"
-            
-            # Increment suspicion score
-            score = redis_client.incr(key)
-            if score == 1:
-                redis_client.expire(key, 3600)  # Expire after 1 hour
-            
-            # Add severity multiplier
-            redis_client.incrby(key, severity - 1)
-            
-            # Log the event
-            log_key = f"suspicious_log:{ip}:{int(time.time())}"
-            redis_client.setex(log_key, 86400, json.dumps({
+            pipe = get_redis_client().pipeline(transaction=False)
+            RateLimiter._queue_suspicious_activity(pipe, [(reason, severity)])
+            pipe.execute()
+        except Exception:
+            pass
+    
+    @staticmethod
+    def _queue_suspicious_activity(pipe, events: list):
+        """
+        Queue suspicion score updates and log entries on a pipeline
+        
+        Args:
+            pipe: Redis pipeline
+            events: List of (reason, severity) tuples
+        """
+        ip, api_key = RateLimiter.get_client_identifier()
+        RateLimiter._queue_suspicious_events(
+            pipe, ip, _api_key_label(api_key), request.path, request.method, events, time.time()
+        )
+    
+    @staticmethod
+    def _queue_suspicious_events(pipe, ip: str, api_key_label: str, path: str,
+                                 method: str, events: list, timestamp: float):
+        """
+        Queue suspicion score updates and log entries for explicit request data
+        
+        The INCRBY result (new suspicion score) is the second queued command.
+        """
+        # Suspicion score expires 1 hour after the first event
+        key = f"suspicious:{_client_hash(ip)}"
+        pipe.set(key, 0, ex=3600, nx=True)
+        pipe.incrby(key, sum(severity for _, severity in events))
+        
+        # Log the events
+        log_key = f"suspicious_log:{ip}:{int(timestamp)}"
+        for reason, severity in events:
+            pipe.setex(log_key, 86400, json.dumps({
                 'reason': reason,
                 'severity': severity,
-                'api_key': api_key[:8] + '...' if api_key != 'anon' else 'anon',
-                'timestamp': datetime.utcnow().isoformat(),
-                'path': request.path,
-                'method': request.method,
+                'api_key': api_key_label,
+                'timestamp': datetime.utcfromtimestamp(timestamp).isoformat(),
+                'path': path,
+                'method': method,
             }))
-            
-        except Exception:
-            pass
     
     @staticmethod
     def is_blocked() -> Tuple[bool, Optional[str]]:
@@ -180,25 +504,155 @@ class RateLimiter:
             (is_blocked: bool, reason: str or None)
         """
         try:
-            redis_client = get_redis_client()
             ip, _ = RateLimiter.get_client_identifier()
+            client_hash = _client_hash(ip)
+            deny_cache = get_deny_cache()
             
-            key = f"suspicious:{hashlib.md5(ip.encode()).hexdigest()[:16]}"
-            score = redis_client.get(key)
-            
-            # Raised threshold to 50 to reduce false positives
-            if score and int(score) >= 50:
-                return True, "Too many suspicious requests detected"
-            
-            # Check for hard blocks (honeypot triggers)
-            block_key = f"blocked:{hashlib.md5(ip.encode()).hexdigest()[:16]}"
-            if redis_client.exists(block_key):
-                return True, "IP temporarily blocked"
-                
+            cached, reason = deny_cache.lookup(client_hash)
+            if not cached:
+                pipe = get_redis_client().pipeline(transaction=False)
+                RateLimiter._queue_block_checks(pipe, client_hash)
+                reason = RateLimiter._block_reason(*pipe.execute())
+                deny_cache.store(client_hash, reason)
+            if reason:
+                return True, reason
         except Exception:
             pass
         
         return False, None
+    
+    @staticmethod
+    def _queue_block_checks(pipe, client_hash: str):
+        """Queue the suspicion score read and hard block check (2 commands)"""
+        pipe.get(f"suspicious:{client_hash}")
+        # Hard blocks (honeypot triggers)
+        pipe.exists(f"blocked:{client_hash}")
+    
+    @staticmethod
+    def _block_reason(score, blocked) -> Optional[str]:
+        """Turn the results of _queue_block_checks into a block reason"""
+        if score and int(score) >= RateLimiter.SUSPICION_BLOCK_THRESHOLD:
+            return RateLimiter.SCORE_BLOCK_REASON
+        if blocked:
+            return RateLimiter.HARD_BLOCK_REASON
+        return None
+
+
+# ============================================================================
+# LOCAL DENY CACHE
+# ============================================================================
+
+# Pub/sub channel announcing new blocks to every API process
+BLOCK_CHANNEL = 'antiscraping:blocks'
+
+
+class LocalDenyCache:
+    """
+    Per-process cache of block decisions
+    
+    Blocked clients are cached for deny_ttl and clean clients for
+    allow_ttl (negative caching), so most requests skip the Redis block
+    checks. Blocks set by any process are announced on BLOCK_CHANNEL and
+    applied by a listener thread, overriding cached "clean" entries right
+    away; allow_ttl only bounds staleness while the listener is
+    disconnected.
+    """
+    
+    def __init__(self, redis_client, deny_ttl: float = 60, allow_ttl: float = 5,
+                 max_entries: int = 100000):
+        self.redis_client = redis_client
+        self.deny_ttl = deny_ttl
+        self.allow_ttl = allow_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener_pid = None
+    
+    def lookup(self, client_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns:
+            (cached: bool, block reason or None)
+        """
+        with self._lock:
+            item = self._entries.get(client_hash)
+            if item is None:
+                return False, None
+            
+            expires_at, reason = item
+            if expires_at < time.monotonic():
+                del self._entries[client_hash]
+                return False, None
+            return True, reason
+    
+    def store(self, client_hash: str, reason: Optional[str]):
+        """Cache a block decision (reason None = not blocked)"""
+        ttl = self.deny_ttl if reason else self.allow_ttl
+        with self._lock:
+            self._entries[client_hash] = (time.monotonic() + ttl, reason)
+            self._entries.move_to_end(client_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear_allowed(self):
+        """Forget cached clean clients (block notices may have been missed)"""
+        with self._lock:
+            for client_hash in [h for h, (_, reason) in self._entries.items() if not reason]:
+                del self._entries[client_hash]
+    
+    def start_listener(self):
+        """Start the block notice listener thread (once per process)"""
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            # Entries inherited through fork may predate missed notices
+            self._entries.clear()
+            threading.Thread(target=self._listen, name='deny-cache-listener', daemon=True).start()
+            self._listener_pid = os.getpid()
+    
+    def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(BLOCK_CHANNEL)
+                self.clear_allowed()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        notice = json.loads(message['data'])
+                        self.store(notice['h'], notice['reason'])
+            except Exception:
+                self.clear_allowed()
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+_deny_cache = None
+
+
+def get_deny_cache() -> LocalDenyCache:
+    """Get or create the per-process deny cache"""
+    global _deny_cache
+    if _deny_cache is None:
+        _deny_cache = LocalDenyCache(
+            get_redis_client(),
+            deny_ttl=current_app.config.get('ANTI_SCRAPING_DENY_CACHE_TTL', 60),
+            allow_ttl=current_app.config.get('ANTI_SCRAPING_ALLOW_CACHE_TTL', 5),
+        )
+    _deny_cache.start_listener()
+    return _deny_cache
+
+
+def _queue_block_notice(pipe, client_hash: str, reason: str):
+    """Queue the announcement of a new block to every process"""
+    pipe.publish(BLOCK_CHANNEL, json.dumps({'h': client_hash, 'reason': reason}))
 
 
 # ============================================================================
@@ -228,6 +682,35 @@ class BehaviorAnalyzer:
     # Legitimate browser/client patterns (expanded)
     BROWSER_PATTERNS = ['mozilla', 'chrome', 'safari', 'firefox', 'edge', 'axios', 'fetch', 'postman', 'insomnia', 'curl']
     
+    # Request events consumed by tasks.maintenance.consume_behavior_events
+    EVENT_STREAM = 'behavior:events'
+    
+    @staticmethod
+    def severity(reason: str) -> int:
+        """Suspicion score added for a reason"""
+        return 2 if 'bot' in reason or 'sweep' in reason else 1
+    
+    @staticmethod
+    def _queue_event(pipe, client_hash: str, local_reasons: list):
+        """
+        Queue the request event for asynchronous analysis (1 command)
+        
+        Rapid-fire, pagination sweep and scoring are computed from the
+        stream by app.utils.behavior_events.
+        """
+        ip, api_key = RateLimiter.get_client_identifier()
+        page = BehaviorAnalyzer._requested_page()
+        pipe.xadd(BehaviorAnalyzer.EVENT_STREAM, {
+            'h': client_hash,
+            'ip': ip or '',
+            'k': _api_key_label(api_key),
+            'p': request.path,
+            'm': request.method,
+            'pg': '' if page is None else page,
+            't': f'{time.time():.3f}',
+            'r': '|'.join(local_reasons),
+        }, maxlen=current_app.config.get('BEHAVIOR_STREAM_MAXLEN', 100000), approximate=True)
+    
     @staticmethod
     def analyze_request() -> Tuple[bool, list]:
         """
@@ -236,49 +719,68 @@ class BehaviorAnalyzer:
         Returns:
             (is_suspicious: bool, reasons: list)
         """
-        reasons = []
+        results = None
+        try:
+            ip, _ = RateLimiter.get_client_identifier()
+            pipe = get_redis_client().pipeline(transaction=False)
+            BehaviorAnalyzer._queue_checks(pipe, _client_hash(ip))
+            results = pipe.execute()
+        except Exception:
+            pass
         
-        # 1. Check User-Agent - only for clearly malicious bots
-        user_agent = request.headers.get('User-Agent', '').lower()
+        reasons = BehaviorAnalyzer._evaluate(results)
+        return len(reasons) > 0, reasons
+    
+    @staticmethod
+    def _queue_checks(pipe, client_hash: str):
+        """
+        Queue the rapid-fire counter and pagination tracking on a pipeline
         
-        if user_agent:
-            # Only flag known aggressive scraper agents
-            for bot in BehaviorAnalyzer.BOT_USER_AGENTS:
-                if bot in user_agent:
-                    reasons.append(f'bot_user_agent:{bot}')
-                    break
+        Queues 2 commands, plus 3 when the request is paginated.
+        """
+        # Rapid-fire requests: per-second counter
+        rapid_key = f"rapid:{client_hash}:{int(time.time())}"
+        pipe.incr(rapid_key)
+        pipe.expire(rapid_key, 1)
         
-        # 2. Check for rapid-fire requests (only very aggressive patterns)
+        # Pagination sweep: store accessed pages in a sorted set
+        page = BehaviorAnalyzer._requested_page()
+        if page is not None:
+            page_key = f"pages:{client_hash}:{request.path}"
+            pipe.zadd(page_key, {str(page): time.time()})
+            pipe.expire(page_key, 300)  # 5 min window
+            pipe.zrange(page_key, 0, -1)
+    
+    @staticmethod
+    def _requested_page() -> Optional[int]:
+        """Page number of the current request, if any"""
+        if 'page' not in request.args:
+            return None
         try:
-            redis_client = get_redis_client()
-            ip, _ = RateLimiter.get_client_identifier()
-            
-            rapid_key = f"rapid:{hashlib.md5(ip.encode()).hexdigest()[:16]}:{int(time.time())}"
-            count = redis_client.incr(rapid_key)
-            if count == 1:
-                redis_client.expire(rapid_key, 1)
-            
+            return int(request.args.get('page', 1))
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _evaluate(results: Optional[list]) -> list:
+        """
+        Compute suspicion reasons from the results of _queue_checks
+        
+        Args:
+            results: Pipeline results for _queue_checks, or None if Redis
+                was unavailable (only local checks are applied)
+        """
+        reasons = BehaviorAnalyzer._local_reasons()
+        
+        if results:
+            # 2. Check for rapid-fire requests (only very aggressive patterns)
+            count = results[0]
             if count > BehaviorAnalyzer.PATTERNS['rapid_fire']:
                 reasons.append(f'rapid_fire:{count}_per_second')
-                
-        except Exception:
-            pass
-        
-        # 3. Check for pagination sweep (someone iterating all pages)
-        if 'page' in request.args:
-            try:
-                page = int(request.args.get('page', 1))
-                redis_client = get_redis_client()
-                ip, _ = RateLimiter.get_client_identifier()
-                
-                page_key = f"pages:{hashlib.md5(ip.encode()).hexdigest()[:16]}:{request.path}"
-                
-                # Store accessed pages in a sorted set
-                redis_client.zadd(page_key, {str(page): time.time()})
-                redis_client.expire(page_key, 300)  # 5 min window
-                
-                # Check if accessing pages sequentially
-                pages = redis_client.zrange(page_key, 0, -1)
+            
+            # 3. Check for pagination sweep (someone iterating all pages)
+            if len(results) > 2:
+                pages = results[4]
                 if len(pages) >= 5:
                     page_nums = sorted([int(p) for p in pages])
                     # Check for sequential access
@@ -286,15 +788,29 @@ class BehaviorAnalyzer:
                                    if page_nums[i+1] - page_nums[i] == 1)
                     if sequential >= 4:
                         reasons.append('pagination_sweep')
-                        
-            except Exception:
-                pass
+        
+        return reasons
+    
+    @staticmethod
+    def _local_reasons() -> list:
+        """Checks that only need the request itself (no Redis)"""
+        reasons = []
+        
+        # 1. Check User-Agent - only for clearly malicious bots
+        user_agent = request.headers.get('User-Agent', '').lower()
+        
+        if user_agent:
+            # Only flag known aggressive scraper agents
+            for bot in BehaviorAnalyzer.BOT_USER_AGENTS:
+                if bot in user_agent:
+                    reasons.append(f'bot_user_agent:{bot}')
+                    break
         
         # 4. Check request headers fingerprint
         suspicious_headers = BehaviorAnalyzer._check_headers()
         reasons.extend(suspicious_headers)
         
-        return len(reasons) > 0, reasons
+        return reasons
     
     @staticmethod
     def _check_headers() -> list:
@@ -321,10 +837,28 @@ class BehaviorAnalyzer:
 # DATA NOISE INJECTION
 # ============================================================================
 
+def _hash64(text: str) -> int:
+    """Stable 64-bit hash of a string"""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: maps uint64 seeds to well-mixed uint64 values"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
 class DataNoiseInjector:
     """
     Add slight noise to numerical data for non-admin users
     This prevents exact data extraction while maintaining statistical validity
+    
+    Noise is deterministic: it is derived from (caller, record id, field)
+    with a keyed hash, so repeated calls return identical values (which
+    makes noisy responses cacheable) and averaging repeated calls does not
+    remove it. Values are processed per field as NumPy columns.
     """
     
     # Noise levels by data sensitivity
@@ -371,7 +905,7 @@ class DataNoiseInjector:
     @staticmethod
     def add_noise(value: Any, noise_level: str = 'low', field_name: str = '') -> Any:
         """
-        Add noise to a numerical value
+        Add random (non-deterministic) noise to a single numerical value
         
         Args:
             value: Original value
@@ -402,6 +936,89 @@ class DataNoiseInjector:
         
         return round(noisy_value, 4)
     
+    @staticmethod
+    def caller_seed(api_key_info: Optional[Dict] = None) -> int:
+        """Secret per-caller seed (API key ID, or shared for anonymous callers)"""
+        caller = api_key_info.get('id') if api_key_info else None
+        secret = current_app.config.get('SECRET_KEY', '') if has_app_context() else ''
+        return _hash64(f"{secret}:{caller if caller is not None else 'anon'}")
+    
+    @staticmethod
+    def gaussian(seeds: np.ndarray) -> np.ndarray:
+        """Standard normal deviates derived from uint64 seeds (Box-Muller)"""
+        with np.errstate(over='ignore'):
+            h1 = _splitmix64(seeds)
+            h2 = _splitmix64(h1)
+        u1 = ((h1 >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0 ** -53
+        u2 = (h2 >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+    
+    @staticmethod
+    def noise_column(values: np.ndarray, record_keys: np.ndarray, field: str,
+                     caller_seed: int, noise_level: str = 'low') -> np.ndarray:
+        """
+        Apply deterministic noise to one column in a single vectorized pass
+        
+        Args:
+            values: Column values (zeros and NaNs are left unchanged)
+            record_keys: uint64 record identifiers, same length as values
+            field: Field name (part of the seed)
+            caller_seed: Output of caller_seed()
+            noise_level: 'low', 'medium', or 'high'
+            
+        Returns:
+            Float array with noise applied
+        """
+        noise_pct = DataNoiseInjector.NOISE_LEVELS.get(noise_level, 0.005)
+        values = np.asarray(values, dtype=np.float64)
+        seeds = np.asarray(record_keys, dtype=np.uint64) ^ np.uint64(caller_seed ^ _hash64(field))
+        return values + np.abs(values) * noise_pct * DataNoiseInjector.gaussian(seeds)
+    
+    @staticmethod
+    def apply_to_columns(columns: Dict[str, np.ndarray], record_keys: np.ndarray,
+                         sector: str = '', api_key_info: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+        """
+        Apply noise to columnar data
+        
+        Args:
+            columns: Field name -> NumPy array
+            record_keys: uint64 record identifiers (e.g. primary keys)
+            sector: Data sector for field matching
+            api_key_info: API key details
+            
+        Returns:
+            New dict of columns; integer columns stay integers
+        """
+        if not DataNoiseInjector.should_apply_noise(api_key_info):
+            return columns
+        
+        seed = DataNoiseInjector.caller_seed(api_key_info)
+        result = dict(columns)
+        for field in DataNoiseInjector.NOISY_FIELDS.get(sector, []):
+            if field not in columns:
+                continue
+            original = np.asarray(columns[field])
+            noisy = DataNoiseInjector.noise_column(original, record_keys, field, seed)
+            if np.issubdtype(original.dtype, np.integer):
+                result[field] = np.rint(noisy).astype(original.dtype)
+            else:
+                result[field] = np.round(noisy, 4)
+        return result
+    
+    @staticmethod
+    def record_key(record: Dict, noisy_fields) -> int:
+        """
+        Stable identifier of a record: its id, or a hash of its other scalar
+        fields for rows without one (e.g. aggregates)
+        """
+        record_id = record.get('id')
+        if isinstance(record_id, int):
+            return record_id & 0xFFFFFFFFFFFFFFFF
+        return _hash64(repr(sorted(
+            (k, v) for k, v in record.items()
+            if k not in noisy_fields and isinstance(v, (str, int, float, bool, type(None)))
+        )))
+    
     @staticmethod
     def apply_to_response(data: Any, sector: str = '', api_key_info: Optional[Dict] = None) -> Any:
         """
@@ -413,26 +1030,67 @@ class DataNoiseInjector:
             api_key_info: API key details
             
         Returns:
-            Data with noise applied if appropriate
+            Data with noise applied if appropriate (input is not modified)
         """
         if not DataNoiseInjector.should_apply_noise(api_key_info):
             return data
         
-        noisy_fields = DataNoiseInjector.NOISY_FIELDS.get(sector, [])
+        noisy_fields = set(DataNoiseInjector.NOISY_FIELDS.get(sector, []))
+        if not noisy_fields:
+            return data
+        
+        records = []
+        data = DataNoiseInjector._copy_records(data, noisy_fields, records)
+        if not records:
+            return data
+        
+        # Flatten every (record, field) value into one column
+        field_hashes = {field: _hash64(field) for field in noisy_fields}
+        targets, values, record_keys, field_seeds = [], [], [], []
+        for record in records:
+            key = None
+            for field in noisy_fields.intersection(record):
+                value = record[field]
+                if value.__class__ not in (int, float) or value == 0:
+                    continue
+                if key is None:
+                    key = DataNoiseInjector.record_key(record, noisy_fields)
+                targets.append((record, field))
+                values.append(value)
+                record_keys.append(key)
+                field_seeds.append(field_hashes[field])
+        if not targets:
+            return data
+        
+        noise_pct = DataNoiseInjector.NOISE_LEVELS['low']
+        values = np.array(values, dtype=np.float64)
+        seeds = np.array(record_keys, dtype=np.uint64) ^ np.array(field_seeds, dtype=np.uint64)
+        seeds ^= np.uint64(DataNoiseInjector.caller_seed(api_key_info))
+        noisy = values + np.abs(values) * noise_pct * DataNoiseInjector.gaussian(seeds)
+        
+        # Keep same type
+        rounded_floats = np.round(noisy, 4).tolist()
+        rounded_ints = np.rint(noisy).tolist()
+        for i, (record, field) in enumerate(targets):
+            record[field] = int(rounded_ints[i]) if record[field].__class__ is int else rounded_floats[i]
         
+        return data
+    
+    @staticmethod
+    def _copy_records(data: Any, noisy_fields: set, records: list) -> Any:
+        """Copy containers, collecting the dicts that hold noisy fields"""
         if isinstance(data, dict):
-            return {
-                k: DataNoiseInjector.apply_to_response(v, sector, api_key_info)
-                if k not in noisy_fields
-                else DataNoiseInjector.add_noise(v, 'low', k)
+            copy = {
+                k: DataNoiseInjector._copy_records(v, noisy_fields, records)
+                if v.__class__ in (dict, list) and k not in noisy_fields else v
                 for k, v in data.items()
             }
+            if not noisy_fields.isdisjoint(copy):
+                records.append(copy)
+            return copy
         
         elif isinstance(data, list):
-            return [
-                DataNoiseInjector.apply_to_response(item, sector, api_key_info)
-                for item in data
-            ]
+            return [DataNoiseInjector._copy_records(item, noisy_fields, records) for item in data]
         
         return data
 
@@ -466,21 +1124,28 @@ class HoneypotDetector:
     def handle_honeypot():
         """Handle honeypot access - block and log"""
         try:
-            redis_client = get_redis_client()
-            ip, api_key = RateLimiter.get_client_identifier()
-            
-            # Immediately block this IP
-            block_key = f"blocked:{hashlib.md5(ip.encode()).hexdigest()[:16]}"
-            redis_client.setex(block_key, 3600, 'honeypot_triggered')
-            
-            # Log the event
-            RateLimiter.record_suspicious_activity(
-                f'honeypot_access:{request.path}', 
-                severity=5
-            )
+            ip, _ = RateLimiter.get_client_identifier()
+            get_deny_cache().store(_client_hash(ip), RateLimiter.HARD_BLOCK_REASON)
             
+            pipe = get_redis_client().pipeline(transaction=False)
+            HoneypotDetector._queue_block(pipe)
+            pipe.execute()
         except Exception:
             pass
+    
+    @staticmethod
+    def _queue_block(pipe):
+        """Queue the IP block, its announcement and the suspicious activity log"""
+        ip, _ = RateLimiter.get_client_identifier()
+        client_hash = _client_hash(ip)
+        
+        # Immediately block this IP
+        block_key = f"blocked:{client_hash}"
+        pipe.setex(block_key, 3600, 'honeypot_triggered')
+        _queue_block_notice(pipe, client_hash, RateLimiter.HARD_BLOCK_REASON)
+        
+        # Log the event
+        RateLimiter._queue_suspicious_activity(pipe, [(f'honeypot_access:{request.path}', 5)])
 
 
 # ============================================================================
@@ -491,26 +1156,81 @@ def anti_scraping_middleware():
     """
     Flask before_request middleware for anti-scraping protection
     Call this in your app factory
+    
+    Block decisions come from the per-process deny cache when possible
+    and from Redis otherwise.
+    
+    With ANTI_SCRAPING_ASYNC_ANALYSIS (default) the request then only
+    appends one event to a Redis stream, in the same round trip; behavior
+    analysis and scoring run in the tasks.maintenance.consume_behavior_events
+    worker task.
+    
+    Otherwise all reads and counters go to Redis in one pipelined round
+    trip, and a second one is only made when suspicious activity has to
+    be recorded.
     """
+    is_honeypot = HoneypotDetector.is_honeypot_request()
+    async_analysis = current_app.config.get('ANTI_SCRAPING_ASYNC_ANALYSIS', True)
+    local_reasons = [] if is_honeypot else BehaviorAnalyzer._local_reasons()
+    
+    client_hash = None
+    block_cached, block_reason = False, None
+    results = None
+    try:
+        ip, _ = RateLimiter.get_client_identifier()
+        client_hash = _client_hash(ip)
+        deny_cache = get_deny_cache()
+        block_cached, block_reason = deny_cache.lookup(client_hash)
+        
+        pipe = get_redis_client().pipeline(transaction=False)
+        if not block_cached:
+            RateLimiter._queue_block_checks(pipe, client_hash)
+        if not is_honeypot and not block_reason:
+            if async_analysis:
+                BehaviorAnalyzer._queue_event(pipe, client_hash, local_reasons)
+            else:
+                BehaviorAnalyzer._queue_checks(pipe, client_hash)
+        results = pipe.execute()
+        
+        if not block_cached:
+            block_reason = RateLimiter._block_reason(results[0], results[1])
+            deny_cache.store(client_hash, block_reason)
+            results = results[2:]
+    except Exception:
+        results = None
+    
     # 1. Check if IP is blocked
-    is_blocked, reason = RateLimiter.is_blocked()
-    if is_blocked:
-        abort(429, description=reason or "Too many requests")
+    if block_reason:
+        abort(429, description=block_reason)
     
     # 2. Check honeypots
-    if HoneypotDetector.is_honeypot_request():
+    if is_honeypot:
         HoneypotDetector.handle_honeypot()
         abort(404, description="Not found")
     
-    # 3. Analyze behavior
-    is_suspicious, reasons = BehaviorAnalyzer.analyze_request()
-    if is_suspicious:
-        for reason in reasons:
-            severity = 2 if 'bot' in reason or 'sweep' in reason else 1
-            RateLimiter.record_suspicious_activity(reason, severity)
+    # 3. Analyze behavior (recorded by the stream consumer in async mode)
+    if async_analysis:
+        reasons = local_reasons
+    else:
+        reasons = BehaviorAnalyzer._evaluate(results)
+        if reasons:
+            events = [(reason, BehaviorAnalyzer.severity(reason)) for reason in reasons]
+            try:
+                pipe = get_redis_client().pipeline(transaction=False)
+                RateLimiter._queue_suspicious_activity(pipe, events)
+                score = pipe.execute()[1]
+                
+                # Announce the block now rather than when caches expire
+                if score >= RateLimiter.SUSPICION_BLOCK_THRESHOLD:
+                    get_deny_cache().store(client_hash, RateLimiter.SCORE_BLOCK_REASON)
+                    pipe = get_redis_client().pipeline(transaction=False)
+                    _queue_block_notice(pipe, client_hash, RateLimiter.SCORE_BLOCK_REASON)
+                    pipe.execute()
+            except Exception:
+                pass
     
     # Store for use in response processing
-    g.anti_scraping_suspicious = is_suspicious
+    g.anti_scraping_suspicious = len(reasons) > 0
     g.anti_scraping_reasons = reasons
 
 
@@ -544,7 +1264,8 @@ def add_security_headers(response):
     # Anti-scraping headers
     response.headers['X-Robots-Tag'] = 'noindex, nofollow'
     response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['Cache-Control'] = 'no-store, max-age=0'
+    # Cached routes set their own policy (see app.utils.response_cache)
+    response.headers.setdefault('Cache-Control', 'no-store, max-age=0')
     
     # Rate limit headers
     if hasattr(g, 'rate_limit_info'):
@@ -554,6 +1275,11 @@ def add_security_headers(response):
         if 'retry_after' in info:
             response.headers['Retry-After'] = str(info['retry_after'])
     
+    # Redis usage of this request
+    if current_app.config.get('REDIS_CALL_HEADERS'):
+        response.headers['X-Redis-Round-Trips'] = str(g.get('redis_round_trips', 0))
+        response.headers['X-Redis-Commands'] = str(g.get('redis_commands', 0))
+    
     return response
 
 
@@ -604,45 +1330,60 @@ def protected_endpoint(sector: str = ''):
 # UTILITY FUNCTIONS
 # ============================================================================
 
+def _fingerprint_components() -> Tuple[str, ...]:
+    return (
+        request.headers.get('User-Agent', ''),
+        request.headers.get('Accept-Language', ''),
+        request.headers.get('Accept-Encoding', ''),
+        request.headers.get('Accept', ''),
+    )
+
+
 def get_request_fingerprint() -> str:
     """
     Generate a fingerprint for the current request
     Used for tracking and identifying repeat visitors
     """
-    components = [
-        request.headers.get('User-Agent', ''),
-        request.headers.get('Accept-Language', ''),
-        request.headers.get('Accept-Encoding', ''),
-        request.headers.get('Accept', ''),
-    ]
-    
-    fingerprint = hashlib.md5('|'.join(components).encode()).hexdigest()
-    return fingerprint
+    return fingerprint(_fingerprint_components()).hex()
+
+
+_access_log_buffer = None
+
+
+def get_access_log_buffer() -> AccessLogBuffer:
+    """Get or create the per-process access log buffer"""
+    global _access_log_buffer
+    if _access_log_buffer is None:
+        _access_log_buffer = AccessLogBuffer(
+            get_redis_client(),
+            capacity=current_app.config.get('ACCESS_LOG_BUFFER_SIZE', 10000),
+            batch_size=current_app.config.get('ACCESS_LOG_BATCH_SIZE', 500),
+            flush_interval_ms=current_app.config.get('ACCESS_LOG_FLUSH_MS', 500),
+            encoding=current_app.config.get('ACCESS_LOG_ENCODING', 'json'),
+        )
+    return _access_log_buffer
 
 
 def log_api_access(api_key_info: Optional[Dict] = None, response_size: int = 0):
     """
     Log API access for analytics and abuse detection
+    
+    Records are buffered in-process and written to Redis in batches by a
+    background thread (see app.utils.access_log).
     """
     try:
-        redis_client = get_redis_client()
         ip, api_key = RateLimiter.get_client_identifier()
         
-        log_data = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'ip': ip,
-            'api_key': api_key[:8] + '...' if api_key != 'anon' else 'anon',
-            'path': request.path,
-            'method': request.method,
-            'fingerprint': get_request_fingerprint(),
-            'response_size': response_size,
-            'suspicious': getattr(g, 'anti_scraping_suspicious', False),
-        }
-        
-        # Store in a time-series list
-        key = f"access_log:{datetime.utcnow().strftime('%Y-%m-%d-%H')}"
-        redis_client.lpush(key, json.dumps(log_data))
-        redis_client.expire(key, 86400 * 7)  # Keep for 7 days
+        get_access_log_buffer().add((
+            time.time(),
+            ip,
+            _api_key_label(api_key),
+            request.path,
+            request.method,
+            _fingerprint_components(),
+            response_size,
+            getattr(g, 'anti_scraping_suspicious', False),
+        ))
         
     except Exception:
         pass
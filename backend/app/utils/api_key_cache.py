@@ -0,0 +1,192 @@
+"""
+API key cache
+
+Keeps validated API keys out of Postgres on the request path with two levels:
+1. Per-process TTL/LRU cache (short TTL, bounds revocation propagation)
+2. Shared Redis cache (deleted when a key is edited, revoked or deleted)
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict
+
+from flask import current_app
+
+from app.models.auth import ApiKey, ScopeSet
+from app.utils.anti_scraping import get_redis_client
+
+
+class CachedApiKey:
+    """
+    Read-only snapshot of an ApiKey row
+
+    Exposes the attributes used on the request path (validity, scopes,
+    permissions) without needing an ORM session.
+    """
+    __slots__ = ('info', 'id', 'is_active', 'expires_at', 'is_admin',
+                 'can_export', 'can_api_direct', 'scope_set')
+
+    def __init__(self, info: Dict):
+        self.info = info
+        self.id = info['id']
+        self.is_active = bool(info.get('is_active'))
+        self.expires_at = datetime.fromisoformat(info['expires_at']) if info.get('expires_at') else None
+        self.is_admin = bool(info.get('is_admin'))
+        self.can_export = bool(info.get('can_export'))
+        self.can_api_direct = bool(info.get('can_api_direct'))
+        self.scope_set = ScopeSet(info.get('scopes'))
+
+    @classmethod
+    def from_model(cls, api_key: ApiKey) -> 'CachedApiKey':
+        """Build a snapshot from an ApiKey instance"""
+        return cls(api_key.to_dict(include_key=False))
+
+    def is_expired(self) -> bool:
+        """Check expiration against the current time"""
+        return bool(self.expires_at and self.expires_at < datetime.utcnow())
+
+    def is_valid(self) -> bool:
+        """Check if the API key is valid (same rules as ApiKey.is_valid)"""
+        return self.is_active and not self.is_expired()
+
+    def has_scope(self, required_scope: str) -> bool:
+        """Check if the key has a specific scope"""
+        return self.scope_set.allows(required_scope)
+
+    def to_dict(self, include_key: bool = False) -> Dict:
+        """
+        Dictionary representation matching ApiKey.to_dict(include_key=False)
+
+        Computed fields are re-evaluated so expiry is never stale.
+        """
+        data = dict(self.info)
+        data['is_valid'] = self.is_valid()
+        data['is_expired'] = self.is_expired()
+        return data
+
+
+class ApiKeyCache:
+    """
+    Two-level (process + Redis) cache of API keys
+
+    Entries are keyed by a SHA-256 digest of the key so raw keys never
+    land in Redis. Revocations delete the Redis entry immediately; other
+    processes pick the change up once their local entry expires, so
+    propagation is bounded by the local TTL.
+    """
+
+    REDIS_PREFIX = 'apikey:'
+
+    def __init__(self, max_entries: int = 1024, local_ttl: float = 10, redis_ttl: int = 300):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(raw_key: str) -> str:
+        """Hash a raw API key for use as a cache key"""
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    def get(self, raw_key: str) -> Optional[CachedApiKey]:
+        """
+        Resolve an API key, loading it from the database on a miss
+
+        Args:
+            raw_key: API key from the X-API-KEY header
+
+        Returns:
+            CachedApiKey or None if the key does not exist
+        """
+        digest = self.digest(raw_key)
+
+        entry = self._get_local(digest)
+        if entry is not None:
+            return entry
+
+        info = self._get_shared(digest)
+        if info is None:
+            api_key = ApiKey.query.filter_by(key=raw_key).first()
+            if not api_key:
+                return None
+            info = api_key.to_dict(include_key=False)
+            self._set_shared(digest, info)
+
+        entry = CachedApiKey(info)
+        self._set_local(digest, entry)
+        return entry
+
+    def invalidate(self, raw_key: str):
+        """Drop a key from both cache levels (call after edit/revoke/delete)"""
+        digest = self.digest(raw_key)
+
+        with self._lock:
+            self._local.pop(digest, None)
+
+        try:
+            get_redis_client().delete(f"{self.REDIS_PREFIX}{digest}")
+        except Exception:
+            pass
+
+    def clear_local(self):
+        """Drop every entry of the per-process cache"""
+        with self._lock:
+            self._local.clear()
+
+    def _get_local(self, digest: str) -> Optional[CachedApiKey]:
+        with self._lock:
+            item = self._local.get(digest)
+            if item is None:
+                return None
+
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._local[digest]
+                return None
+
+            self._local.move_to_end(digest)
+            return entry
+
+    def _set_local(self, digest: str, entry: CachedApiKey):
+        with self._lock:
+            self._local[digest] = (time.monotonic() + self.local_ttl, entry)
+            self._local.move_to_end(digest)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _get_shared(self, digest: str) -> Optional[Dict]:
+        try:
+            cached = get_redis_client().get(f"{self.REDIS_PREFIX}{digest}")
+        except Exception:
+            return None
+        return json.loads(cached) if cached else None
+
+    def _set_shared(self, digest: str, info: Dict):
+        try:
+            get_redis_client().setex(f"{self.REDIS_PREFIX}{digest}", self.redis_ttl, json.dumps(info))
+        except Exception:
+            pass
+
+
+_api_key_cache = None
+
+
+def get_api_key_cache() -> ApiKeyCache:
+    """Get or create the process-wide API key cache"""
+    global _api_key_cache
+    if _api_key_cache is None:
+        _api_key_cache = ApiKeyCache(
+            max_entries=current_app.config.get('API_KEY_CACHE_MAX_ENTRIES', 1024),
+            local_ttl=current_app.config.get('API_KEY_CACHE_LOCAL_TTL', 10),
+            redis_ttl=current_app.config.get('API_KEY_CACHE_REDIS_TTL', 300),
+        )
+    return _api_key_cache
+
+
+def invalidate_api_key(raw_key: str):
+    """Invalidate a cached API key after it was edited, revoked or deleted"""
+    get_api_key_cache().invalidate(raw_key)
@@ -0,0 +1,181 @@
+"""
+Write-behind API key usage accounting
+
+Authenticated requests only bump counters in Redis. The periodic
+tasks.maintenance.flush_api_key_usage task moves them to api_keys in one
+batched UPDATE, so the request path never takes a row lock or commits.
+Totals are eventually consistent (lag = flush interval).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from flask import current_app
+from sqlalchemy import update, bindparam, func
+
+from app import db
+from app.models.auth import ApiKey
+from app.utils.anti_scraping import get_redis_client
+
+# Redis hashes: api key id -> pending request count / last usage timestamp
+USAGE_COUNTS_KEY = 'apikey_usage:requests'
+USAGE_LAST_USED_KEY = 'apikey_usage:last_used'
+
+
+class LocalUsageBuffer:
+    """
+    In-process fallback used while Redis is unreachable
+
+    Accumulates counts per key and writes them to the database from the
+    request thread at most once per flush interval.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._last_used = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, key_id: int, timestamp: float):
+        with self._lock:
+            self._counts[key_id] = self._counts.get(key_id, 0) + 1
+            self._last_used[key_id] = max(timestamp, self._last_used.get(key_id, 0))
+
+    def flush_if_due(self, interval: float):
+        with self._lock:
+            if time.monotonic() - self._last_flush < interval or not self._counts:
+                return
+            counts, last_used = self._counts, self._last_used
+            self._counts, self._last_used = {}, {}
+            self._last_flush = time.monotonic()
+
+        try:
+            apply_usage(counts, last_used)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                for key_id, count in counts.items():
+                    self._counts[key_id] = self._counts.get(key_id, 0) + count
+                    self._last_used[key_id] = max(last_used[key_id], self._last_used.get(key_id, 0))
+
+
+_local_buffer = LocalUsageBuffer()
+
+
+def record_api_key_usage(key_id: int):
+    """
+    Count one request for an API key (no database write)
+
+    Args:
+        key_id: API key ID
+    """
+    now = time.time()
+
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.hincrby(USAGE_COUNTS_KEY, key_id, 1)
+        pipe.hset(USAGE_LAST_USED_KEY, key_id, now)
+        pipe.execute()
+    except Exception:
+        _local_buffer.add(key_id, now)
+        _local_buffer.flush_if_due(current_app.config.get('API_KEY_USAGE_LOCAL_FLUSH_SECONDS', 30))
+
+
+def apply_usage(counts: Dict[int, int], last_used: Dict[int, float]) -> int:
+    """
+    Add pending usage to api_keys in one batched UPDATE
+
+    Args:
+        counts: API key ID -> number of requests to add
+        last_used: API key ID -> last usage UNIX timestamp
+
+    Returns:
+        Number of keys updated
+    """
+    rows = [
+        {
+            'key_id': int(key_id),
+            'requests': int(count),
+            'last_used': datetime.utcfromtimestamp(float(last_used[key_id])) if key_id in last_used else None,
+        }
+        for key_id, count in counts.items()
+    ]
+    if not rows:
+        return 0
+
+    table = ApiKey.__table__
+    stmt = update(table).where(table.c.id == bindparam('key_id')).values(
+        total_requests=func.coalesce(table.c.total_requests, 0) + bindparam('requests'),
+        # GREATEST ignores NULLs, so a missing timestamp keeps the current value
+        last_used_at=func.greatest(table.c.last_used_at, bindparam('last_used')),
+    )
+    db.session.execute(stmt, rows)
+    db.session.commit()
+
+    return len(rows)
+
+
+def flush_api_key_usage() -> Dict:
+    """
+    Move pending usage counters from Redis to the database
+
+    The counters are read and cleared atomically; if the database write
+    fails they are added back so no request is lost.
+
+    Returns:
+        Dictionary with flush statistics
+    """
+    redis_client = get_redis_client()
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hgetall(USAGE_COUNTS_KEY)
+    pipe.hgetall(USAGE_LAST_USED_KEY)
+    pipe.delete(USAGE_COUNTS_KEY, USAGE_LAST_USED_KEY)
+    counts, last_used, _ = pipe.execute()
+
+    try:
+        keys_updated = apply_usage(counts, last_used)
+    except Exception:
+        db.session.rollback()
+        _restore(redis_client, counts, last_used)
+        raise
+
+    return {
+        'keys_updated': keys_updated,
+        'requests_flushed': sum(int(c) for c in counts.values()),
+    }
+
+
+def _restore(redis_client, counts: Dict, last_used: Dict):
+    """Put counters back into Redis after a failed flush"""
+    pipe = redis_client.pipeline(transaction=False)
+    for key_id, count in counts.items():
+        pipe.hincrby(USAGE_COUNTS_KEY, key_id, int(count))
+    for key_id, timestamp in last_used.items():
+        pipe.hset(USAGE_LAST_USED_KEY, key_id, timestamp)
+    pipe.execute()
+
+
+def add_pending_usage(key_dicts: List[Dict]) -> List[Dict]:
+    """
+    Add usage counted in Redis but not flushed yet to serialized keys
+
+    Keeps total_requests in admin views equal to what the synchronous
+    accounting used to report.
+
+    Args:
+        key_dicts: Output of ApiKey.to_dict()
+
+    Returns:
+        The same list, with total_requests updated in place
+    """
+    try:
+        pending = get_redis_client().hgetall(USAGE_COUNTS_KEY)
+    except Exception:
+        return key_dicts
+
+    for data in key_dicts:
+        data['total_requests'] = (data.get('total_requests') or 0) + int(pending.get(str(data['id']), 0))
+
+    return key_dicts
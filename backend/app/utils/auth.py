@@ -4,55 +4,74 @@ Authentication utilities
 from functools import wraps
 from flask import request, g
 from flask_restx import abort
-from app.models.auth import ApiKey
+from app.utils.api_key_cache import get_api_key_cache
+from app.utils.api_key_usage import record_api_key_usage
 
 
-def require_api_key(required_scope=None):
+def authenticate(required_scope=None):
     """
-    Decorator to require API key authentication
+    Authenticate the current request's API key
+
+    Aborts with 401/403 when the key is missing, invalid or lacks the
+    scope; otherwise records usage and applies rate limiting. For routes
+    whose required scope depends on the request.
 
     Args:
-        required_scope: Optional scope required for the endpoint
+        required_scope: Optional scope required for the request
 
     Returns:
-        Decorated function
+        CachedApiKey snapshot
     """
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Get API key from header
-            api_key = request.headers.get('X-API-KEY')
+    # Get API key from header
+    api_key = request.headers.get('X-API-KEY')
+
+    if not api_key:
+        abort(401, 'API key required. Include X-API-KEY header.')
+
+    # Validate API key (served from the key cache when possible)
+    key_obj = get_api_key_cache().get(api_key)
+
+    if not key_obj:
+        abort(401, 'Invalid API key.')
+
+    if not key_obj.is_valid():
+        abort(401, 'API key is expired or inactive.')
 
-            if not api_key:
-                abort(401, 'API key required. Include X-API-KEY header.')
+    # Check scope if required
+    if required_scope and not key_obj.has_scope(required_scope):
+        abort(403, f'API key does not have required scope: {required_scope}')
 
-            # Validate API key
-            key_obj = ApiKey.query.filter_by(key=api_key).first()
+    # Record usage (write-behind, flushed to the database periodically)
+    record_api_key_usage(key_obj.id)
 
-            if not key_obj:
-                abort(401, 'Invalid API key.')
+    # Add key object to request context and g for anti-scraping
+    request.api_key = key_obj
+    g.api_key_info = key_obj.to_dict(include_key=False)
 
-            if not key_obj.is_valid():
-                abort(401, 'API key is expired or inactive.')
+    # Apply rate limiting
+    try:
+        from app.utils.anti_scraping import rate_limit_check
+        rate_limit_check(g.api_key_info)
+    except Exception:
+        pass  # Don't fail if rate limiting unavailable
 
-            # Check scope if required
-            if required_scope and not key_obj.has_scope(required_scope):
-                abort(403, f'API key does not have required scope: {required_scope}')
+    return key_obj
 
-            # Record usage
-            key_obj.record_usage()
 
-            # Add key object to request context and g for anti-scraping
-            request.api_key = key_obj
-            g.api_key_info = key_obj.to_dict(include_key=False)
-            
-            # Apply rate limiting
-            try:
-                from app.utils.anti_scraping import rate_limit_check
-                rate_limit_check(g.api_key_info)
-            except Exception:
-                pass  # Don't fail if rate limiting unavailable
+def require_api_key(required_scope=None):
+    """
+    Decorator to require API key authentication
+
+    Args:
+        required_scope: Optional scope required for the endpoint
 
+    Returns:
+        Decorated function
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            authenticate(required_scope)
             return f(*args, **kwargs)
 
         return decorated_function
@@ -65,6 +84,6 @@ def get_current_api_key():
     Get current API key from request context
 
     Returns:
-        ApiKey object or None
+        CachedApiKey snapshot or None
     """
     return getattr(request, 'api_key', None)
@@ -0,0 +1,181 @@
+"""
+Asynchronous behavioral analysis
+
+The anti-scraping middleware appends one compact event per request to the
+behavior:events Redis stream. The periodic
+tasks.maintenance.consume_behavior_events task reads it in batches through
+a consumer group, computes the same signals BehaviorAnalyzer used to
+compute inline (rapid fire, pagination sweep, suspicion score) and writes
+the suspicious:* and blocked:* keys that RateLimiter.is_blocked() reads,
+announcing new blocks to the API processes' deny caches.
+Detection lag is bounded by the task interval.
+"""
+import os
+import socket
+from collections import defaultdict
+from typing import Dict, List
+
+import redis
+
+from app.utils.anti_scraping import (
+    BehaviorAnalyzer,
+    RateLimiter,
+    get_redis_client,
+    _queue_block_notice,
+)
+
+CONSUMER_GROUP = 'behavior-analyzers'
+
+# Events left unacknowledged by a dead consumer are reclaimed after this delay
+CLAIM_IDLE_MS = 60000
+
+
+def _consumer_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _ensure_group(redis_client):
+    """Create the consumer group (and the stream) if needed"""
+    try:
+        redis_client.xgroup_create(BehaviorAnalyzer.EVENT_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def analyze_events(redis_client, events: List[Dict]) -> Dict:
+    """
+    Compute suspicion signals for a batch of events and record them
+
+    Uses two pipelined round trips: one to update the per-second request
+    counters and read the pages already seen, one to store pages,
+    suspicion scores and logs; a third sets blocks when a client crosses
+    the suspicion threshold.
+
+    Args:
+        redis_client: Redis client
+        events: Decoded stream entries (field dicts), oldest first
+
+    Returns:
+        Dictionary with batch statistics
+    """
+    # 1. Counters and current pagination state
+    rapid_groups = defaultdict(list)
+    page_groups = defaultdict(list)
+    for event in events:
+        second = int(float(event['t']))
+        rapid_groups[(event['h'], second)].append(event)
+        if event.get('pg'):
+            page_groups[(event['h'], event['p'])].append(event)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for (client_hash, second), group in rapid_groups.items():
+        rapid_key = f"rapid:{client_hash}:{second}"
+        pipe.incrby(rapid_key, len(group))
+        pipe.expire(rapid_key, 60)
+    for (client_hash, path) in page_groups:
+        pipe.zrange(f"pages:{client_hash}:{path}", 0, -1)
+    results = pipe.execute()
+
+    reasons = defaultdict(list)
+
+    # 2. Rapid fire: number each event within its second
+    for i, group in enumerate(rapid_groups.values()):
+        total = results[i * 2]
+        first = total - len(group) + 1
+        for n, event in enumerate(group, start=first):
+            if n > BehaviorAnalyzer.PATTERNS['rapid_fire']:
+                reasons[id(event)].append(f'rapid_fire:{n}_per_second')
+
+    # 3. Pagination sweep, replayed in request order
+    offset = len(rapid_groups) * 2
+    pipe = redis_client.pipeline(transaction=False)
+    for i, ((client_hash, path), group) in enumerate(page_groups.items()):
+        pages = set(int(p) for p in results[offset + i])
+        for event in group:
+            pages.add(int(event['pg']))
+            if len(pages) >= 5:
+                page_nums = sorted(pages)
+                sequential = sum(1 for j in range(len(page_nums) - 1)
+                                 if page_nums[j + 1] - page_nums[j] == 1)
+                if sequential >= 4:
+                    reasons[id(event)].append('pagination_sweep')
+
+        page_key = f"pages:{client_hash}:{path}"
+        pipe.zadd(page_key, {event['pg']: float(event['t']) for event in group})
+        pipe.expire(page_key, 300)  # 5 min window
+
+    # 4. Suspicion scores and logs, one update per suspicious request
+    suspicious_clients = []
+    for event in events:
+        event_reasons = [r for r in event.get('r', '').split('|') if r] + reasons.get(id(event), [])
+        if not event_reasons:
+            continue
+        RateLimiter._queue_suspicious_events(
+            pipe, event['ip'], event['k'], event['p'], event['m'],
+            [(reason, BehaviorAnalyzer.severity(reason)) for reason in event_reasons],
+            float(event['t']),
+        )
+        suspicious_clients.append((len(pipe.command_stack) - len(event_reasons), event['h']))
+
+    results = pipe.execute() if pipe.command_stack else []
+
+    # 5. Block clients over the threshold (read by RateLimiter.is_blocked)
+    blocked = set()
+    for score_index, client_hash in suspicious_clients:
+        if client_hash not in blocked and int(results[score_index - 1]) >= RateLimiter.SUSPICION_BLOCK_THRESHOLD:
+            blocked.add(client_hash)
+
+    if blocked:
+        pipe = redis_client.pipeline(transaction=False)
+        for client_hash in blocked:
+            pipe.set(f"blocked:{client_hash}", 'suspicious_activity', ex=3600, nx=True)
+            _queue_block_notice(pipe, client_hash, RateLimiter.HARD_BLOCK_REASON)
+        pipe.execute()
+
+    return {
+        'events': len(events),
+        'suspicious': len(suspicious_clients),
+        'blocked': len(blocked),
+    }
+
+
+def consume_behavior_events(batch_size: int = 500, max_batches: int = 20) -> Dict:
+    """
+    Read pending request events and analyze them in batches
+
+    Args:
+        batch_size: Events read per XREADGROUP call
+        max_batches: Upper bound on batches per call (keeps runs short)
+
+    Returns:
+        Dictionary with consumer statistics
+    """
+    redis_client = get_redis_client()
+    _ensure_group(redis_client)
+    consumer = _consumer_name()
+    stream = BehaviorAnalyzer.EVENT_STREAM
+
+    stats = {'events': 0, 'suspicious': 0, 'blocked': 0}
+
+    # Take over entries left pending by consumers that died mid-batch
+    _, claimed, *_ = redis_client.xautoclaim(stream, CONSUMER_GROUP, consumer, CLAIM_IDLE_MS, count=batch_size)
+    batches = [claimed] if claimed else []
+
+    for _ in range(max_batches):
+        if not batches:
+            response = redis_client.xreadgroup(CONSUMER_GROUP, consumer, {stream: '>'}, count=batch_size)
+            if not response:
+                break
+            batches.append(response[0][1])
+
+        entries = batches.pop()
+        # Fields are empty for entries trimmed from the stream while pending
+        events = [fields for _, fields in entries if fields]
+        if events:
+            batch_stats = analyze_events(redis_client, events)
+            for key in stats:
+                stats[key] += batch_stats[key]
+        redis_client.xack(stream, CONSUMER_GROUP, *[entry_id for entry_id, _ in entries])
+
+    return stats
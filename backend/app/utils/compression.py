@@ -0,0 +1,313 @@
+"""
+Response body compression
+
+Content-coding negotiation and encoders, used by the prebuilt payloads
+(compressed once, at the highest level) and by compress_response(), the
+after_request hook that compresses every other compressible response at
+a fast level:
+
+- bodies under COMPRESSION_MIN_SIZE, responses that already have a
+  Content-Encoding (prebuilt payloads) or Cache-Control: no-transform,
+  and content types that are not compressible (PDF, XLSX, images...) are
+  sent as is
+- streamed responses (generators) are compressed chunk by chunk, without
+  buffering the whole body
+- strong ETags become weak, since the bytes now depend on the coding
+
+Compression ratio and CPU time are reported per response in a
+Server-Timing header and accumulated per process, then added to the
+metrics:compression Redis hash every COMPRESSION_METRICS_FLUSH_SECONDS.
+
+brotli and zstandard are optional; without them clients are served gzip.
+"""
+import gzip
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator
+
+from flask import current_app, request
+
+from app.utils.anti_scraping import get_redis_client
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+METRICS_KEY = 'metrics:compression'
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/geo+json',
+    'application/javascript',
+    'application/xml',
+    'application/vnd.mapbox-vector-tile',
+    'image/svg+xml',
+}
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    # mtime=0: identical bytes (and ETags) in every process
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(body: bytes, level: int) -> bytes:
+    return brotli.compress(body, quality=level)
+
+
+def _zstd(body: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+class _StreamEncoder:
+    """Incremental encoder: compress(chunk) -> bytes, finish() -> bytes"""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+            self.compress = self._compressor.process
+            self.finish = self._compressor.finish
+        elif encoding == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress = self._compressor.compress
+            self.finish = self._compressor.flush
+        else:
+            # wbits=31: gzip container
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self._compressor.compress
+            self.finish = self._compressor.flush
+
+
+# Encoders by preference for prebuilt payloads, with (fast, max) levels
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS['br'] = (_brotli, (4, 11))
+if zstandard is not None:
+    ENCODERS['zstd'] = (_zstd, (3, 19))
+ENCODERS['gzip'] = (_gzip, (6, 9))
+
+
+def available_encodings() -> list:
+    """Supported content codings, preferred first"""
+    return list(ENCODERS)
+
+
+def enabled_encodings() -> list:
+    """
+    Content codings to negotiate, in the server's order of preference
+
+    COMPRESSION_ENCODINGS restricted to the supported codings (none when
+    COMPRESSION_ENABLED is off).
+    """
+    config = current_app.config
+    if not config.get('COMPRESSION_ENABLED', True):
+        return []
+    return [e for e in config.get('COMPRESSION_ENCODINGS', ['gzip']) if e in ENCODERS]
+
+
+def choose_encoding(accept_encodings, encodings: Iterable[str]) -> str:
+    """
+    Best content coding accepted by the client
+
+    Args:
+        accept_encodings: request.accept_encodings
+        encodings: Candidate codings, preferred first
+
+    Returns:
+        Content coding, or 'identity'
+    """
+    for encoding in encodings:
+        if accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+
+def compress(body: bytes, encoding: str, max_level: bool = False) -> bytes:
+    """
+    Encode a body
+
+    Args:
+        body: Uncompressed bytes
+        encoding: Content coding from available_encodings()
+        max_level: Use the highest level (for payloads built once)
+    """
+    encoder, levels = ENCODERS[encoding]
+    return encoder(body, levels[1] if max_level else levels[0])
+
+
+def compress_all(body: bytes, encodings: Iterable[str]) -> Dict[str, bytes]:
+    """Body in each of the given codings (and 'identity'), at the highest level"""
+    payloads = {'identity': body}
+    for encoding in encodings:
+        payloads[encoding] = compress(body, encoding, max_level=True)
+    return payloads
+
+
+class CompressionMetrics:
+    """
+    Per-process compression totals, added to Redis in batches
+
+    Totals per coding: responses, bytes_in, bytes_out, cpu_us. The
+    compression ratio is bytes_in / bytes_out.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        with self._lock:
+            totals = self._totals.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_us': 0})
+            totals['responses'] += 1
+            totals['bytes_in'] += bytes_in
+            totals['bytes_out'] += bytes_out
+            totals['cpu_us'] += int(cpu_seconds * 1000000)
+
+    def flush_if_due(self, interval: float):
+        with self._lock:
+            if time.monotonic() - self._last_flush < interval or not self._totals:
+                return
+            totals, self._totals = self._totals, {}
+            self._last_flush = time.monotonic()
+
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for encoding, values in totals.items():
+                for name, value in values.items():
+                    pipe.hincrby(METRICS_KEY, f'{encoding}:{name}', value)
+            pipe.execute()
+        except Exception:
+            pass  # Metrics are best effort
+
+
+_metrics = CompressionMetrics()
+
+
+def get_compression_metrics() -> Dict[str, Dict]:
+    """
+    Compression totals of all processes (flushed so far)
+
+    Returns:
+        Dictionary of coding -> {responses, bytes_in, bytes_out, cpu_us, ratio}
+    """
+    try:
+        raw = get_redis_client().hgetall(METRICS_KEY)
+    except Exception:
+        return {}
+
+    metrics = {}
+    for field, value in raw.items():
+        encoding, name = field.split(':', 1)
+        metrics.setdefault(encoding, {})[name] = int(value)
+    for values in metrics.values():
+        values['ratio'] = round(values.get('bytes_in', 0) / values['bytes_out'], 2) if values.get('bytes_out') else None
+    return metrics
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ''
+    return (
+        mimetype.startswith('text/')
+        or mimetype in COMPRESSIBLE_TYPES
+        or mimetype.endswith('+json')
+        or mimetype.endswith('+xml')
+    )
+
+
+def _server_timing(response, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+    ratio = bytes_in / bytes_out if bytes_out else 0
+    response.headers.add('Server-Timing', f'compress;dur={cpu_seconds * 1000:.2f};desc="{encoding} {ratio:.1f}x"')
+
+
+def _stream(chunks: Iterable[bytes], encoding: str, level: int, flush_interval: float) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, recording metrics at the end"""
+    encoder = _StreamEncoder(encoding, level)
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            bytes_in += len(chunk)
+            start = time.thread_time()
+            data = encoder.compress(chunk)
+            cpu_seconds += time.thread_time() - start
+            if data:
+                bytes_out += len(data)
+                yield data
+
+        start = time.thread_time()
+        data = encoder.finish()
+        cpu_seconds += time.thread_time() - start
+        bytes_out += len(data)
+        yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+    _metrics.record(encoding, bytes_in, bytes_out, cpu_seconds)
+    _metrics.flush_if_due(flush_interval)
+
+
+def compress_response(response):
+    """
+    Compress a response for the current request's Accept-Encoding
+
+    Call this in after_request.
+    """
+    encodings = enabled_encodings()
+    if not encodings:
+        return response
+
+    if (
+        request.method == 'HEAD'
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+        or 'no-transform' in (response.headers.get('Cache-Control') or '')
+        or not _is_compressible(response)
+    ):
+        return response
+
+    encoding = choose_encoding(request.accept_encodings, encodings)
+    # The body depends on Accept-Encoding whether it is compressed or not
+    response.vary.add('Accept-Encoding')
+    if encoding == 'identity':
+        return response
+
+    config = current_app.config
+    level = ENCODERS[encoding][1][0]
+    flush_interval = config.get('COMPRESSION_METRICS_FLUSH_SECONDS', 10)
+
+    if response.is_streamed:
+        response.response = _stream(response.response, encoding, level, flush_interval)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config.get('COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        start = time.thread_time()
+        compressed = compress(body, encoding)
+        cpu_seconds = time.thread_time() - start
+        if len(compressed) >= len(body):
+            return response
+
+        response.set_data(compressed)
+        _metrics.record(encoding, len(body), len(compressed), cpu_seconds)
+        _metrics.flush_if_due(flush_interval)
+        _server_timing(response, encoding, len(body), len(compressed), cpu_seconds)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,61 @@
+"""
+Global data version
+
+A Redis counter bumped whenever ingestion changes the data. Response
+caches include it in their keys, so a bump invalidates every cached
+payload at once without scanning keys.
+"""
+import threading
+import time
+from typing import Optional
+
+from app.utils.anti_scraping import get_redis_client
+
+DATA_VERSION_KEY = 'data:version'
+
+# Per-process copy, re-read at most every LOCAL_TTL seconds
+LOCAL_TTL = 1.0
+
+_local = {'version': None, 'read_at': 0.0}
+_lock = threading.Lock()
+
+
+def get_data_version() -> Optional[int]:
+    """
+    Current data version
+
+    Returns:
+        Version number, or None when Redis is unavailable (callers should
+        then skip caching)
+    """
+    now = time.monotonic()
+    if _local['version'] is not None and now - _local['read_at'] < LOCAL_TTL:
+        return _local['version']
+
+    try:
+        version = int(get_redis_client().get(DATA_VERSION_KEY) or 0)
+    except Exception:
+        return None
+
+    with _lock:
+        _local['version'] = version
+        _local['read_at'] = now
+    return version
+
+
+def bump_data_version() -> Optional[int]:
+    """
+    Invalidate all version-keyed caches
+
+    Returns:
+        New version number, or None when Redis is unavailable
+    """
+    try:
+        version = get_redis_client().incr(DATA_VERSION_KEY)
+    except Exception:
+        return None
+
+    with _lock:
+        _local['version'] = version
+        _local['read_at'] = time.monotonic()
+    return version
@@ -0,0 +1,211 @@
+"""
+Keyset (cursor) pagination for the /index endpoints
+
+Pages are ordered by (year DESC, quarter DESC, id DESC); a cursor encodes
+the sort key of the last row served and the next page seeks past it with
+a single row-value comparison, so deep pages cost the same as the first
+one. Each stats table has an index on exactly this sort key
+(idx_<table>_sort), which serves both the seek and the ORDER BY. The
+legacy page parameter still works (OFFSET) and its responses also carry
+a next_cursor to switch over.
+
+Totals are optional:
+- exact: COUNT(*) of the filtered query, cached per data version
+- estimated: planner row estimate (pg_class.reltuples) when unfiltered,
+  otherwise the cached exact count
+- none: no count at all
+
+index_serializer() selects the requested fieldset plus the sort key
+columns, so cursors work whatever fields= asks for.
+"""
+import base64
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+
+from app import db
+from app.utils.anti_scraping import get_redis_client
+from app.utils.data_version import get_data_version
+from app.utils.serializer import RowSerializer, get_serializer, parse_fields
+
+TOTAL_MODES = ('exact', 'estimated', 'none')
+COUNT_CACHE_TTL = 3600
+
+
+class InvalidCursor(ValueError):
+    """Cursor that was not produced by this API"""
+    pass
+
+
+def sort_columns(model) -> list:
+    """Sort key expressions of a stats model (quarter only when it has one)"""
+    columns = [model.year]
+    if hasattr(model, 'quarter'):
+        columns.append(func.coalesce(model.quarter, 0))
+    columns.append(model.id)
+    return columns
+
+
+def sort_fields(model) -> list:
+    """Names of the columns read by row_sort_key()"""
+    return [name for name in ('year', 'quarter', 'id') if hasattr(model, name)]
+
+
+def index_serializer(model, fields: Optional[str] = None) -> RowSerializer:
+    """
+    Serializer of an /index page
+
+    Args:
+        model: Stats model
+        fields: fields= parameter (default: all columns and relations)
+
+    Raises:
+        InvalidFields: If fields names unknown columns or relations
+    """
+    columns, relations = parse_fields(model, fields)
+    return get_serializer(model, fields=columns, include_relations=relations, hidden=sort_fields(model))
+
+
+def encode_cursor(values) -> str:
+    """Opaque cursor from the sort key of a row"""
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Sort key encoded in a cursor
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def row_sort_key(model, row) -> list:
+    """Sort key of a model instance, matching sort_columns()"""
+    key = [row.year]
+    if hasattr(model, 'quarter'):
+        key.append(row.quarter or 0)
+    key.append(row.id)
+    return key
+
+
+def count_total(query, model, mode: str) -> Tuple[Optional[int], bool]:
+    """
+    Total rows of a query
+
+    Args:
+        query: Filtered query (ordering is ignored)
+        model: Queried model
+        mode: 'exact', 'estimated' or 'none'
+
+    Returns:
+        (total or None, whether the total is an estimate)
+    """
+    if mode == 'none':
+        return None, False
+
+    if mode == 'estimated' and query.whereclause is None:
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {'table': model.__tablename__}
+        ).scalar()
+        # -1 until the table has been analyzed
+        if estimate is not None and estimate >= 0:
+            return int(estimate), True
+
+    return _cached_count(query), False
+
+
+def _cached_count(query) -> int:
+    statement = select(func.count()).select_from(query.enable_eagerloads(False).order_by(None).subquery())
+
+    version = get_data_version()
+    key = None
+    if version is not None:
+        compiled = statement.compile(dialect=db.engine.dialect)
+        raw = f"{compiled}|{sorted(compiled.params.items(), key=str)}"
+        key = f"count:{version}:{hashlib.sha1(raw.encode()).hexdigest()}"
+        try:
+            cached = get_redis_client().get(key)
+            if cached is not None:
+                return int(cached)
+        except Exception:
+            key = None
+
+    total = db.session.execute(statement).scalar()
+
+    if key:
+        try:
+            get_redis_client().set(key, total, ex=COUNT_CACHE_TTL)
+        except Exception:
+            pass
+    return total
+
+
+def paginate_index(query, model, per_page: int, page: int = 1, cursor: Optional[str] = None,
+                   total: Optional[str] = None, serializer=None) -> Tuple[List, Dict]:
+    """
+    Fetch one page of an /index query
+
+    Args:
+        query: Filtered query on model (any ordering is replaced)
+        model: Stats model
+        per_page: Page size
+        page: Page number, used when no cursor is given
+        cursor: Cursor from a previous response's next_cursor
+        total: 'exact', 'estimated' or 'none' (default: exact for page
+            requests, estimated for cursor requests)
+        serializer: RowSerializer selecting plain column tuples instead of
+            model instances
+
+    Returns:
+        (rows, metadata)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    columns = sort_columns(model)
+    query = query.order_by(*[column.desc() for column in columns])
+
+    if cursor:
+        seek = tuple_(*columns) < tuple_(*decode_cursor(cursor, len(columns)))
+        total_mode = total if total in TOTAL_MODES else 'estimated'
+    else:
+        page = max(page, 1)
+        total_mode = total if total in TOTAL_MODES else 'exact'
+
+    # Totals always cover the whole filtered set
+    count, estimated = count_total(query, model, total_mode)
+    if cursor:
+        query = query.filter(seek)
+    if serializer is not None:
+        query = serializer.apply(query)
+
+    offset = 0 if cursor else (page - 1) * per_page
+    rows = query.offset(offset).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    metadata = {
+        'per_page': per_page,
+        'total': count,
+        'total_estimated': estimated,
+        'has_next': has_next,
+        'next_cursor': encode_cursor(row_sort_key(model, rows[-1])) if has_next else None,
+    }
+    if not cursor:
+        metadata.update({
+            'page': page,
+            'total_pages': -(-count // per_page) if count is not None else None,
+            'has_prev': page > 1,
+        })
+    return rows, metadata
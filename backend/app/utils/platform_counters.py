@@ -0,0 +1,181 @@
+"""
+Platform counters for /public/stats
+
+Row counts of the landing-page tables and the number of active API keys
+are kept in one Redis hash instead of being counted on every hit.
+
+Session events keep them current: after each flush the inserted/deleted
+rows (and API keys activated or deactivated) are tallied, and the deltas
+are applied with HINCRBY once the transaction commits. This covers
+ingestion connectors, seed scripts and key management alike, since they
+all write through the ORM session. Rolled back transactions are ignored.
+
+The hash is rebuilt from the database when it is missing and
+periodically by tasks.maintenance.reconcile_platform_counters, which
+corrects any drift (writes bypassing the ORM, Redis outages).
+"""
+from collections import Counter
+from typing import Dict
+
+from sqlalchemy import event, func, inspect, select
+
+from app import db
+from app.utils.anti_scraping import get_redis_client
+
+COUNTERS_KEY = 'platform:counters'
+
+# Session.info key of the deltas of the current transaction
+_PENDING_KEY = 'platform_counter_deltas'
+
+# Applies deltas only when the hash exists: a missing hash is rebuilt by
+# the next read, which already includes these changes
+APPLY_DELTAS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+_apply_deltas_script = None
+
+
+def counted_models() -> Dict:
+    """Counter name of each counted model"""
+    from app.models.agriculture import AgriStats
+    from app.models.business import BusinessStats
+    from app.models.employment import EmploymentStats
+    from app.models.geo import Commune
+    from app.models.realestate import RealEstateStats
+
+    return {
+        Commune: 'communes',
+        AgriStats: 'agriculture',
+        RealEstateStats: 'real_estate',
+        EmploymentStats: 'employment',
+        BusinessStats: 'business',
+    }
+
+
+def count_from_database() -> Dict[str, int]:
+    """All counters, computed with a single statement"""
+    from app.models.auth import ApiKey
+
+    columns = [
+        select(func.count()).select_from(model).scalar_subquery().label(name)
+        for model, name in counted_models().items()
+    ]
+    columns.append(
+        select(func.count()).select_from(ApiKey).where(ApiKey.is_active == True)
+        .scalar_subquery().label('active_users')
+    )
+    return dict(db.session.execute(select(*columns)).mappings().one())
+
+
+def reconcile_counters() -> Dict[str, int]:
+    """
+    Rebuild the counters hash from the database
+
+    Returns:
+        Counters (also when Redis is unavailable)
+    """
+    counters = count_from_database()
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.delete(COUNTERS_KEY)
+        pipe.hset(COUNTERS_KEY, mapping=counters)
+        pipe.execute()
+    except Exception:
+        pass
+    return counters
+
+
+def get_counters() -> Dict[str, int]:
+    """
+    Current counters
+
+    One HGETALL; falls back to the database when the hash is missing or
+    Redis is unavailable.
+    """
+    try:
+        cached = get_redis_client().hgetall(COUNTERS_KEY)
+    except Exception:
+        return count_from_database()
+
+    expected = set(counted_models().values()) | {'active_users'}
+    if not expected.issubset(cached):
+        return reconcile_counters()
+    return {name: int(cached[name]) for name in expected}
+
+
+def _active_key_delta(api_key, state) -> int:
+    """Change of the active key count made by a pending API key update"""
+    history = state.attrs.is_active.history
+    if not history.has_changes():
+        return 0
+    was_active = bool(history.deleted[0]) if history.deleted else False
+    return int(bool(api_key.is_active)) - int(was_active)
+
+
+def _after_flush(session, flush_context):
+    from app.models.auth import ApiKey
+
+    models = counted_models()
+    deltas = session.info.setdefault(_PENDING_KEY, Counter())
+
+    for obj in session.new:
+        name = models.get(type(obj))
+        if name:
+            deltas[name] += 1
+        elif isinstance(obj, ApiKey) and obj.is_active is not False:
+            # is_active defaults to True
+            deltas['active_users'] += 1
+
+    for obj in session.deleted:
+        name = models.get(type(obj))
+        if name:
+            deltas[name] -= 1
+        elif isinstance(obj, ApiKey):
+            history = inspect(obj).attrs.is_active.history
+            previous = history.deleted or history.unchanged
+            if previous and previous[0]:
+                deltas['active_users'] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, ApiKey) and obj not in session.deleted:
+            deltas['active_users'] += _active_key_delta(obj, inspect(obj))
+
+
+def _after_commit(session):
+    global _apply_deltas_script
+
+    deltas = session.info.pop(_PENDING_KEY, None)
+    args = []
+    for name, delta in (deltas or {}).items():
+        if delta:
+            args.extend([name, delta])
+    if not args:
+        return
+
+    try:
+        if _apply_deltas_script is None:
+            _apply_deltas_script = get_redis_client().register_script(APPLY_DELTAS_SCRIPT)
+        _apply_deltas_script(keys=[COUNTERS_KEY], args=args)
+    except Exception:
+        # Corrected by the next reconciliation
+        pass
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_counter_events(session):
+    """Attach the counter listeners to a (scoped) session, once"""
+    for name, listener in (('after_flush', _after_flush),
+                           ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(session, name, listener):
+            event.listen(session, name, listener)
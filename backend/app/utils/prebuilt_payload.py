@@ -0,0 +1,86 @@
+"""
+Prebuilt, precompressed payloads
+
+Parameterless public endpoints whose data only changes with the data
+version (commune lists) are serialized once per version and process,
+compressed once per content coding at the highest level, and kept in
+memory. The hot path is a dictionary lookup: no database access, no
+serialization, no compression.
+
+The codings are those enabled for dynamic compression
+(COMPRESSION_ENABLED / COMPRESSION_ENCODINGS), negotiated in the same
+order, so both paths answer a given Accept-Encoding alike. Each coding
+has its own strong ETag (the body hash plus a coding
+suffix), and If-None-Match requests get a bodyless 304.
+"""
+import threading
+from functools import wraps
+
+from flask import Response, request
+
+from app.utils.compression import choose_encoding, compress_all, enabled_encodings
+from app.utils.data_version import get_data_version
+from app.utils.response_cache import make_etag
+from app.utils.serializer import dumps
+
+
+def prebuilt_payload(max_age: int = 3600):
+    """
+    Decorator serving a Resource method's result as a prebuilt payload
+
+    The method must not depend on query arguments; it is called again
+    only when the data version changes.
+
+    Args:
+        max_age: Seconds shared caches and browsers may reuse the response
+
+    Usage:
+        @prebuilt_payload()
+        def get(self):
+            ...
+    """
+    cache_control = f'public, max-age={max_age}'
+
+    def decorator(f):
+        # (version, encodings, etag, payloads by coding), replaced as a whole
+        state = {'current': None}
+        lock = threading.Lock()
+
+        def current_build(encodings, *args, **kwargs):
+            version = get_data_version()
+            current = state['current']
+            # Redis unavailable: keep serving the last build
+            if current is not None and version in (current[0], None) and current[1] == encodings:
+                return current
+
+            with lock:
+                current = state['current']
+                if current is None or current[0] != version or current[1] != encodings:
+                    body = dumps(f(*args, **kwargs))
+                    current = (version, encodings, make_etag(body), compress_all(body.encode(), encodings))
+                    state['current'] = current
+            return current
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            encodings = enabled_encodings()
+            version, _, base_etag, payloads = current_build(encodings, *args, **kwargs)
+            encoding = choose_encoding(request.accept_encodings, encodings)
+            etag = base_etag if encoding == 'identity' else f'{base_etag}-{encoding}'
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(payloads[encoding], status=200, mimetype='application/json')
+                if encoding != 'identity':
+                    response.headers['Content-Encoding'] = encoding
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.headers['Vary'] = 'Accept-Encoding'
+            if version is not None:
+                response.headers['X-Data-Version'] = str(version)
+            return response
+
+        return decorated_function
+    return decorator
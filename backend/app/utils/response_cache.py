@@ -0,0 +1,131 @@
+"""
+Version-keyed response cache with ETags
+
+Read endpoints decorated with @cached_response store their JSON body in
+Redis under (endpoint, normalized query args, scope class, data version).
+A data version bump (see app.utils.data_version) therefore invalidates
+every entry at once; entries also expire after their TTL.
+
+Every cached response carries a strong ETag (hash of the body) and
+If-None-Match requests get a bodyless 304. The comparison is weak, since
+compress_response() weakens the ETags of the responses it compresses.
+The Cache-Control policy is chosen per route:
+
+- public: shareable by nginx and browsers (landing-page endpoints)
+- private: browser only, revalidated with the ETag on each use
+  (authenticated payloads; Vary: X-API-KEY)
+
+Place the decorator below @require_api_key so authentication, scopes
+and rate limits are still checked on cache hits.
+"""
+import hashlib
+from functools import wraps
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from flask import Response, g, request
+
+from app.utils.anti_scraping import DataNoiseInjector, get_redis_client
+from app.utils.data_version import get_data_version
+from app.utils.serializer import dumps
+
+CACHE_PREFIX = 'response'
+
+POLICIES = {
+    'public': 'public, max-age={max_age}',
+    'private': 'private, no-cache',
+}
+
+
+def scope_class(api_key_info: Optional[Dict] = None) -> str:
+    """
+    Class of callers that receive identical payloads
+
+    Anonymous callers share one class, as do callers served clean data
+    (admin / direct API). Noise is seeded per API key
+    (DataNoiseInjector.caller_seed), so each standard caller is its own
+    class.
+    """
+    if not api_key_info:
+        return 'anonymous'
+    if not DataNoiseInjector.should_apply_noise(api_key_info):
+        return 'clean'
+    return f"standard:{api_key_info.get('id')}"
+
+
+def cache_key(version: int) -> str:
+    """Redis key of the current request's response"""
+    args = urlencode(sorted(request.args.items(multi=True)))
+    scope = scope_class(getattr(g, 'api_key_info', None))
+    raw = f"{request.endpoint}|{request.view_args}|{args}|{scope}"
+    return f"{CACHE_PREFIX}:{version}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def make_etag(body: str) -> str:
+    """Strong ETag (unquoted) of a response body"""
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def cached_response(policy: str = 'private', ttl: int = 300, max_age: int = 60):
+    """
+    Decorator caching a Resource method's 200 responses
+
+    Args:
+        policy: 'public' or 'private' Cache-Control policy
+        ttl: Seconds an entry is kept in Redis
+        max_age: Seconds shared caches may reuse a public response
+
+    Usage:
+        @require_api_key('agriculture:read')
+        @cached_response()
+        def get(self):
+            ...
+    """
+    cache_control = POLICIES[policy].format(max_age=max_age)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = get_data_version()
+            if version is None:
+                # Redis unavailable: serve uncached
+                return f(*args, **kwargs)
+
+            key = cache_key(version)
+            try:
+                entry = get_redis_client().hgetall(key)
+            except Exception:
+                entry = None
+
+            if entry:
+                body, etag = entry['body'], entry['etag']
+            else:
+                result = f(*args, **kwargs)
+                data, status = (result[0], result[1]) if isinstance(result, tuple) else (result, 200)
+                if status != 200 or isinstance(data, Response):
+                    return result
+
+                body = dumps(data)
+                etag = make_etag(body)
+                try:
+                    pipe = get_redis_client().pipeline(transaction=False)
+                    pipe.hset(key, mapping={'body': body, 'etag': etag})
+                    pipe.expire(key, ttl)
+                    pipe.execute()
+                except Exception:
+                    pass
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, status=200, mimetype='application/json')
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.headers['X-Data-Version'] = str(version)
+            if policy == 'private':
+                response.headers['Vary'] = 'X-API-KEY'
+            return response
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,186 @@
+"""
+Compiled row serializers
+
+BaseModel.to_dict walks __table__.columns with getattr and an isinstance
+check per cell on fully loaded ORM instances. A RowSerializer is built
+once per (model, fields, relations): it selects plain column tuples (no
+identity map, no instance state), joins the serialized relations' id and
+name, and maps each tuple to the same dict shape with a precomputed plan.
+
+Sparse fieldsets (fields=commune_id,year,crop) are parsed by
+parse_fields() and change the SELECT list: only the requested columns
+are read and only the requested relations are joined.
+
+dumps() encodes with orjson when it is installed.
+"""
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import DateTime, Date
+from sqlalchemy.orm import aliased
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class InvalidFields(ValueError):
+    """fields= parameter naming unknown columns or relations"""
+    pass
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(data) -> str:
+    """Encode a response payload as compact JSON"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default).decode()
+    return json.dumps(data, separators=(',', ':'), default=_default)
+
+
+class RowSerializer:
+    """
+    Serializer of a model's rows to to_dict()-shaped dictionaries
+
+    Args:
+        model: Mapped model class
+        fields: Column names to output (default: all table columns, in
+            table order)
+        relations: Relationship names serialized as {'id', 'name'}
+        hidden: Column names selected (readable as row attributes, e.g. for
+            cursors) but not output
+    """
+
+    def __init__(self, model, fields: Optional[Sequence[str]] = None, relations: Sequence[str] = (),
+                 hidden: Sequence[str] = ()):
+        table_columns = {column.name: column for column in model.__table__.columns}
+        names = list(fields) if fields is not None else list(table_columns)
+        hidden = [name for name in hidden if name not in names]
+
+        self.model = model
+        self.keys = tuple(names)
+        self.columns = [getattr(model, name).label(name) for name in names + hidden]
+
+        # (key, position) of values that need converting
+        self.conversions = [
+            (name, i) for i, name in enumerate(names)
+            if isinstance(table_columns[name].type, (DateTime, Date))
+        ]
+
+        # Relations are outer-joined through aliases: (name, relationship, alias)
+        self.joins = []
+        self.relations = []
+        position = len(names) + len(hidden)
+        for name in relations:
+            relation = getattr(model, name)
+            alias = aliased(relation.property.mapper.class_)
+            self.joins.append((relation, alias))
+            self.columns.append(alias.id.label(f'{name}__id'))
+            self.columns.append(alias.name.label(f'{name}__name'))
+            self.relations.append((name, position, position + 1))
+            position += 2
+
+    def apply(self, query):
+        """Turn a query on the model into a query of plain column tuples"""
+        for relation, alias in self.joins:
+            query = query.outerjoin(relation.of_type(alias))
+        return query.with_entities(*self.columns)
+
+    def fetch(self, query=None) -> List[Dict]:
+        """Run a query on the model (default: all rows) and serialize it"""
+        query = query if query is not None else self.model.query
+        return self.to_dicts(self.apply(query).all())
+
+    def to_dicts(self, rows: Iterable) -> List[Dict]:
+        """Map column tuples (from apply()) to dictionaries"""
+        keys = self.keys
+        size = len(keys)
+        conversions = self.conversions
+        relations = self.relations
+
+        items = []
+        for row in rows:
+            item = dict(zip(keys, row[:size]))
+            for key, i in conversions:
+                value = row[i]
+                if value is not None:
+                    item[key] = value.isoformat()
+            for name, id_index, name_index in relations:
+                if row[id_index] is not None:
+                    item[name] = {'id': row[id_index], 'name': row[name_index]}
+            items.append(item)
+        return items
+
+
+_serializers = {}
+_lock = threading.Lock()
+
+
+def parse_fields(model, value: Optional[str]) -> Tuple[Optional[List[str]], Union[bool, Tuple[str, ...]]]:
+    """
+    Parse a fields= parameter
+
+    Args:
+        model: Mapped model class
+        value: Comma-separated column and relation names, or None
+
+    Returns:
+        (fields, include_relations) for get_serializer(); all columns and
+        all serialized relations when value is empty
+
+    Raises:
+        InvalidFields: If a name is neither a column nor a serialized relation
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    if not names:
+        return None, True
+
+    columns = [column.name for column in model.__table__.columns]
+    relations = getattr(model, 'SERIALIZED_RELATIONS', ())
+    unknown = [name for name in names if name not in columns and name not in relations]
+    if unknown:
+        raise InvalidFields(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Available: {', '.join(columns + list(relations))}"
+        )
+
+    names = list(dict.fromkeys(names))
+    return [name for name in names if name in columns], tuple(name for name in names if name in relations)
+
+
+def get_serializer(model, fields: Optional[Sequence[str]] = None,
+                   include_relations: Union[bool, Sequence[str]] = False,
+                   hidden: Sequence[str] = ()) -> RowSerializer:
+    """
+    Cached serializer of a model
+
+    Args:
+        model: Mapped model class
+        fields: Column names to output (default: all columns)
+        include_relations: True to serialize the model's
+            SERIALIZED_RELATIONS, like to_dict(include_relations=True), or
+            the names of the relations to serialize
+        hidden: Column names selected but not output
+    """
+    if include_relations is True:
+        relations = tuple(getattr(model, 'SERIALIZED_RELATIONS', ()))
+    else:
+        relations = tuple(include_relations or ())
+
+    key = (model, tuple(fields) if fields is not None else None, relations, tuple(hidden))
+    serializer = _serializers.get(key)
+    if serializer is None:
+        serializer = RowSerializer(model, fields=fields, relations=relations, hidden=hidden)
+        with _lock:
+            _serializers[key] = serializer
+    return serializer
@@ -33,6 +33,7 @@ celery_app.config_from_object('app.celeryconfig')
 
 # Import all task modules to register them
 from app.tasks import scheduler
+from app.tasks import maintenance
 from app.tasks import agriculture
 from app.tasks import realestate
 from app.tasks import employment
@@ -0,0 +1,25 @@
+"""add_api_key_rate_limit_burst
+
+Revision ID: c32f52636c0e
+Revises: 7ca15f2fb504
+Create Date: 2026-10-16 09:10:12.482913
+
+Adds a per-key burst setting for the GCRA rate limiter.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c32f52636c0e'
+down_revision = '7ca15f2fb504'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('api_keys', sa.Column('rate_limit_burst', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('api_keys', 'rate_limit_burst')
@@ -0,0 +1,61 @@
+"""add_commune_simplified_geometries
+
+Revision ID: 5e2b8d41a7c3
+Revises: c32f52636c0e
+Create Date: 2026-10-17 09:30:41.208537
+
+Adds precomputed simplified commune geometries for GeoJSON clients:
+- geometry_medium: ST_SimplifyPreserveTopology, tolerance 0.001° (~110 m)
+- geometry_low: ST_SimplifyPreserveTopology, tolerance 0.01° (~1.1 km)
+
+A trigger keeps them in sync with communes.geometry, whatever loads it.
+"""
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8d41a7c3'
+down_revision = 'c32f52636c0e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('communes', sa.Column(
+        'geometry_medium', Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False), nullable=True
+    ))
+    op.add_column('communes', sa.Column(
+        'geometry_low', Geometry(geometry_type='MULTIPOLYGON', srid=4326, spatial_index=False), nullable=True
+    ))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION communes_simplify_geometry() RETURNS trigger AS $$
+        BEGIN
+            NEW.geometry_medium := ST_Multi(ST_SimplifyPreserveTopology(NEW.geometry, 0.001));
+            NEW.geometry_low := ST_Multi(ST_SimplifyPreserveTopology(NEW.geometry, 0.01));
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER communes_simplify_geometry
+        BEFORE INSERT OR UPDATE OF geometry ON communes
+        FOR EACH ROW EXECUTE FUNCTION communes_simplify_geometry()
+    """)
+
+    # Backfill existing communes
+    op.execute("""
+        UPDATE communes
+        SET geometry_medium = ST_Multi(ST_SimplifyPreserveTopology(geometry, 0.001)),
+            geometry_low = ST_Multi(ST_SimplifyPreserveTopology(geometry, 0.01))
+        WHERE geometry IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS communes_simplify_geometry ON communes")
+    op.execute("DROP FUNCTION IF EXISTS communes_simplify_geometry()")
+    op.drop_column('communes', 'geometry_low')
+    op.drop_column('communes', 'geometry_medium')
@@ -0,0 +1,38 @@
+"""add_index_keyset_sort_indexes
+
+Revision ID: 1b64a267b70b
+Revises: 5e2b8d41a7c3
+Create Date: 2026-10-17 14:00:27.316204
+
+Adds indexes matching the keyset sort of the /index endpoints
+(year DESC, COALESCE(quarter, 0) DESC, id DESC; see app.utils.pagination),
+so a page, however deep, is read from the index instead of sorting the
+filtered table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b64a267b70b'
+down_revision = '5e2b8d41a7c3'
+branch_labels = None
+depends_on = None
+
+QUARTERLY_TABLES = {
+    'idx_real_estate_stats_sort': 'real_estate_stats',
+    'idx_employment_stats_sort': 'employment_stats',
+    'idx_business_stats_sort': 'business_stats',
+}
+
+
+def upgrade() -> None:
+    op.create_index('idx_agri_stats_sort', 'agri_stats', ['year', 'id'])
+    for name, table in QUARTERLY_TABLES.items():
+        op.create_index(name, table, ['year', sa.text('COALESCE(quarter, 0)'), 'id'])
+
+
+def downgrade() -> None:
+    for name, table in QUARTERLY_TABLES.items():
+        op.drop_index(name, table_name=table)
+    op.drop_index('idx_agri_stats_sort', table_name='agri_stats')
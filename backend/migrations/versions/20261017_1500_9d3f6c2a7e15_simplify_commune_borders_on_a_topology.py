@@ -0,0 +1,150 @@
+"""simplify_commune_borders_on_a_topology
+
+Revision ID: 9d3f6c2a7e15
+Revises: 1b64a267b70b
+Create Date: 2026-10-17 15:00:12.604381
+
+Migration 5e2b8d41a7c3 simplified each commune on its own, so the two
+copies of a shared border were simplified independently and drifted apart
+(gaps and overlaps up to the tolerance).
+
+Commune boundaries are now loaded into a PostGIS topology (communes_topo)
+where each shared border is a single edge. topology.ST_Simplify simplifies
+every edge once and rebuilds each commune from its edges, so neighbours
+keep identical borders at every resolution:
+- geometry_medium: tolerance 0.001° (~110 m)
+- geometry_low: tolerance 0.01° (~1.1 km)
+
+communes_rebuild_simplified_geometries() rebuilds the topology and both
+columns. It runs as a post-load step (tasks.maintenance.
+rebuild_commune_geometries), never inside the statement loading communes:
+the trigger only resets the simplified copies of the communes whose
+geometry changed, and readers fall back to the full geometry until the
+next rebuild.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6c2a7e15'
+down_revision = '1b64a267b70b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis_topology")
+
+    op.execute("DROP TRIGGER IF EXISTS communes_simplify_geometry ON communes")
+    op.execute("DROP FUNCTION IF EXISTS communes_simplify_geometry()")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION communes_rebuild_simplified_geometries() RETURNS integer AS $$
+        DECLARE
+            layer integer;
+            rebuilt integer;
+        BEGIN
+            -- One rebuild at a time (the topology is dropped and recreated)
+            PERFORM pg_advisory_xact_lock(hashtext('communes_rebuild_simplified_geometries'));
+
+            -- Start from an empty topology so edited boundaries leave no stale
+            -- edges; dropping it also drops its schema and the layer table
+            IF EXISTS (SELECT 1 FROM topology.topology WHERE name = 'communes_topo') THEN
+                PERFORM topology.DropTopology('communes_topo');
+            END IF;
+            PERFORM topology.CreateTopology('communes_topo', 4326);
+
+            CREATE TABLE communes_topo.commune_borders (commune_id integer PRIMARY KEY);
+            layer := topology.AddTopoGeometryColumn(
+                'communes_topo', 'communes_topo', 'commune_borders', 'topo_geometry', 'MULTIPOLYGON'
+            );
+
+            INSERT INTO communes_topo.commune_borders (commune_id, topo_geometry)
+            SELECT id, topology.toTopoGeom(geometry, 'communes_topo', layer)
+            FROM communes
+            WHERE geometry IS NOT NULL
+            ORDER BY id;
+
+            -- Only polygons are kept; communes whose edges all collapsed
+            -- (small islands) keep their full geometry
+            UPDATE communes c
+            SET geometry_medium = CASE WHEN ST_IsEmpty(s.medium) THEN c.geometry ELSE ST_Multi(s.medium) END,
+                geometry_low = CASE WHEN ST_IsEmpty(s.low) THEN c.geometry ELSE ST_Multi(s.low) END
+            FROM (
+                SELECT commune_id,
+                       ST_CollectionExtract(topology.ST_Simplify(topo_geometry, 0.001), 3) AS medium,
+                       ST_CollectionExtract(topology.ST_Simplify(topo_geometry, 0.01), 3) AS low
+                FROM communes_topo.commune_borders
+            ) s
+            WHERE s.commune_id = c.id;
+            GET DIAGNOSTICS rebuilt = ROW_COUNT;
+
+            UPDATE communes
+            SET geometry_medium = NULL, geometry_low = NULL
+            WHERE geometry IS NULL AND (geometry_medium IS NOT NULL OR geometry_low IS NOT NULL);
+
+            RETURN rebuilt;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # NULL marks a commune as stale until the next rebuild
+    op.execute("""
+        CREATE OR REPLACE FUNCTION communes_simplify_geometry() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                IF NEW.geometry IS NOT DISTINCT FROM OLD.geometry THEN
+                    RETURN NEW;
+                END IF;
+            END IF;
+            NEW.geometry_medium := NULL;
+            NEW.geometry_low := NULL;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER communes_simplify_geometry
+        BEFORE INSERT OR UPDATE OF geometry ON communes
+        FOR EACH ROW EXECUTE FUNCTION communes_simplify_geometry()
+    """)
+
+    # The per-row simplified copies are stale; the next rebuild replaces them
+    op.execute("UPDATE communes SET geometry_medium = NULL, geometry_low = NULL")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS communes_simplify_geometry ON communes")
+    op.execute("DROP FUNCTION IF EXISTS communes_simplify_geometry()")
+    op.execute("DROP FUNCTION IF EXISTS communes_rebuild_simplified_geometries()")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM topology.topology WHERE name = 'communes_topo') THEN
+                PERFORM topology.DropTopology('communes_topo');
+            END IF;
+        END
+        $$
+    """)
+
+    # Back to the per-row simplification of migration 5e2b8d41a7c3
+    op.execute("""
+        CREATE OR REPLACE FUNCTION communes_simplify_geometry() RETURNS trigger AS $$
+        BEGIN
+            NEW.geometry_medium := ST_Multi(ST_SimplifyPreserveTopology(NEW.geometry, 0.001));
+            NEW.geometry_low := ST_Multi(ST_SimplifyPreserveTopology(NEW.geometry, 0.01));
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER communes_simplify_geometry
+        BEFORE INSERT OR UPDATE OF geometry ON communes
+        FOR EACH ROW EXECUTE FUNCTION communes_simplify_geometry()
+    """)
+    op.execute("""
+        UPDATE communes
+        SET geometry_medium = ST_Multi(ST_SimplifyPreserveTopology(geometry, 0.001)),
+            geometry_low = ST_Multi(ST_SimplifyPreserveTopology(geometry, 0.01))
+        WHERE geometry IS NOT NULL
+    """)
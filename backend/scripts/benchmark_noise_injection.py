@@ -0,0 +1,104 @@
+"""
+Benchmark for DataNoiseInjector
+
+Compares the previous recursive implementation (random.gauss per field)
+with the deterministic vectorized one, on response-shaped pages and on
+NumPy columns. No database or Redis needed.
+
+Usage:
+    python scripts/benchmark_noise_injection.py [rows]
+"""
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+
+from app.utils.anti_scraping import DataNoiseInjector
+
+SECTOR = 'agriculture'
+API_KEY_INFO = {'id': 42, 'is_admin': False, 'can_api_direct': False}
+
+
+def legacy_apply_to_response(data, sector):
+    """Previous implementation (random noise, recursive walk)"""
+    noisy_fields = DataNoiseInjector.NOISY_FIELDS.get(sector, [])
+
+    if isinstance(data, dict):
+        return {
+            k: legacy_apply_to_response(v, sector)
+            if k not in noisy_fields
+            else DataNoiseInjector.add_noise(v, 'low', k)
+            for k, v in data.items()
+        }
+    elif isinstance(data, list):
+        return [legacy_apply_to_response(item, sector) for item in data]
+    return data
+
+
+def make_page(rows):
+    """Paginated response shaped like /agriculture/index"""
+    return {
+        'items': [
+            {
+                'id': i,
+                'commune_id': i % 77 + 1,
+                'crop_id': i % 12 + 1,
+                'year': 2015 + i % 10,
+                'production_tonnes': random.uniform(10, 50000),
+                'yield_tonnes_per_ha': random.uniform(0.5, 20),
+                'area_harvested_ha': random.uniform(1, 10000),
+                'price_per_kg': random.uniform(50, 1500),
+                'agri_value_index': random.uniform(0, 100),
+                'commune': {'id': i % 77 + 1, 'name': f'Commune {i % 77}'},
+                'crop': {'id': i % 12 + 1, 'name': f'Crop {i % 12}'},
+            }
+            for i in range(rows)
+        ],
+        'total': rows,
+        'page': 1,
+        'per_page': rows,
+    }
+
+
+def measure(label, func, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"{label:<36} p50={samples[len(samples) // 2]:.3f}ms  min={samples[0]:.3f}ms")
+    return samples[len(samples) // 2]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    page = make_page(rows)
+    columns = {
+        field: np.array([item[field] for item in page['items']])
+        for field in DataNoiseInjector.NOISY_FIELDS[SECTOR]
+    }
+    record_keys = np.arange(rows, dtype=np.uint64)
+
+    print(f"Noise injection benchmark ({rows} rows, {len(columns)} noisy fields)")
+    print("=" * 60)
+
+    legacy = measure("legacy recursive random.gauss", lambda: legacy_apply_to_response(page, SECTOR))
+    current = measure("deterministic apply_to_response", lambda: DataNoiseInjector.apply_to_response(page, SECTOR, API_KEY_INFO))
+    measure("deterministic apply_to_columns", lambda: DataNoiseInjector.apply_to_columns(columns, record_keys, SECTOR, API_KEY_INFO))
+
+    print("=" * 60)
+    print(f"apply_to_response speedup: {legacy / current:.1f}x")
+
+    first = DataNoiseInjector.apply_to_response(page, SECTOR, API_KEY_INFO)
+    second = DataNoiseInjector.apply_to_response(page, SECTOR, API_KEY_INFO)
+    print(f"Repeated calls identical: {first == second}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark for RateLimiter.check_rate_limit Redis cost
+
+Compares the legacy fixed-window limiter (INCR + EXPIRE per window, one
+round trip per command) with the single-call GCRA script, against the
+Redis configured in REDIS_URL.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import redis
+
+from app.utils.anti_scraping import RATE_LIMIT_SCRIPT
+
+WINDOWS = [
+    ('minute', 60, 1000000),
+    ('hour', 3600, 1000000),
+    ('day', 86400, 1000000),
+]
+
+
+def legacy_check(client, key_prefix):
+    """Previous implementation: up to 6 sequential round trips"""
+    now = int(time.time())
+    for window_name, window_seconds, limit in WINDOWS:
+        key = f"{key_prefix}:{window_name}:{now // window_seconds}"
+        current = client.incr(key)
+        if current == 1:
+            client.expire(key, window_seconds)
+        if current > limit:
+            return False
+    return True
+
+
+def gcra_check(script, key_prefix):
+    """Current implementation: one EVALSHA round trip"""
+    keys = [f"{key_prefix}:{window_name}" for window_name, _, _ in WINDOWS]
+    args = []
+    for _, window_seconds, limit in WINDOWS:
+        args.extend([window_seconds, limit, limit])
+    return script(keys=keys, args=args)[0] == 1
+
+
+def measure(label, func, iterations):
+    """Run func and print per-request latency percentiles"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    mean = statistics.mean(samples)
+    print(f"{label:<28} mean={mean:.3f}ms  p50={p50:.3f}ms  p99={p99:.3f}ms")
+    return mean
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), decode_responses=True)
+    script = client.register_script(RATE_LIMIT_SCRIPT)
+
+    # Count round trips per request for each implementation
+    legacy_rtts = 6  # first request in each window: INCR + EXPIRE x 3
+    gcra_rtts = 1
+
+    print(f"Rate limiter benchmark ({iterations} requests, {client.connection_pool.connection_kwargs.get('host')})")
+    print("=" * 60)
+
+    # Warm up (loads the script, fills the connection pool)
+    gcra_check(script, 'bench:gcra')
+    legacy_check(client, 'bench:legacy')
+
+    legacy_mean = measure(f"legacy INCR/EXPIRE (<= {legacy_rtts} RTT)", lambda: legacy_check(client, 'bench:legacy'), iterations)
+    gcra_mean = measure(f"GCRA script ({gcra_rtts} RTT)", lambda: gcra_check(script, 'bench:gcra'), iterations)
+
+    print("=" * 60)
+    print(f"Saved per request: {legacy_mean - gcra_mean:.3f}ms ({legacy_mean / gcra_mean:.1f}x faster)")
+
+    client.delete(*client.keys('bench:*'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of /agriculture/index row serialization
+
+Compares the previous path (ORM instances with joined relations, then
+to_dict(include_relations=True) and json.dumps) with the compiled
+RowSerializer (plain column tuples, precomputed mapping plan and orjson)
+on one page of agri_stats from the database configured in DATABASE_URL.
+
+Usage:
+    python scripts/benchmark_serializer.py [per_page] [iterations]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app import create_app, db
+from app.models.agriculture import AgriStats
+from app.utils.pagination import sort_columns
+from app.utils.serializer import dumps, get_serializer, orjson
+
+
+def page_query(per_page):
+    """First page of the /index ordering"""
+    return AgriStats.query.order_by(*[column.desc() for column in sort_columns(AgriStats)]).limit(per_page)
+
+
+def legacy_page(per_page):
+    """Previous implementation: ORM instances + to_dict + json.dumps"""
+    stats = page_query(per_page).options(*AgriStats.eager_relations()).all()
+    data = [stat.to_dict(include_relations=True) for stat in stats]
+    body = json.dumps(data, separators=(',', ':'), default=str)
+    db.session.expunge_all()
+    return len(data), body
+
+
+def serializer_page(per_page):
+    """Current implementation: column tuples + RowSerializer + dumps"""
+    serializer = get_serializer(AgriStats, include_relations=True)
+    data = serializer.to_dicts(serializer.apply(page_query(per_page)).all())
+    return len(data), dumps(data)
+
+
+def measure(label, func, per_page, iterations):
+    """Run func and print latency and throughput"""
+    samples = []
+    rows = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows, _ = func(per_page)
+        samples.append(time.perf_counter() - start)
+
+    mean = statistics.mean(samples)
+    p50 = sorted(samples)[len(samples) // 2]
+    print(f"{label:<24} mean={mean * 1000:.2f}ms  p50={p50 * 1000:.2f}ms  rows/sec={rows / mean:,.0f}")
+    return mean
+
+
+def main():
+    per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    app = create_app()
+    with app.app_context():
+        print(f"Serializer benchmark (per_page={per_page}, {iterations} iterations, "
+              f"encoder={'orjson' if orjson is not None else 'json'})")
+        print("=" * 60)
+
+        # Same payload from both paths
+        _, legacy_body = legacy_page(per_page)
+        _, serializer_body = serializer_page(per_page)
+        assert json.loads(legacy_body) == json.loads(serializer_body), 'payloads differ'
+
+        legacy = measure('to_dict + json', legacy_page, per_page, iterations)
+        compiled = measure('RowSerializer + dumps', serializer_page, per_page, iterations)
+
+        print("=" * 60)
+        print(f"Speedup: {legacy / compiled:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
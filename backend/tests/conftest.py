@@ -0,0 +1,230 @@
+"""
+Test fixtures
+
+Tests run against the PostgreSQL/PostGIS database of TestingConfig
+(override it with TEST_DATABASE_URL); those needing the database are
+skipped when it is unreachable. Redis is replaced by an in-memory
+fakeredis server, emptied before each test.
+
+Usage:
+    cd backend && python -m pytest
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import fakeredis
+import pytest
+from sqlalchemy import Boolean, Float, Integer, event, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.models.agriculture import AgriStats, Crop
+from app.models.auth import ApiKey
+from app.models.business import BusinessSector, BusinessStats
+from app.models.employment import EmploymentStats, JobCategory
+from app.models.geo import Commune, Country, Region
+from app.models.metadata import DataSource
+from app.models.realestate import PropertyType, RealEstateStats
+from app.services import cube
+from app.utils import anti_scraping, api_key_cache, data_version
+
+# Sector -> (stats model, category model, category foreign key)
+SECTORS = {
+    'agriculture': (AgriStats, Crop, 'crop_id'),
+    'realestate': (RealEstateStats, PropertyType, 'property_type_id'),
+    'employment': (EmploymentStats, JobCategory, 'job_category_id'),
+    'business': (BusinessStats, BusinessSector, 'sector_id'),
+}
+
+COMMUNES = 3
+CATEGORIES = 2
+YEARS = range(2019, 2024)
+
+# Columns filled by the fixtures rather than with generated values
+KEY_COLUMNS = {'id', 'commune_id', 'data_source_id', 'year', 'quarter', 'created_at', 'updated_at'}
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Application configured for tests, with Redis replaced by fakeredis"""
+    tmp_dir = tempfile.mkdtemp(prefix='tedi-tests-')
+    app = create_app('testing')
+    app.config.update(
+        STATS_CUBE_ENABLED=False,
+        STATS_CUBE_DIR=os.path.join(tmp_dir, 'cubes'),
+        TILE_CACHE_DIR=os.path.join(tmp_dir, 'tiles'),
+    )
+
+    anti_scraping._redis_client = anti_scraping.InstrumentedRedis(
+        connection_pool=fakeredis.FakeRedis(decode_responses=True).connection_pool
+    )
+
+    yield app
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def redis_client(app):
+    """Empty Redis and the per-process caches built on it"""
+    client = anti_scraping._redis_client
+    client.flushall()
+
+    api_key_cache._api_key_cache = None
+    data_version._local.update(version=None, read_at=0.0)
+    cube._cubes.clear()
+    return client
+
+
+@pytest.fixture(scope='session')
+def database(app):
+    """Database with every table created (skips the test if unreachable)"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as connection:
+                if connection.dialect.name == 'postgresql':
+                    connection.execute(text('CREATE EXTENSION IF NOT EXISTS postgis'))
+                    connection.commit()
+        except OperationalError as e:
+            pytest.skip(f'Test database unavailable: {e}')
+
+        db.drop_all()
+        db.create_all()
+
+    yield db
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def session(database):
+    """Database session; every table is emptied after the test"""
+    yield database.session
+
+    database.session.remove()
+    with database.engine.begin() as connection:
+        for table in reversed(database.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture
+def api_key(session):
+    """Raw admin API key with every scope and export permission"""
+    key = ApiKey.create_key(
+        name='Tests',
+        owner_name='Tests',
+        owner_email='tests@example.org',
+        scopes=['*'],
+        is_admin=True,
+        can_export=True,
+    )
+    key.rate_limit_per_hour = 100000
+    key.rate_limit_per_day = 1000000
+    session.add(key)
+    session.commit()
+    return key.key
+
+
+@pytest.fixture
+def auth_headers(api_key):
+    return {'X-API-KEY': api_key}
+
+
+def _generated_value(column, i: int):
+    """Deterministic column value, with some NULLs and zeros"""
+    if isinstance(column.type, Boolean):
+        return i % 3 == 0
+    if i % 7 == 0:
+        return None
+    if i % 11 == 0:
+        return 0
+    if isinstance(column.type, Integer):
+        return (i * 37) % 500 + 1
+    if isinstance(column.type, Float):
+        return round((i * 7.3) % 97 + 0.5, 2)
+    return None
+
+
+@pytest.fixture
+def stats_data(session):
+    """
+    Communes, categories and statistics of every sector
+
+    Each sector gets COMMUNES x CATEGORIES x YEARS records; outside
+    agriculture some are quarterly and some yearly (quarter NULL). Numeric
+    columns get generated values, including NULLs and zeros.
+
+    Returns:
+        Dictionary of sector -> {'records': count, 'category_ids': [...]}
+    """
+    country = Country(name='Benin', iso_code='BEN')
+    session.add(country)
+    session.flush()
+    region = Region(name='Littoral', country_id=country.id)
+    session.add(region)
+    session.flush()
+
+    communes = [Commune(name=f'Commune {i}', region_id=region.id, population=1000 * i) for i in range(1, COMMUNES + 1)]
+    sources = [DataSource(name=f'Source {i}') for i in range(1, 3)]
+    session.add_all(communes + sources)
+    session.flush()
+
+    data = {}
+    for sector, (model, category_model, category_key) in SECTORS.items():
+        categories = [category_model(name=f'{sector} category {i}') for i in range(1, CATEGORIES + 1)]
+        session.add_all(categories)
+        session.flush()
+
+        i = 0
+        for commune in communes:
+            for category in categories:
+                for year in YEARS:
+                    i += 1
+                    values = {
+                        column.name: _generated_value(column, i)
+                        for column in model.__table__.columns
+                        if column.name not in KEY_COLUMNS and not column.foreign_keys
+                    }
+                    values.update({
+                        'commune_id': commune.id,
+                        category_key: category.id,
+                        'data_source_id': sources[i % 2].id,
+                        'year': year,
+                    })
+                    if hasattr(model, 'quarter'):
+                        values['quarter'] = None if i % 3 == 0 else i % 4 + 1
+                    session.add(model(**values))
+        data[sector] = {'records': i, 'category_ids': [category.id for category in categories]}
+
+    session.commit()
+    return data
+
+
+@pytest.fixture
+def count_queries(database):
+    """
+    Context manager collecting the SQL statements executed in its block
+
+    Usage:
+        with count_queries() as statements:
+            ...
+        assert len(statements) == 2
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(database.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(database.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
@@ -0,0 +1,37 @@
+"""
+API key cache
+"""
+from app.models.auth import ApiKey
+from app.utils.api_key_cache import get_api_key_cache, invalidate_api_key
+
+
+def test_validated_keys_are_served_without_the_database(api_key, count_queries):
+    cache = get_api_key_cache()
+    assert cache.get(api_key).is_valid()
+
+    with count_queries() as statements:
+        entry = cache.get(api_key)
+    assert statements == []
+    assert entry.has_scope('agriculture:read')
+
+    # Another process: empty local level, served by Redis
+    cache.clear_local()
+    with count_queries() as statements:
+        assert cache.get(api_key).can_export
+    assert statements == []
+
+
+def test_unknown_keys_are_not_cached(session, redis_client):
+    assert get_api_key_cache().get('not-a-key') is None
+    assert redis_client.keys('apikey:*') == []
+
+
+def test_revocation_is_visible_after_invalidation(api_key, session):
+    cache = get_api_key_cache()
+    assert cache.get(api_key).is_valid()
+
+    ApiKey.query.filter_by(key=api_key).update({'is_active': False})
+    session.commit()
+    invalidate_api_key(api_key)
+
+    assert not cache.get(api_key).is_valid()
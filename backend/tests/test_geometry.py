@@ -0,0 +1,30 @@
+"""
+Simplified commune geometry rebuild
+"""
+from app.models.geo import Commune
+from app.tasks.maintenance import rebuild_commune_geometries
+from app.utils.data_version import get_data_version
+
+SQUARE = 'SRID=4326;MULTIPOLYGON(((2 6,2.1 6,2.1 6.1,2 6.1,2 6)))'
+
+
+def test_rebuild_is_skipped_when_no_geometry_changed(stats_data):
+    version = get_data_version()
+
+    assert rebuild_commune_geometries() == {'status': 'up_to_date'}
+    assert get_data_version() == version
+
+
+def test_failed_rebuild_keeps_the_loaded_communes(stats_data, session):
+    commune = Commune.query.first()
+    commune_id = commune.id
+    commune.geometry = SQUARE
+    session.commit()
+    version = get_data_version()
+
+    # Tables created with create_all have no rebuild function
+    result = rebuild_commune_geometries()
+
+    assert result['status'] == 'failed'
+    assert get_data_version() == version
+    assert Commune.query.filter(Commune.id == commune_id, Commune.geometry.isnot(None)).count() == 1
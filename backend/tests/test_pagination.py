@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination of the /index endpoints
+"""
+import pytest
+
+from tests.conftest import SECTORS
+
+
+def _all_pages(client, url, headers):
+    """Rows of every page, following next_cursor"""
+    rows = []
+    response = client.get(url, headers=headers).get_json()
+    while True:
+        rows.extend(response['data'])
+        cursor = response['metadata']['next_cursor']
+        if cursor is None:
+            return rows
+        response = client.get(f'{url}&cursor={cursor}', headers=headers).get_json()
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_cursor_pages_return_every_row_once_in_order(client, auth_headers, stats_data, sector):
+    expected = client.get(f'/api/v1/{sector}/index?per_page=500', headers=auth_headers).get_json()['data']
+
+    rows = _all_pages(client, f'/api/v1/{sector}/index?per_page=7&total=none', auth_headers)
+
+    assert [row['id'] for row in rows] == [row['id'] for row in expected]
+    assert len(rows) == stats_data[sector]['records']
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_cursor_pages_keep_filters(client, auth_headers, stats_data, sector):
+    rows = _all_pages(client, f'/api/v1/{sector}/index?per_page=4&year_from=2021&total=none', auth_headers)
+
+    assert rows
+    assert all(row['year'] >= 2021 for row in rows)
+    assert len({row['id'] for row in rows}) == len(rows)
+
+
+def test_page_and_cursor_agree(client, auth_headers, stats_data):
+    first = client.get('/api/v1/realestate/index?per_page=5', headers=auth_headers).get_json()
+    second_page = client.get('/api/v1/realestate/index?per_page=5&page=2', headers=auth_headers).get_json()
+    second_cursor = client.get(
+        f"/api/v1/realestate/index?per_page=5&cursor={first['metadata']['next_cursor']}", headers=auth_headers
+    ).get_json()
+
+    assert [row['id'] for row in second_cursor['data']] == [row['id'] for row in second_page['data']]
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'WzFd', 'eyJhIjoxfQ'])
+def test_invalid_cursor_is_rejected(client, auth_headers, stats_data, cursor):
+    response = client.get(f'/api/v1/agriculture/index?cursor={cursor}', headers=auth_headers)
+
+    assert response.status_code == 400
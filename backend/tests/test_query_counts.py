@@ -0,0 +1,52 @@
+"""
+Query counts of the list endpoints
+
+Serialized relations are joined into the list query, so the number of
+statements of a request must not depend on how many rows it returns.
+"""
+import pytest
+
+from app import db
+from app.utils.data_version import bump_data_version
+from tests.conftest import SECTORS
+
+
+def _counted_get(client, count_queries, url, headers):
+    # Fresh response/count caches and an empty identity map, so nothing
+    # loaded by the fixtures or a previous request hides a query
+    bump_data_version()
+    db.session.remove()
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response, len(statements)
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_index_query_count_does_not_depend_on_page_size(client, auth_headers, stats_data, count_queries, sector):
+    # Loads the API key into its cache
+    client.get(f'/api/v1/{sector}/index', headers=auth_headers)
+
+    small, small_count = _counted_get(client, count_queries, f'/api/v1/{sector}/index?per_page=1', auth_headers)
+    large, large_count = _counted_get(client, count_queries, f'/api/v1/{sector}/index?per_page=500', auth_headers)
+
+    assert len(small.get_json()['data']) == 1
+    assert len(large.get_json()['data']) == stats_data[sector]['records']
+    assert large_count == small_count
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_export_query_count_does_not_depend_on_row_count(client, auth_headers, stats_data, count_queries, sector):
+    category_key = SECTORS[sector][2]
+    category_id = stats_data[sector]['category_ids'][0]
+    client.get(f'/api/v1/{sector}/index', headers=auth_headers)
+
+    # One year of one category: fewer rows and fewer distinct related rows
+    few, few_count = _counted_get(
+        client, count_queries, f'/api/v1/export/{sector}?format=json&year=2020&{category_key}={category_id}',
+        auth_headers
+    )
+    many, many_count = _counted_get(client, count_queries, f'/api/v1/export/{sector}?format=json', auth_headers)
+
+    assert 0 < len(few.get_json()['data']) < len(many.get_json()['data']) == stats_data[sector]['records']
+    assert many_count == few_count
@@ -0,0 +1,75 @@
+"""
+GCRA rate limiter
+"""
+from app.utils import anti_scraping
+from app.utils.anti_scraping import LocalRateLimiter, RateLimiter
+
+# Minute window: 10 requests/minute, 5 back to back
+KEY_INFO = {'rate_limit_per_hour': 600, 'rate_limit_per_day': 10000, 'rate_limit_burst': 5}
+
+
+def check(app, info=KEY_INFO, api_key='key-a-0123456789abcdef'):
+    headers = {'X-API-KEY': api_key} if info else {}
+    with app.test_request_context('/api/v1/agriculture/index', headers=headers,
+                                  environ_base={'REMOTE_ADDR': '203.0.113.7'}):
+        return RateLimiter.check_rate_limit(info)
+
+
+def test_burst_is_allowed_then_blocked(app):
+    results = [check(app) for _ in range(5)]
+
+    assert all(allowed for allowed, _ in results)
+    assert [info['minute_remaining'] for _, info in results] == [4, 3, 2, 1, 0]
+
+    allowed, info = check(app)
+    assert not allowed
+    assert info['blocked_by'] == 'minute'
+    assert 1 <= info['retry_after'] <= 6
+
+
+def test_blocked_requests_are_not_counted(app):
+    for _ in range(5):
+        check(app)
+
+    blocked = [check(app)[1] for _ in range(3)]
+
+    assert [info['hour_remaining'] for info in blocked] == [595, 595, 595]
+
+
+def test_longest_wait_wins(app):
+    info = {'rate_limit_per_hour': 3, 'rate_limit_per_day': 10000, 'rate_limit_burst': 10}
+
+    results = [check(app, info) for _ in range(4)]
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1]['blocked_by'] == 'hour'
+
+
+def test_keys_are_limited_separately(app):
+    for _ in range(6):
+        check(app)
+
+    allowed, _ = check(app, api_key='key-b-0123456789abcdef')
+
+    assert allowed
+
+
+def test_anonymous_requests_use_the_anonymous_burst(app):
+    results = [check(app, info=None) for _ in range(RateLimiter.ANON_RATE_LIMIT_BURST + 1)]
+
+    assert all(allowed for allowed, _ in results[:-1])
+    assert not results[-1][0]
+
+
+def test_local_fallback_while_redis_is_down(app, monkeypatch):
+    def unavailable():
+        raise anti_scraping.RedisUnavailable('down')
+
+    monkeypatch.setattr(anti_scraping, 'get_rate_limit_script', unavailable)
+    monkeypatch.setattr(anti_scraping, '_local_rate_limiter', LocalRateLimiter(processes=1))
+
+    results = [check(app) for _ in range(6)]
+
+    assert all(info['fallback'] == 'local' for _, info in results)
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    assert results[-1][1]['blocked_by'] == 'minute'
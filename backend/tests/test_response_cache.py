@@ -0,0 +1,29 @@
+"""
+Response cache keys
+"""
+from flask import g
+
+from app.utils.response_cache import cache_key
+
+URL = '/api/v1/agriculture/stats?year=2020'
+
+
+def key_for(app, api_key_info):
+    with app.test_request_context(URL):
+        g.api_key_info = api_key_info
+        return cache_key(1)
+
+
+def test_noisy_callers_do_not_share_entries(app):
+    first = key_for(app, {'id': 1, 'is_admin': False, 'can_api_direct': False})
+    second = key_for(app, {'id': 2, 'is_admin': False, 'can_api_direct': False})
+
+    assert first != second
+    assert first == key_for(app, {'id': 1, 'is_admin': False, 'can_api_direct': False})
+
+
+def test_clean_callers_share_entries(app):
+    admin = key_for(app, {'id': 1, 'is_admin': True})
+    direct = key_for(app, {'id': 2, 'can_api_direct': True})
+
+    assert admin == direct != key_for(app, None)
@@ -0,0 +1,62 @@
+"""
+Sparse fieldsets (fields=) of the /index endpoints
+"""
+import pytest
+
+from app import db
+from tests.conftest import SECTORS
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_fields_returns_only_requested_fields(client, auth_headers, stats_data, sector):
+    category = SECTORS[sector][2][:-len('_id')]
+    full = client.get(f'/api/v1/{sector}/index?per_page=500', headers=auth_headers).get_json()['data']
+
+    response = client.get(
+        f'/api/v1/{sector}/index?per_page=500&fields=year,data_quality_score,{category}', headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    rows = response.get_json()['data']
+    assert rows == [
+        {'year': row['year'], 'data_quality_score': row['data_quality_score'], category: row[category]}
+        for row in full
+    ]
+
+
+def test_fields_limits_the_query(client, auth_headers, stats_data, count_queries):
+    # Loads the API key into its cache
+    client.get('/api/v1/agriculture/index', headers=auth_headers)
+    db.session.remove()
+
+    with count_queries() as statements:
+        response = client.get('/api/v1/agriculture/index?fields=production_tonnes&total=none', headers=auth_headers)
+
+    assert response.status_code == 200
+    page_query = statements[-1]
+    assert 'production_tonnes' in page_query
+    assert 'price_per_kg' not in page_query
+    assert 'communes' not in page_query
+    assert 'crops' not in page_query
+
+
+@pytest.mark.parametrize('sector', SECTORS)
+def test_cursor_pagination_without_sort_fields(client, auth_headers, stats_data, sector):
+    url = f'/api/v1/{sector}/index?per_page=4&total=none&fields=commune'
+    rows = []
+    response = client.get(url, headers=auth_headers).get_json()
+    while True:
+        rows.extend(response['data'])
+        if response['metadata']['next_cursor'] is None:
+            break
+        response = client.get(f"{url}&cursor={response['metadata']['next_cursor']}", headers=auth_headers).get_json()
+
+    assert len(rows) == stats_data[sector]['records']
+    assert all(list(row) == ['commune'] for row in rows)
+
+
+def test_unknown_field_is_rejected(client, auth_headers, stats_data):
+    response = client.get('/api/v1/agriculture/index?fields=year,password', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['message']
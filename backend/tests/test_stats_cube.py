@@ -0,0 +1,50 @@
+"""
+Statistics cube parity
+
+/stats/aggregated must return the same payload (values and JSON types)
+whether it is computed from the cube or by the SQL statements.
+"""
+import pytest
+
+from app.services.aggregation import SECTOR_SPECS, get_aggregation_engine
+from app.services.cube import build_cube, get_cube
+
+FILTERS = [
+    {},
+    {'year_from': 2020, 'year_to': 2022},
+]
+
+
+def assert_same_payload(cube_value, sql_value, path='response'):
+    """Equal payloads, with floats compared approximately and types exactly"""
+    assert type(cube_value) is type(sql_value), f'{path}: {cube_value!r} (cube) != {sql_value!r} (SQL)'
+    if isinstance(sql_value, dict):
+        assert cube_value.keys() == sql_value.keys(), path
+        for key in sql_value:
+            assert_same_payload(cube_value[key], sql_value[key], f'{path}.{key}')
+    elif isinstance(sql_value, (list, tuple)):
+        assert len(cube_value) == len(sql_value), path
+        for i, (cube_item, sql_item) in enumerate(zip(cube_value, sql_value)):
+            assert_same_payload(cube_item, sql_item, f'{path}[{i}]')
+    elif isinstance(sql_value, float):
+        assert cube_value == pytest.approx(sql_value, rel=1e-9), path
+    else:
+        assert cube_value == sql_value, path
+
+
+@pytest.mark.parametrize('sector', SECTOR_SPECS)
+@pytest.mark.parametrize('filters', FILTERS)
+def test_cube_matches_sql(app, monkeypatch, stats_data, sector, filters):
+    spec = SECTOR_SPECS[sector]
+    engine = get_aggregation_engine(sector)
+    group_bys = ['none', 'commune', 'year', spec.category]
+
+    monkeypatch.setitem(app.config, 'STATS_CUBE_ENABLED', False)
+    sql_responses = {group_by: engine.response(group_by, filters) for group_by in group_bys}
+
+    monkeypatch.setitem(app.config, 'STATS_CUBE_ENABLED', True)
+    build_cube(spec, app.config['STATS_CUBE_DIR'])
+    assert get_cube(spec) is not None
+
+    for group_by in group_bys:
+        assert_same_payload(engine.response(group_by, filters), sql_responses[group_by], group_by)